@@ -0,0 +1,59 @@
+"""
+Benchmark for the per-night availability engine in hotel/availability_utils.py.
+
+Runs without a database: it generates random stays for a set of rooms and times
+`build_nightly_availability` while the number of bookings and nights grows, so the
+cost per (booking + room night) should stay roughly flat.
+
+    python benchmarks/availability_benchmark.py --rooms 200 --repeat 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hotel.availability_utils import build_nightly_availability  # noqa: E402
+
+
+def generate_stays(rng, num_of_rooms, num_of_bookings, start_date, total_nights):
+    for _ in range(num_of_bookings):
+        first_night = start_date + timedelta(days=rng.randrange(total_nights))
+        yield (rng.randrange(num_of_rooms), first_night, first_night + timedelta(days=rng.randrange(1, 15)), rng.randint(1, 3))
+
+
+def run(num_of_rooms, num_of_bookings, total_nights, repeat, seed):
+    rng = random.Random(seed)
+    start_date = date(2024, 1, 1)
+    end_date = start_date + timedelta(days=total_nights - 1)
+    rooms = [(room_id, 20, 1000) for room_id in range(num_of_rooms)]
+    stays = list(generate_stays(rng, num_of_rooms, num_of_bookings, start_date, total_nights))
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        availability = build_nightly_availability(rooms, start_date, end_date, stays, [])
+        availability.min_free_rooms()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'bookings':>10} {'nights':>8} {'seconds':>10} {'ns / unit':>10}")
+    for num_of_bookings, total_nights in [(10_000, 30), (100_000, 90), (1_000_000, 365), (2_000_000, 730)]:
+        elapsed = run(args.rooms, num_of_bookings, total_nights, args.repeat, args.seed)
+        units = num_of_bookings + args.rooms * total_nights
+        print(f"{num_of_bookings:>10} {total_nights:>8} {elapsed:>10.3f} {elapsed / units * 1e9:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
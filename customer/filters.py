@@ -1,5 +1,7 @@
 from django_filters import rest_framework as filters
 from hotel.models import RoomInventory
+from hotel.utils import get_stay_nights, to_night
+from hotel_app_backend.hold_utils import get_held_rooms
 from .utils import is_booking_overlapping
 
 
@@ -33,25 +35,17 @@ class RoomInventoryFilter(filters.FilterSet):
             excluded_room_ids = []
             adjusted_availability = {
                 room_inventory.id: {
-                    'available_rooms': min(
-                        room_inventory.available_rooms,
-                        room_inventory.adjusted_min_rooms if room_inventory.adjusted_min_rooms is not None else room_inventory.available_rooms
-                    ),
+                    'available_rooms': room_inventory.available_rooms,
                     'effective_price': getattr(room_inventory, 'effective_price', room_inventory.default_price),
                     'adult_capacity': room_inventory.adult_capacity,
                     'children_capacity': room_inventory.children_capacity
                 }
                 for room_inventory in queryset
             }
-            for key, value in self.request.session.items():
-                if key.startswith('room_id_'):
-                    session_room_id = int(key.split('_')[-1])
-                    session_num_of_rooms = value.get('num_of_rooms', 0)
-                    if session_room_id in adjusted_availability:
-                        new_availability = adjusted_availability[session_room_id]['available_rooms'] - session_num_of_rooms
-                        adjusted_availability[session_room_id]['available_rooms'] = new_availability
-                        if new_availability < int(self.data.get('num_of_rooms')):
-                            excluded_room_ids.append(session_room_id)
+            first_night, last_night = get_stay_nights(to_night(self.data.get('check_in_date')), to_night(self.data.get('check_out_date')))
+            held_rooms = get_held_rooms(adjusted_availability, first_night, last_night, self.request.user.id)
+            for room_id, held in held_rooms.items():
+                adjusted_availability[room_id]['available_rooms'] -= held
             for room_id, details in adjusted_availability.items():
                 available_rooms = details['available_rooms']
                 num_of_rooms_request = int(self.data.get('num_of_rooms', 0))
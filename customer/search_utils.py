@@ -0,0 +1,241 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+from django.conf import settings
+from django.contrib.gis.db.models import PointField
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from django.db.models import IntegerField, FloatField, DecimalField, Subquery, OuterRef, F, Sum, Min, Max, Count, Value, \
+    Case, When, Exists, Func, Q
+from django.db.models.functions import Coalesce, Cast, Least, Greatest
+from django.utils.dateparse import parse_date
+from hotel.models import RoomInventory, RoomNight
+from hotel.utils import get_stay_nights, load_stored_availability
+from hotel_app_backend.hold_utils import get_held_nights, get_held_rooms, get_held_room_ids
+from .serializer import RoomInventorySerializer
+from .utils import Round
+
+
+def get_search_dates(check_in_date, check_out_date):
+    current_date = datetime.now().date()
+    if isinstance(check_in_date, str):
+        check_in_date = parse_date(check_in_date)
+    if isinstance(check_out_date, str):
+        check_out_date = parse_date(check_out_date)
+    return check_in_date or current_date, check_out_date or current_date
+
+
+class KNNDistance(Func):
+    """PostGIS `<->` operator, answered from the GiST index when used in ORDER BY."""
+    arg_joiner = ' <-> '
+    template = '(%(expressions)s)'
+    output_field = FloatField()
+
+
+def get_search_radius(radius):
+    """Radius in kilometres from the request, defaulting to and capped by the server settings."""
+    radius = float(radius) if radius else settings.PROPERTY_SEARCH_DEFAULT_RADIUS_KM
+    return min(max(radius, 0), settings.PROPERTY_SEARCH_MAX_RADIUS_KM)
+
+
+def get_bounding_box(point, radius):
+    """Lon/lat box that contains every point within `radius` kilometres of `point`."""
+    latitude_delta = radius / 111.32
+    longitude_delta = radius / (111.32 * max(math.cos(math.radians(point.y)), 0.01))
+    bounding_box = Polygon.from_bbox((
+        max(point.x - longitude_delta, -180), max(point.y - latitude_delta, -90),
+        min(point.x + longitude_delta, 180), min(point.y + latitude_delta, 90)
+    ))
+    bounding_box.srid = point.srid
+    return bounding_box
+
+
+def get_search_point(longitude, latitude):
+    """Search point rounded to PROPERTY_SEARCH_COORDINATE_PRECISION so nearby searches share cache entries."""
+    precision = settings.PROPERTY_SEARCH_COORDINATE_PRECISION
+    return Point(round(float(longitude), precision), round(float(latitude), precision), srid=4326)
+
+
+def get_search_cache_params(query_params, check_in_date, check_out_date, point=None, radius=None):
+    """
+    Normalize the search parameters for the cache key: list values are sorted, dates resolved and
+    coordinates replaced by the rounded search point and the effective radius.
+    """
+    params = {
+        key: sorted(value for values in query_params.getlist(key) for value in values.split(','))
+        for key in query_params
+        if key not in ('longitude', 'latitude', 'radius', 'check_in_date', 'check_out_date')
+    }
+    params.update({
+        'check_in_date': check_in_date.isoformat(),
+        'check_out_date': check_out_date.isoformat(),
+        'point': [point.x, point.y] if point else None,
+        'radius': radius if point else None
+    })
+    return params
+
+
+def filter_by_location(property_queryset, point, radius):
+    """
+    Keep properties within `radius` kilometres of the point and annotate their `distance`. The `&&`
+    bounding-box test and ST_DWithin both run against the GiST index on `Property.location`.
+    """
+    return property_queryset.filter(
+        location__bboverlaps=get_bounding_box(point, radius),
+        location__dwithin=(point, D(km=radius))
+    ).annotate(distance=Distance('location', point))
+
+
+def order_by_distance(property_queryset, point):
+    """Nearest first using KNN ordering; `id` keeps the order stable between pages."""
+    return property_queryset.order_by(
+        KNNDistance(F('location'), Value(point, output_field=PointField(geography=True))), 'id')
+
+
+def annotate_room_search(room_queryset, check_in_date, check_out_date):
+    """
+    Annotate every room with `total_booked`, `available_rooms` and `effective_price` for the
+    requested stay from its RoomNight rows, so the whole room set is evaluated in SQL. Nights
+    without a row fall back to the room's own inventory and price.
+    """
+    first_night, last_night = get_stay_nights(check_in_date, check_out_date)
+    total_nights = (last_night - first_night).days + 1
+    room_nights = RoomNight.objects.filter(
+        room_inventory_id=OuterRef('pk'),
+        night__gte=first_night,
+        night__lte=last_night
+    )
+    stay = room_nights.values('room_inventory_id')
+    room_queryset = room_queryset.annotate(
+        stored_nights=Coalesce(Subquery(stay.annotate(total=Count('id')).values('total')[:1], output_field=IntegerField()), Value(0)),
+        stored_free=Subquery(stay.annotate(free=Min(F('capacity') - F('booked'))).values('free')[:1], output_field=IntegerField()),
+        stored_price=Coalesce(Subquery(stay.annotate(total=Sum('effective_price')).values('total')[:1], output_field=FloatField()),
+                              Value(0.0)),
+        total_booked=Coalesce(Subquery(stay.annotate(peak=Max('booked')).values('peak')[:1], output_field=IntegerField()), Value(0))
+    )
+    free_rooms = Case(
+        When(stored_nights__lt=total_nights, then=Least(Coalesce(F('stored_free'), F('num_of_rooms')), F('num_of_rooms'))),
+        default=F('stored_free')
+    )
+    total_price = F('stored_price') + F('default_price') * (Value(total_nights) - F('stored_nights'))
+    return room_queryset.annotate(
+        available_rooms=Greatest(free_rooms, Value(0)),
+        effective_price=Round(Cast(total_price, DecimalField(max_digits=14, decimal_places=4)) / Value(total_nights),
+                              output_field=FloatField())
+    ).exclude(Exists(room_nights.filter(is_open=False)))
+
+
+def search_properties(property_queryset, check_in_date, check_out_date, num_of_rooms=0, num_of_adults=0,
+                      num_of_children=0, room_type=None, min_price=None, max_price=None, high_to_low=False):
+    """
+    Return `(property_queryset, room_queryset)` where every property carries the id and effective
+    price of its cheapest eligible room. Filtering, sorting and pagination all stay in the database.
+    """
+    room_queryset = RoomInventory.objects.filter(is_verified=True, status=True)
+    if room_type is not None:
+        room_queryset = room_queryset.filter(room_type__id=room_type)
+    if min_price is not None:
+        room_queryset = room_queryset.filter(default_price__gte=min_price)
+    if max_price is not None:
+        room_queryset = room_queryset.filter(default_price__lte=max_price)
+    if num_of_rooms:
+        room_queryset = room_queryset.filter(adult_capacity__gte=-(-num_of_adults // num_of_rooms),
+                                             children_capacity__gte=-(-num_of_children // num_of_rooms))
+    elif num_of_adults or num_of_children:
+        room_queryset = room_queryset.none()
+    room_queryset = annotate_room_search(room_queryset, check_in_date, check_out_date)
+    room_queryset = room_queryset.filter(available_rooms__gte=num_of_rooms)
+
+    cheapest_room = room_queryset.filter(property=OuterRef('pk')).order_by('effective_price', 'id')
+    property_queryset = property_queryset.annotate(
+        cheapest_room_id=Subquery(cheapest_room.values('id')[:1]),
+        cheapest_room_price=Subquery(cheapest_room.values('effective_price')[:1], output_field=FloatField())
+    ).filter(cheapest_room_id__isnull=False)
+    ordering = ('-cheapest_room_price', '-id') if high_to_low else ('cheapest_room_price', 'id')
+    return property_queryset.order_by(*ordering), room_queryset
+
+
+def attach_room_inventory(properties, room_queryset, check_in_date, check_out_date):
+    """Serialize the cheapest room of each property on a page with a single query."""
+    rooms = room_queryset.select_related('room_type').in_bulk([property.cheapest_room_id for property in properties])
+    for property in properties:
+        room_inventory = rooms.get(property.cheapest_room_id)
+        if room_inventory is None:
+            property.room_inventory = {}
+            continue
+        serialized_data = RoomInventorySerializer(room_inventory, context={"start_date": check_in_date, "end_date": check_out_date}).data
+        serialized_data['default_price'] = round(room_inventory.effective_price)
+        serialized_data['available_rooms'] = room_inventory.available_rooms
+        property.room_inventory = serialized_data
+    return properties
+
+
+def apply_held_rooms(data, check_in_date, check_out_date, holder_id=None):
+    """
+    Take the rooms other customers hold off `available_rooms` of the rooms on a serialized search
+    page. Holds are read per request for the page's rooms only, so cached pages stay shared.
+    """
+    room_ids = {item['room_inventory']['id'] for item in data['data'] if item.get('room_inventory')}
+    held_rooms = get_held_rooms(room_ids & set(get_held_room_ids()), *get_stay_nights(check_in_date, check_out_date), holder_id)
+    if not held_rooms:
+        return data
+    items = []
+    for item in data['data']:
+        room_inventory = item.get('room_inventory')
+        if room_inventory and room_inventory['id'] in held_rooms:
+            room_inventory = {**room_inventory,
+                              'available_rooms': max(room_inventory['available_rooms'] - held_rooms[room_inventory['id']], 0)}
+            item = {**item, 'room_inventory': room_inventory}
+        items.append(item)
+    return {**data, 'data': items}
+
+
+def check_availability(queries, holder_id=None):
+    """
+    Answer a batch of availability queries, each with a `room_id` or `property_id`, the stay dates
+    and `num_of_rooms`, with one rooms query, one RoomNight query and one Redis round trip for holds
+    however many queries there are. A property is answered by its cheapest room with enough rooms
+    free, as in property search, or by its cheapest room when none has.
+    """
+    stays = [(query, *get_stay_nights(query['check_in_date'], query['check_out_date'])) for query in queries]
+    requested_rooms = Q(id__in={query['room_id'] for query in queries if query.get('room_id')})
+    requested_properties = Q(property_id__in={query['property_id'] for query in queries if query.get('property_id')})
+    rooms = list(RoomInventory.objects.filter(
+        requested_rooms | requested_properties,
+        is_verified=True,
+        status=True
+    ).order_by('id').values_list('id', 'property_id', 'num_of_rooms', 'default_price'))
+    property_rooms = defaultdict(list)
+    for room_id, property_id, _, _ in rooms:
+        property_rooms[property_id].append(room_id)
+    room_properties = {room_id: property_id for room_id, property_id, _, _ in rooms}
+    if stays:
+        start_date = min(first_night for _, first_night, _ in stays)
+        end_date = max(last_night for _, _, last_night in stays)
+        availability = load_stored_availability([(room_id, num_of_rooms, price) for room_id, _, num_of_rooms, price in rooms],
+                                                start_date, end_date)
+        held_nights = get_held_nights(set(get_held_room_ids()) & set(room_properties), start_date, end_date, holder_id)
+
+    results = []
+    for query, first_night, last_night in stays:
+        room_ids = [query['room_id']] if query.get('room_id') else property_rooms[query['property_id']]
+        candidates = [
+            (room_id, *availability.stay(room_id, first_night, last_night, held_nights.get(room_id)))
+            for room_id in room_ids if room_id in room_properties
+        ]
+        num_of_rooms = query['num_of_rooms']
+        best = min(candidates, key=lambda candidate: (candidate[1] < num_of_rooms, candidate[2], candidate[0]), default=None)
+        total_nights = (last_night - first_night).days + 1
+        results.append({
+            'room_id': best[0] if best else query.get('room_id'),
+            'property_id': room_properties[best[0]] if best else query.get('property_id'),
+            'check_in_date': query['check_in_date'],
+            'check_out_date': query['check_out_date'],
+            'num_of_rooms': num_of_rooms,
+            'is_available': bool(best) and best[1] >= num_of_rooms,
+            'available_rooms': best[1] if best else 0,
+            'effective_price': round(best[2] / total_nights, 2) if best else None,
+            'total_price': round(best[2] * num_of_rooms, 2) if best else None
+        })
+    return results
@@ -3,9 +3,10 @@ from .models import Customer
 from hotel.serializer import PropertyOutSerializer, DynamicFieldsModelSerializer
 from hotel.models import Property, RoomInventory, BookingHistory, GuestDetail, Ratings, PropertyCancellation, RoomImage, PropertyImage
 from hotel.serializer import RoomInventoryOutSerializer, RoomTypeSerializer, CancellationSerializer
-from django.db.models import Avg
 from django.utils import timezone
 from datetime import datetime
+from django.conf import settings
+from hotel_app_backend.messages import AVAILABILITY_TARGET_MESSAGE, CHECK_OUT_DATE_MESSAGE
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -80,10 +81,14 @@ class RoomInventoryListSerializer(RoomInventoryOutSerializer):
 class PopertyListOutSerializer(PropertyOutSerializer):
     room_inventory = serializers.DictField()
     average_ratings = serializers.SerializerMethodField()
+    distance = serializers.SerializerMethodField()
 
     def get_average_ratings(self, obj):
-        average = Ratings.objects.filter(property=obj).aggregate(average_rating=Avg('ratings'))
-        return round(average['average_rating'], 2) if average['average_rating'] else 0
+        return round(obj.average_rating, 2) if obj.average_rating else 0
+
+    def get_distance(self, obj):
+        distance = getattr(obj, 'distance', None)
+        return round(distance.km, 2) if distance is not None else None
 
     class Meta:
         model = Property
@@ -91,7 +96,7 @@ class PopertyListOutSerializer(PropertyOutSerializer):
                   'hotel_website', 'number_of_rooms', 'check_in_time', 'check_out_time', 'location',
                   'nearby_popular_landmark', 'property_type', 'room_types', 'pet_friendly', 'breakfast_included',
                   'is_cancellation', 'status', 'address', 'images', 'is_verified', 'average_ratings',
-                  'hotel_class', 'cancellation_policy', 'room_inventory']
+                  'rating_count', 'hotel_class', 'cancellation_policy', 'room_inventory', 'distance']
 
 
 class OrderSummarySerializer(RoomInventorySerializer):
@@ -231,3 +236,23 @@ class CustomerBookingSerializer(DynamicFieldsModelSerializer):
                   'check_out_date', 'amount', 'currency', 'is_cancel', 'cancel_by_owner', 'cancel_date',
                   'cancel_reason', 'room_image', 'property_image', 'book_status', 'booking_id', 'owner_email',
                   'payment_id', 'is_confirmed', 'created_at', 'property_deal']
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    room_id = serializers.IntegerField(required=False)
+    property_id = serializers.IntegerField(required=False)
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+    num_of_rooms = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, data):
+        if bool(data.get('room_id')) == bool(data.get('property_id')):
+            raise serializers.ValidationError(AVAILABILITY_TARGET_MESSAGE)
+        if data['check_out_date'] < data['check_in_date']:
+            raise serializers.ValidationError(CHECK_OUT_DATE_MESSAGE)
+        return data
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    queries = serializers.ListField(child=AvailabilityQuerySerializer(), allow_empty=False,
+                                    max_length=settings.AVAILABILITY_BATCH_MAX_QUERIES)
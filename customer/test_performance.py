@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.test import override_settings, tag
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from hotel.seed_utils import SEED_CENTER
+from hotel.test_performance import PerformanceTestMixin, Route, LOCMEM_CACHES
+
+
+@tag('performance')
+@override_settings(CACHES=LOCMEM_CACHES)
+class CustomerPerformanceTest(PerformanceTestMixin, APITestCase):
+    def get_user(self):
+        return self.dataset.customer
+
+    def get_routes(self):
+        customer, booking, room = self.dataset.customer, self.dataset.bookings[0], self.dataset.rooms[0]
+        property_id = room.property_id
+        check_in_date = timezone.localdate() + timedelta(days=1)
+        stay = f'check_in_date={check_in_date}&check_out_date={check_in_date + timedelta(days=2)}&num_of_rooms=1'
+        return [
+            Route('login', 'post', '/customer/login/', {'phone_number': customer.phone_number, 'device_id': 'device',
+                                                        'fcm_token': 'fcm'}, 5),
+            Route('register', 'post', '/customer/register/', {'phone_number': '8111111111', 'first_name': 'New',
+                                                              'last_name': 'Customer', 'device_id': 'device',
+                                                              'fcm_token': 'fcm'}, 6, status=status.HTTP_201_CREATED),
+            Route('profile', 'get', '/customer/profile/', max_queries=2),
+            Route('profile_update', 'patch', '/customer/profile/', {'first_name': 'Renamed'}, 3),
+            Route('property_list', 'get', f'/customer/propertyList/?{stay}&longitude={SEED_CENTER[0]}&latitude={SEED_CENTER[1]}',
+                  max_queries=10, paginated=True),
+            Route('property_retrieve', 'get', f'/customer/propertyRetrieve/{property_id}/?room_id={room.id}', max_queries=14),
+            Route('room_list', 'get', f'/customer/roomList/{property_id}/?{stay}', max_queries=12, paginated=True),
+            Route('room_retrieve', 'get', f'/customer/roomRetrieve/{room.id}/', max_queries=10),
+            Route('availability', 'post', '/customer/availability/', {'queries': [
+                {'room_id': room.id, 'check_in_date': str(check_in_date + timedelta(days=index % 7)),
+                 'check_out_date': str(check_in_date + timedelta(days=index % 7 + 2)), 'num_of_rooms': 1}
+                for index, room in enumerate(self.dataset.rooms[:50])
+            ] + [
+                {'property_id': property.id, 'check_in_date': str(check_in_date), 'check_out_date': str(check_in_date + timedelta(days=3))}
+                for property in self.dataset.properties[:50]
+            ]}, 3),
+            Route('order_summary', 'get', f'/customer/orderSummary/?room_id={room.id}&{stay}', max_queries=12),
+            Route('pay_now', 'post', '/customer/PayNow/', {
+                'booking_detail': {'rooms': room.id, 'property': property_id, 'amount': room.default_price * 2,
+                                   'num_of_rooms': 1, 'check_in_date': str(check_in_date),
+                                   'check_out_date': str(check_in_date + timedelta(days=2))},
+                'guest_detail': {'no_of_adults': 2, 'no_of_children': 0}
+            }, 25),
+            Route('booking_history', 'get', '/customer/bookingHistory/', max_queries=6, paginated=True),
+            Route('booking_retrieve', 'get', f'/customer/bookingRetrieve/{booking.id}/', max_queries=25),
+            Route('ratings', 'get', f'/customer/ratings/{property_id}/', max_queries=4, paginated=True),
+            Route('rating_create', 'post', f'/customer/ratings/{property_id}/', {'ratings': 4, 'review': 'Nice stay'}, 8),
+            Route('cancel_booking', 'post', f'/customer/cancelBooking/{booking.id}/', {'cancel_reason': 'Plans changed'}, 30),
+        ]
+
+
+class CustomerPerformanceScale100Test(CustomerPerformanceTest):
+    scale = 100
+
+
+class CustomerPerformanceScale1000Test(CustomerPerformanceTest):
+    scale = 1000
@@ -1,11 +1,25 @@
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from .models import Customer
-from hotel.models import Property, Owner, PropertyType, RoomInventory, RoomType, BathroomType, BookingHistory, GuestDetail
+from hotel.models import Property, Owner, PropertyType, RoomInventory, RoomType, BathroomType, BookingHistory, GuestDetail, \
+    UpdateInventoryPeriod, RoomNight, Ratings, PropertyImage, PropertyCancellation, OwnerBankingDetail
+from .utils import load_price_calendar, calculate_available_rooms
 from django.contrib.gis.geos import Point
 from unittest.mock import patch
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from django.utils import timezone
+from django.test import SimpleTestCase, override_settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from hotel_app_backend.hold_utils import HOLD_PREFIX, HELD_ROOMS_KEY, acquire_hold, release_hold, get_held_rooms, \
+    get_held_room_ids
+from unittest import SkipTest
+import time as pytime
+from django.conf import settings
+from django.core.management import call_command
+from io import StringIO
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 
 
 class BaseCustomerViewTest(APITestCase):
@@ -69,6 +83,28 @@ class BaseCustomerViewTest(APITestCase):
             is_verified=True
         )
 
+    def create_room(self, property_instance, **overrides):
+        room_data = {
+            'room_name': "Example Room",
+            'floor': 1,
+            'room_view': "View",
+            'area_sqft': 500,
+            'num_of_rooms': 2,
+            'adult_capacity': 2,
+            'children_capacity': 1,
+            'default_price': 150,
+            'min_price': 100,
+            'max_price': 400,
+            'is_verified': True,
+            'status': True,
+            **overrides
+        }
+        if 'room_type' not in room_data:
+            room_data['room_type'] = RoomType.objects.create(room_type='Suite')
+        if 'bathroom_type' not in room_data:
+            room_data['bathroom_type'] = BathroomType.objects.create(bathroom_type='Private')
+        return RoomInventory.objects.create(property=property_instance, **room_data)
+
     def create_booking(self):
         property_instance = self.create_property()
         return BookingHistory.objects.create(
@@ -149,6 +185,125 @@ class PropertyListViewTest(BaseCustomerViewTest):
         response = self.get_property_list()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_property_list_returns_cheapest_room(self):
+        property_instance = self.create_property()
+        for room_name, price in (("Expensive Room", 300), ("Cheap Room", 150)):
+            self.create_room(property_instance, room_name=room_name, default_price=price)
+        response = self.get_property_list()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][0]['room_inventory']['default_price'], 150)
+        self.assertEqual(response.data['data'][0]['room_inventory']['available_rooms'], 2)
+
+    def test_property_list_filters_by_radius(self):
+        property_instance = self.create_property()
+        self.create_room(property_instance)
+        self.client.force_authenticate(user=self.customer, token=self.token)
+        params = {'longitude': 12.971598, 'latitude': 77.6, 'sort_by': 'distance'}
+        response = self.client.get('/customer/propertyList/', {**params, 'radius': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertLess(response.data['data'][0]['distance'], 1)
+        response = self.client.get('/customer/propertyList/', {**params, 'radius': 0.1})
+        self.assertEqual(len(response.data['data']), 0)
+
+    def test_property_list_cursor_pagination(self):
+        for price in (300, 150):
+            self.create_room(self.create_property(), default_price=price)
+        self.client.force_authenticate(user=self.customer, token=self.token)
+        response = self.client.get('/customer/propertyList/', {'pagination': 'cursor', 'per_page': 1})
+        self.assertEqual(response.data['data'][0]['room_inventory']['default_price'], 150)
+        next_cursor = response.data['pagination']['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        response = self.client.get('/customer/propertyList/', {'cursor': next_cursor, 'per_page': 1})
+        self.assertEqual(response.data['data'][0]['room_inventory']['default_price'], 300)
+        self.assertIsNone(response.data['pagination']['next_cursor'])
+
+    def test_property_list_query_count_is_constant(self):
+        def create_listed_property():
+            property_instance = self.create_property()
+            PropertyImage.objects.create(property=property_instance, image='image.jpg')
+            PropertyCancellation.objects.create(property=property_instance, cancellation_days=2, cancellation_percents=50)
+            self.create_room(property_instance)
+
+        create_listed_property()
+        with CaptureQueriesContext(connection) as single_page:
+            self.get_property_list()
+        for _ in range(3):
+            create_listed_property()
+        with CaptureQueriesContext(connection) as larger_page:
+            response = self.get_property_list()
+        self.assertEqual(len(response.data['data']), 4)
+        self.assertEqual(len(larger_page), len(single_page))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_property_list_cache_is_invalidated_by_room_changes(self):
+        room = self.create_room(self.create_property())
+        self.assertEqual(self.get_property_list().data['data'][0]['room_inventory']['default_price'], 150)
+        RoomInventory.objects.filter(id=room.id).update(default_price=200)
+        self.assertEqual(self.get_property_list().data['data'][0]['room_inventory']['default_price'], 150)
+        room.refresh_from_db()
+        room.save()
+        self.assertEqual(self.get_property_list().data['data'][0]['room_inventory']['default_price'], 200)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch('customer.search_utils.get_held_room_ids')
+    def test_property_list_applies_holds_after_cache(self, held_room_ids):
+        room = self.create_room(self.create_property())
+        held_room_ids.return_value = [room.id]
+        with patch('customer.search_utils.get_held_rooms', return_value={room.id: 1}) as held_rooms:
+            response = self.get_property_list()
+        self.assertEqual(held_rooms.call_args.args[0], {room.id})
+        self.assertEqual(response.data['data'][0]['room_inventory']['available_rooms'], 1)
+        held_room_ids.return_value = []
+        self.assertEqual(self.get_property_list().data['data'][0]['room_inventory']['available_rooms'], 2)
+
+
+@patch('customer.search_utils.get_held_room_ids', return_value=[])
+class AvailabilityViewTest(BaseCustomerViewTest):
+    def check_availability(self, queries):
+        self.client.force_authenticate(user=self.customer, token=self.token)
+        return self.client.post('/customer/availability/', {'queries': queries}, format='json')
+
+    def stay(self, offset=0, nights=1):
+        check_in_date = timezone.localdate() + timedelta(days=offset)
+        return {'check_in_date': check_in_date.isoformat(), 'check_out_date': (check_in_date + timedelta(days=nights)).isoformat()}
+
+    def test_batch_answers_rooms_and_properties(self, mock_held):
+        property_instance = self.create_property()
+        self.create_room(property_instance, default_price=300)
+        cheap_room = self.create_room(property_instance, default_price=150)
+        response = self.check_availability([
+            {'room_id': cheap_room.id, 'num_of_rooms': 2, **self.stay()},
+            {'property_id': property_instance.id, **self.stay(nights=2)}
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        room_result, property_result = response.data['data']
+        self.assertEqual((room_result['is_available'], room_result['available_rooms'], room_result['total_price']), (True, 2, 300))
+        self.assertEqual((property_result['room_id'], property_result['effective_price']), (cheap_room.id, 150))
+
+    def test_sold_out_room_is_unavailable(self, mock_held):
+        room = self.create_room(self.create_property())
+        booking = self.create_booking()
+        booking.rooms = room
+        booking.save()
+        result = self.check_availability([{'room_id': room.id, **self.stay()}]).data['data'][0]
+        self.assertEqual((result['is_available'], result['available_rooms']), (False, 0))
+
+    def test_override_caps_night(self, mock_held):
+        room = self.create_room(self.create_property())
+        night = timezone.localdate() + timedelta(days=2)
+        UpdateInventoryPeriod.objects.create(room_inventory=room, default_price=400, num_of_rooms=1,
+                                             date=timezone.make_aware(datetime.combine(night, time(12))))
+        result = self.check_availability([{'room_id': room.id, 'num_of_rooms': 2, **self.stay(offset=1, nights=2)}]).data['data'][0]
+        self.assertEqual((result['is_available'], result['available_rooms'], result['effective_price']), (False, 1, 275))
+
+    def test_invalid_queries_are_rejected(self, mock_held):
+        room = self.create_room(self.create_property())
+        for queries in ([], [{'room_id': room.id, 'property_id': room.property_id, **self.stay()}],
+                        [{'room_id': room.id, 'check_in_date': self.stay(offset=2)['check_in_date'],
+                          'check_out_date': self.stay()['check_in_date']}]):
+            self.assertEqual(self.check_availability(queries).status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class RoomListViewTest(BaseCustomerViewTest):
     def get_room_list(self):
@@ -244,6 +399,167 @@ class OrderSummaryViewTest(BaseCustomerViewTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class PriceCalendarTest(BaseCustomerViewTest):
+    def test_load_price_calendar_falls_back_to_default_price(self):
+        property_instance = self.create_property()
+        room = self.create_room(property_instance, default_price=100, min_price=80)
+        start_date = date.today()
+        UpdateInventoryPeriod.objects.create(room_inventory=room, default_price=400, num_of_rooms=2,
+                                             date=timezone.make_aware(datetime.combine(start_date + timedelta(days=1), time(12))))
+        with self.assertNumQueries(2):
+            price_calendar = load_price_calendar(RoomInventory.objects.filter(id=room.id), start_date, start_date + timedelta(days=2))
+        self.assertEqual(price_calendar.total_prices()[room.id], 600)
+        self.assertEqual(price_calendar.average_prices()[room.id], 200)
+
+
+class RoomNightTest(BaseCustomerViewTest):
+    def test_confirmed_booking_updates_room_nights(self):
+        property_instance = self.create_property()
+        room = self.create_room(property_instance, num_of_rooms=3, default_price=100, min_price=80)
+        booking = self.create_booking()
+        booking.rooms = room
+        booking.save()
+        check_in_date = timezone.localdate()
+        check_out_date = check_in_date + timedelta(days=1)
+        self.assertEqual(RoomNight.objects.get(room_inventory=room, night=check_in_date).booked, 2)
+        self.assertEqual(RoomNight.objects.get(room_inventory=room, night=check_out_date).booked, 0)
+        total_booked, available_rooms, _ = calculate_available_rooms(room, check_in_date, check_out_date, self.customer.id)
+        self.assertEqual((total_booked, available_rooms), (2, 1))
+
+        booking.is_cancel = True
+        booking.save()
+        self.assertEqual(RoomNight.objects.get(room_inventory=room, night=check_in_date).booked, 0)
+
+    def test_moved_booking_frees_previous_room_nights(self):
+        property_instance = self.create_property()
+        room = self.create_room(property_instance, num_of_rooms=3)
+        other_room = self.create_room(property_instance, num_of_rooms=3)
+        booking = self.create_booking()
+        booking.rooms = room
+        booking.save()
+        booking.rooms = other_room
+        booking.save()
+        night = timezone.localdate()
+        self.assertEqual(RoomNight.objects.get(room_inventory=room, night=night).booked, 0)
+        self.assertEqual(RoomNight.objects.get(room_inventory=other_room, night=night).booked, 2)
+
+    def test_override_changes_through_orm_update_room_nights(self):
+        room = self.create_room(self.create_property(), num_of_rooms=3)
+        night = timezone.localdate() + timedelta(days=1)
+        override = UpdateInventoryPeriod.objects.create(room_inventory=room, default_price=400, num_of_rooms=1,
+                                                        date=timezone.make_aware(datetime.combine(night, time(12))))
+        room_night = RoomNight.objects.get(room_inventory=room, night=night)
+        self.assertEqual((room_night.capacity, room_night.effective_price), (1, 400))
+
+        override.num_of_rooms = 2
+        override.save()
+        self.assertEqual(RoomNight.objects.get(room_inventory=room, night=night).capacity, 2)
+
+        override.delete()
+        room_night = RoomNight.objects.get(room_inventory=room, night=night)
+        self.assertEqual((room_night.capacity, room_night.effective_price), (3, 150))
+
+    def test_room_changes_refresh_every_stored_night(self):
+        room = self.create_room(self.create_property(), num_of_rooms=3)
+        far_night = timezone.localdate() + timedelta(days=settings.ROOM_NIGHT_HORIZON_DAYS + 30)
+        booking = self.create_booking()
+        booking.rooms = room
+        booking.check_in_date = timezone.make_aware(datetime.combine(far_night, time(12)))
+        booking.check_out_date = booking.check_in_date + timedelta(days=1)
+        booking.save()
+
+        room.room_name = "Renamed Room"
+        with CaptureQueriesContext(connection) as queries:
+            room.save()
+        self.assertFalse(any('hotel_roomnight' in query['sql'] for query in queries.captured_queries))
+
+        room.num_of_rooms = 5
+        room.save()
+        self.assertEqual(RoomNight.objects.get(room_inventory=room, night=far_night).capacity, 5)
+
+    def test_rebuild_room_nights_covers_every_room(self):
+        property_instance = self.create_property()
+        rooms = [self.create_room(property_instance, num_of_rooms=num_of_rooms) for num_of_rooms in (2, 4)]
+        RoomNight.objects.all().delete()
+        call_command('rebuild_room_nights', days=3, stdout=StringIO())
+        night = timezone.localdate() + timedelta(days=3)
+        self.assertEqual([RoomNight.objects.get(room_inventory=room, night=night).capacity for room in rooms], [2, 4])
+
+
+class PayNowHoldTest(BaseCustomerViewTest):
+    def pay_now(self):
+        property_instance = self.create_property()
+        OwnerBankingDetail.objects.create(hotel_owner=self.hotel, email='owner@example.com', phone='1234567890',
+                                          contact_name='Owner', type='route', account_id='acc_123',
+                                          legal_business_name='Hotel 1', business_type='individual')
+        self.room = self.create_room(property_instance)
+        check_in_date = timezone.localdate() + timedelta(days=1)
+        self.client.force_authenticate(user=self.customer, token=self.token)
+        return self.client.post('/customer/PayNow/', {'booking_detail': {
+            'property': property_instance.id, 'rooms': self.room.id, 'amount': 300, 'num_of_rooms': 1,
+            'check_in_date': check_in_date.isoformat(), 'check_out_date': (check_in_date + timedelta(days=1)).isoformat()
+        }, 'guest_detail': {}}, format='json')
+
+    @patch('customer.views.release_hold')
+    @patch('customer.views.PayNowView.create_payment_order', side_effect=ConnectionError)
+    @patch('customer.views.acquire_hold', return_value=True)
+    def test_failed_payment_order_releases_hold(self, mock_acquire, mock_order, mock_release):
+        response = self.pay_now()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_release.assert_called_once_with(self.room.id, self.customer.id)
+
+    @patch('customer.views.acquire_hold', side_effect=RedisError)
+    def test_unreachable_hold_store_refuses_payment(self, mock_acquire):
+        response = self.pay_now()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class InventoryHoldTest(SimpleTestCase):
+    room_id = 987654321
+    nights = {date(2030, 1, 1): 2, date(2030, 1, 2): 1}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        try:
+            get_redis_connection('default').ping()
+        except Exception:
+            raise SkipTest('Redis is not available.')
+
+    def tearDown(self):
+        connection = get_redis_connection('default')
+        connection.delete(*[f'{HOLD_PREFIX}:{self.room_id}:{key}' for key in ('holds', 'expiry', 'nights')])
+        connection.zrem(HELD_ROOMS_KEY, self.room_id)
+
+    def held_rooms(self, holder_id=None):
+        return get_held_rooms([self.room_id], date(2030, 1, 1), date(2030, 1, 2), holder_id)
+
+    def test_last_room_is_held_once(self):
+        self.assertTrue(acquire_hold(self.room_id, 1, self.nights, 1))
+        self.assertFalse(acquire_hold(self.room_id, 2, self.nights, 1))
+        self.assertEqual(self.held_rooms(holder_id=2), {self.room_id: 1})
+        self.assertEqual(self.held_rooms(holder_id=1), {})
+
+    def test_acquiring_again_replaces_holders_hold(self):
+        self.assertTrue(acquire_hold(self.room_id, 1, {date(2030, 1, 1): 2}, 1))
+        self.assertTrue(acquire_hold(self.room_id, 1, {date(2030, 1, 1): 2}, 2))
+        self.assertEqual(self.held_rooms(holder_id=2), {self.room_id: 2})
+        self.assertFalse(acquire_hold(self.room_id, 2, {date(2030, 1, 1): 2}, 1))
+
+    def test_expired_hold_is_freed(self):
+        self.assertTrue(acquire_hold(self.room_id, 1, self.nights, 1))
+        with patch('hotel_app_backend.hold_utils.time.time', return_value=pytime.time() + settings.INVENTORY_HOLD_SECONDS + 1):
+            self.assertEqual(self.held_rooms(), {})
+            self.assertTrue(acquire_hold(self.room_id, 2, self.nights, 1))
+
+    def test_released_hold_is_freed(self):
+        self.assertTrue(acquire_hold(self.room_id, 1, self.nights, 1))
+        self.assertIn(self.room_id, get_held_room_ids())
+        release_hold(self.room_id, 1)
+        self.assertNotIn(self.room_id, get_held_room_ids())
+        self.assertTrue(acquire_hold(self.room_id, 2, self.nights, 1))
+
+
 class BookingListViewTest(BaseCustomerViewTest):
     def test_booking_list_view(self):
         self.create_booking()
@@ -291,3 +607,13 @@ class RatingsTest(BaseCustomerViewTest):
         }
         response = self.client.post(url, payload, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rating_aggregates_follow_ratings(self):
+        self.create_property_and_authenticate()
+        Ratings.objects.create(property=self.property, customer=self.customer, ratings=5)
+        rating = Ratings.objects.create(property=self.property, customer=self.customer, ratings=4)
+        self.property.refresh_from_db()
+        self.assertEqual((self.property.average_rating, self.property.rating_count), (4.5, 2))
+        rating.delete()
+        self.property.refresh_from_db()
+        self.assertEqual((self.property.average_rating, self.property.rating_count), (5, 1))
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import CustomerRegisterView, CustomerLoginView, CustomerProfileView, PropertyListView, PayNowView, \
     PropertyRetriveView, RoomInventoryListView, OrderSummaryView, RoomRetriveView, BookingListView, \
-    PropertyRatingView, CancelBookingView, BookingRetrieveView
+    PropertyRatingView, CancelBookingView, BookingRetrieveView, AvailabilityView
 
 
 urlpatterns = [
@@ -14,6 +14,7 @@ urlpatterns = [
     path('roomRetrieve/<int:pk>/', RoomRetriveView.as_view(), name='room_detail'),
     path('PayNow/', PayNowView.as_view(), name='book_property'),
     path('orderSummary/', OrderSummaryView.as_view(), name='order_summary'),
+    path('availability/', AvailabilityView.as_view(), name='availability'),
     path('bookingHistory/', BookingListView.as_view(), name='booking_history'),
     path('bookingRetrieve/<int:pk>/', BookingRetrieveView.as_view(), name='booking_retrieve'),
     path('ratings/<int:property_id>/', PropertyRatingView.as_view(), name='add_ratings'),
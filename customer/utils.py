@@ -1,14 +1,14 @@
 import jwt
 from datetime import datetime, timedelta
-from hotel.models import BookingHistory, UpdateInventoryPeriod
-from hotel.models import RoomInventory
-from .serializer import RoomInventorySerializer
-from django.db.models import IntegerField, Subquery, OuterRef, F, Sum, Value, Min, Avg, Case, When, FloatField, Exists
-from django.db.models.functions import Coalesce
+from hotel.models import UpdateInventoryPeriod, RoomNight
+from hotel.utils import get_stay_nights, to_night, load_nightly_availability
+from django.db.models import IntegerField, OuterRef, F, Value, Case, When, FloatField, Exists
 from django.db.models import Func
 import pytz
 from django.conf import settings
+from hotel_app_backend.hold_utils import get_held_rooms
 import requests
+import numpy as np
 
 
 class Round(Func):
@@ -25,84 +25,82 @@ def generate_token(id):
     return jwt_token
 
 
-def sort_properties_by_price(property_obj, high_to_low=False):
-    room_inventory = property_obj.room_inventory
-    if room_inventory and "default_price" in room_inventory:
-        price = room_inventory["default_price"]
-    else:
-        price = float('inf')
-    return -price if high_to_low else price
+class PriceCalendar:
+    """Effective nightly prices for a set of rooms, stored as a rooms x nights array."""
 
+    def __init__(self, room_ids, start_date, nightly_prices):
+        self.room_ids = room_ids
+        self.start_date = start_date
+        self.nightly_prices = nightly_prices
 
-def calculate_avg_price(room_inventory_qs, start_date, end_date):
+    def average_prices(self):
+        return dict(zip(self.room_ids, self.nightly_prices.mean(axis=1).tolist()))
+
+    def total_prices(self):
+        return dict(zip(self.room_ids, self.nightly_prices.sum(axis=1).tolist()))
+
+
+def load_price_calendar(room_inventory_qs, start_date, end_date):
     if isinstance(start_date, str):
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     if isinstance(end_date, str):
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    room_adjustments = {}
-    for room_inventory in room_inventory_qs:
-        total_price = 0
-        total_days = (end_date - start_date).days + 1
-        for single_date in (start_date + timedelta(days=n) for n in range(total_days)):
-            updates = UpdateInventoryPeriod.objects.filter(
-                room_inventory=room_inventory,
-                date__date__lte=single_date,
-                date__date__gte=single_date,
-                status=True,
-                is_deleted=False
-            ).aggregate(Avg('default_price'))
-            daily_price = updates['default_price__avg'] if updates['default_price__avg'] is not None else room_inventory.default_price
-            total_price += daily_price
-        avg_price = total_price / total_days
-        room_adjustments[room_inventory.id] = {'avg_price': avg_price}
-    return room_adjustments
+    total_days = max((end_date - start_date).days + 1, 1)
+    rooms = list(room_inventory_qs.order_by().values_list('id', 'default_price'))
+    room_ids = [room_id for room_id, _ in rooms]
+    room_index = {room_id: index for index, room_id in enumerate(room_ids)}
+    updates = UpdateInventoryPeriod.objects.filter(
+        room_inventory_id__in=room_ids,
+        night__gte=start_date,
+        night__lte=end_date,
+        status=True,
+        is_deleted=False
+    ).values_list('room_inventory_id', 'night', 'default_price')
+    rows, columns, prices = [], [], []
+    for room_id, night, price in updates:
+        rows.append(room_index[room_id])
+        columns.append((night - start_date).days)
+        prices.append(price)
+    price_sums = np.zeros((len(room_ids), total_days))
+    price_counts = np.zeros((len(room_ids), total_days))
+    indices = (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp))
+    np.add.at(price_sums, indices, prices)
+    np.add.at(price_counts, indices, 1)
+    default_prices = np.array([default_price for _, default_price in rooms], dtype=float).reshape(-1, 1)
+    nightly_prices = np.where(price_counts > 0, price_sums / np.maximum(price_counts, 1), default_prices)
+    return PriceCalendar(room_ids, start_date, nightly_prices)
 
 
 def is_booking_overlapping(room_inventory_query, start_date, end_date, num_of_rooms, room_list=False):
-    total_booked_subquery = BookingHistory.objects.filter(
-        rooms=OuterRef('pk'),
-        check_out_date__date__gte=start_date,
-        check_in_date__date__lte=end_date,
-        book_status=True,
-        is_cancel=False
-    ).values('rooms').annotate(total_booked=Sum('num_of_rooms')).values('total_booked')
-    total_booked_subquery = Subquery(total_booked_subquery[:1], output_field=IntegerField())
-    adjusted_min_rooms_subquery = Subquery(
-        UpdateInventoryPeriod.objects.filter(
-            room_inventory_id=OuterRef('pk'),
-            date__date__gte=start_date,
-            date__date__lte=end_date,
-            status=True,
-            is_deleted=False
-        ).values('room_inventory_id')
-        .annotate(min_rooms_over_period=Min('num_of_rooms'))
-        .values('min_rooms_over_period')[:1],
-        output_field=IntegerField()
-    )
+    first_night, last_night = get_stay_nights(to_night(start_date), to_night(end_date))
+    availability = load_nightly_availability(room_inventory_query.values_list('id', 'num_of_rooms', 'default_price'),
+                                             first_night, last_night)
+    peak_booked = availability.peak_booked()
+    min_free_rooms = availability.min_free_rooms()
     room_inventory_query = room_inventory_query.annotate(
-        total_booked=Coalesce(total_booked_subquery, Value(0)),
-        available_rooms=F('num_of_rooms') - Coalesce(total_booked_subquery, Value(0)),
-        adjusted_min_rooms=Coalesce(adjusted_min_rooms_subquery, F('num_of_rooms'))
+        total_booked=Case(
+            *[When(id=room_id, then=Value(booked)) for room_id, booked in peak_booked.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        ),
+        available_rooms=Case(
+            *[When(id=room_id, then=Value(free)) for room_id, free in min_free_rooms.items()],
+            default=F('num_of_rooms'),
+            output_field=IntegerField()
+        )
     ).exclude(Exists(UpdateInventoryPeriod.objects.filter(
         room_inventory_id=OuterRef('pk'),
-        date__date__gte=start_date,
-        date__date__lte=end_date,
+        night__gte=first_night,
+        night__lte=last_night,
         status=False,
         is_deleted=False
     )))
 
-    # room_inventory_query = room_inventory_query.filter(
-    #     Q(available_rooms__gte=F('adjusted_min_rooms')) | Q(adjusted_min_rooms__isnull=True),
-    #     available_rooms__gte=num_of_rooms
-    # ).order_by('default_price', '-available_rooms')
-
-    room_adjustments = calculate_avg_price(room_inventory_query, start_date, end_date)
-    valid_room_ids = [room_id for room_id, adjustments in room_adjustments.items() if adjustments['avg_price'] is not None]
-    room_inventory_query = room_inventory_query.filter(id__in=valid_room_ids)
+    average_prices = load_price_calendar(room_inventory_query, first_night, last_night).average_prices()
     room_inventory_query = room_inventory_query.annotate(
         effective_price=Round(
             Case(
-                *[When(id=room_id, then=Value(adjustments['avg_price'])) for room_id, adjustments in room_adjustments.items()],
+                *[When(id=room_id, then=Value(avg_price)) for room_id, avg_price in average_prices.items()],
                 default=F('default_price'),
                 output_field=FloatField()
             ),
@@ -114,82 +112,33 @@ def is_booking_overlapping(room_inventory_query, start_date, end_date, num_of_ro
     return room_inventory_query.first()
 
 
-def get_room_inventory(property, property_list, num_of_rooms, min_price, max_price, room_type,
-                       check_in_date, check_out_date, num_of_adults, num_of_children, high_to_low, session):
-    room_inventory_query = RoomInventory.objects.filter(property=property, is_verified=True, status=True
-                                                        )
-    if room_type is not None:
-        room_inventory_query = room_inventory_query.filter(room_type__id=room_type)
-    if min_price is not None:
-        room_inventory_query = room_inventory_query.filter(default_price__gte=float(min_price))
-    if max_price is not None:
-        room_inventory_query = room_inventory_query.filter(default_price__lte=float(max_price))
-    if check_in_date is None or check_out_date is None:
-        current_datetime = datetime.now().date()
-        if check_in_date is None:
-            check_in_date = current_datetime
-        if check_out_date is None:
-            check_out_date = current_datetime
-    available_room_inventory = is_booking_overlapping(room_inventory_query, check_in_date, check_out_date, num_of_rooms, room_list=True).order_by('effective_price')
-    adjusted_availability = {
-        room_inventory.id: {
-            'available_rooms': min(
-                room_inventory.available_rooms,
-                room_inventory.adjusted_min_rooms if room_inventory.adjusted_min_rooms is not None else room_inventory.available_rooms
-            ),
-            'effective_price': getattr(room_inventory, 'effective_price', room_inventory.default_price),
-            'adult_capacity': room_inventory.adult_capacity,
-            'children_capacity': room_inventory.children_capacity
-        }
-        for room_inventory in available_room_inventory
-    }
-    for key, value in session.items():
-        if key.startswith('room_id_'):
-            session_room_id = int(key.split('_')[-1])
-            session_num_of_rooms = value.get('num_of_rooms', 0)
-            if session_room_id in adjusted_availability:
-                adjusted_availability[session_room_id]['available_rooms'] -= session_num_of_rooms
-                adjusted_availability[session_room_id]['available_rooms'] = max(0, adjusted_availability[session_room_id]['available_rooms'])
-    available_room_inventory = [
-        room_inventory for room_inventory in available_room_inventory
-        if room_inventory.id in adjusted_availability
-        and adjusted_availability[room_inventory.id]['available_rooms'] >= num_of_rooms
-        and adjusted_availability[room_inventory.id]['adult_capacity'] * num_of_rooms >= num_of_adults
-        and adjusted_availability[room_inventory.id]['children_capacity'] * num_of_rooms >= num_of_children
-    ]
-    include_property = False
-    if available_room_inventory:
-        room_inventory_instance = available_room_inventory[0]
-        serialized_data = RoomInventorySerializer(room_inventory_instance, context={"start_date": check_in_date, "end_date": check_out_date}).data
-        serialized_data['available_rooms'] = adjusted_availability[room_inventory_instance.id]['available_rooms']
-        serialized_data['default_price'] = round(adjusted_availability[room_inventory_instance.id]['effective_price'])
-        property.room_inventory = serialized_data
-        include_property = True
-        if property_list is not None and include_property:
-            property_list.append(property)
-    return property_list if property_list is not None else property
-
-
-def calculate_available_rooms(room, check_in_date, check_out_date, session):
-    total_booked = BookingHistory.objects.filter(
-        rooms=room,
-        check_out_date__date__gte=check_in_date,
-        check_in_date__date__lte=check_out_date,
-        book_status=True,
-        is_cancel=False
-    ).aggregate(total=Sum('num_of_rooms'))['total'] or 0
-    updated_period = UpdateInventoryPeriod.objects.filter(
+def load_free_rooms(room, first_night, last_night):
+    """
+    Read the stay's nights from the RoomNight table. Returns the busiest night's `total_booked` and
+    the free rooms of every night; nights without a row still have the room's defaults.
+    """
+    free_rooms = {first_night + timedelta(days=offset): room.num_of_rooms for offset in range((last_night - first_night).days + 1)}
+    room_nights = RoomNight.objects.filter(
         room_inventory=room,
-        date__date__gte=check_in_date,
-        date__date__lte=check_out_date
-    ).first()
-    if updated_period:
-        available_rooms = updated_period.num_of_rooms - total_booked
-    else:
-        available_rooms = room.num_of_rooms - total_booked
-    session_key = f'room_id_{room.id}'
-    session_rooms_booked = session.get(session_key, {}).get('num_of_rooms', 0)
-    return total_booked, available_rooms, session_rooms_booked
+        night__gte=first_night,
+        night__lte=last_night
+    ).values_list('night', 'capacity', 'booked', 'is_open')
+    total_booked = 0
+    for night, capacity, booked, is_open in room_nights:
+        total_booked = max(total_booked, booked)
+        free_rooms[night] = max(capacity - booked, 0) if is_open else 0
+    return total_booked, free_rooms
+
+
+def calculate_available_rooms(room, check_in_date, check_out_date, holder_id=None):
+    """
+    `total_booked` is the busiest night of the stay, `available_rooms` the tightest one and
+    `held_rooms` the most rooms other customers hold on any of its nights.
+    """
+    first_night, last_night = get_stay_nights(to_night(check_in_date), to_night(check_out_date))
+    total_booked, free_rooms = load_free_rooms(room, first_night, last_night)
+    held_rooms = get_held_rooms([room.id], first_night, last_night, holder_id).get(room.id, 0)
+    return total_booked, min(free_rooms.values()), held_rooms
 
 
 def get_cancellation_charge_percentage(cancellation_policies, days_before_check_in, check_in_time_str):
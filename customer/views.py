@@ -3,14 +3,18 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import Customer
 from .serializer import RegisterSerializer, LoginSerializer, ProfileSerializer, PopertyListOutSerializer, GuestDetail, \
-    OrderSummarySerializer, RoomInventoryListSerializer, CombinedSerializer, RatingSerializer, CustomerBookingSerializer
-from .utils import generate_token, get_room_inventory, sort_properties_by_price, calculate_available_rooms, \
-    get_cancellation_charge_percentage, find_datetime
+    OrderSummarySerializer, RoomInventoryListSerializer, CombinedSerializer, RatingSerializer, CustomerBookingSerializer, \
+    AvailabilitySerializer
+from .utils import generate_token, calculate_available_rooms, get_cancellation_charge_percentage, find_datetime, \
+    load_price_calendar, load_free_rooms
+from .search_utils import search_properties, attach_room_inventory, get_search_dates, \
+    filter_by_location, order_by_distance, get_search_point, get_search_radius, get_bounding_box, get_search_cache_params, \
+    check_availability, apply_held_rooms
 from .email_utils import vendor_cancellation_data, customer_cancellation_data, customer_welcome_data
-from hotel.utils import error_response, send_mail, generate_response
+from hotel.utils import error_response, send_mail, generate_response, get_stay_nights, to_night
 from hotel.filters import BookingFilter
 from hotel.models import Property, RoomInventory, BookingHistory, OwnerBankingDetail, Ratings, PropertyCancellation
-from hotel.paginator import CustomPagination
+from hotel.paginator import CustomPagination, KeysetPagination
 from hotel.serializer import RoomInventoryOutSerializer, BookingHistorySerializer, RatingsOutSerializer, \
     CancelBookingSerializer
 from hotel_app_backend.messages import PHONE_REQUIRED_MESSAGE, PHONE_ALREADY_PRESENT_MESSAGE, \
@@ -18,13 +22,12 @@ from hotel_app_backend.messages import PHONE_REQUIRED_MESSAGE, PHONE_ALREADY_PRE
     PROFILE_MESSAGE, CUSTOMER_NOT_FOUND_MESSAGE, EMAIL_ALREADY_PRESENT_MESSAGE, PROFILE_UPDATE_MESSAGE, \
     PROFILE_ERROR_MESSAGE, ENTITY_ERROR_MESSAGE, PAYMENT_SUCCESS_MESSAGE, DATA_RETRIEVAL_MESSAGE, \
     ORDER_SUFFICIENT_MESSAGE, BOOKED_INFO_MESSAGE, REQUIREMENT_INFO_MESSAGE, BOOKING_NOT_FOUND_MESSAGE, \
-    SESSION_INFO_MESSAGE, AVAILABILITY_INFO_MESSAGE, ROOM_NOT_AVAILABLE_MESSAGE, ORDER_ERROR_MESSAGE, \
+    HOLD_INFO_MESSAGE, AVAILABILITY_INFO_MESSAGE, ROOM_NOT_AVAILABLE_MESSAGE, ORDER_ERROR_MESSAGE, \
     REFUND_SUCCESFULL_MESSAGE, REFUND_ERROR_MESSAGE, DIRECT_TRANSFER_ERROR_MESSAGE, ROOM_NOT_FOUND_MESSAGE, \
-    PROPERTY_NOT_FOUND_MESSAGE, BANKING_DETAIL_NOT_EXIST_MESSAGE, NOT_ALLOWED_TO_REGISTER_AS_CUSTOMER_MESSAGE
+    PROPERTY_NOT_FOUND_MESSAGE, BANKING_DETAIL_NOT_EXIST_MESSAGE, NOT_ALLOWED_TO_REGISTER_AS_CUSTOMER_MESSAGE, \
+    HOLD_UNAVAILABLE_MESSAGE
 from .authentication import JWTAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
-from django.contrib.gis.geos import Point
-from django.contrib.gis.measure import D
 # from django.conf import settings
 # import razorpay
 from rest_framework.generics import RetrieveAPIView, ListAPIView, ListCreateAPIView
@@ -32,9 +35,11 @@ from django.http import Http404
 from .filters import RoomInventoryFilter
 import datetime
 from django.db import transaction
-from django.db.models import Avg
 from django.utils import timezone
 from hotel_app_backend.razorpay_utils import razorpay_request
+from hotel_app_backend.cache_utils import get_search_cache_key, get_search_cells, get_cached_search, set_cached_search
+from hotel_app_backend.hold_utils import acquire_hold, release_hold
+from redis.exceptions import RedisError
 from django.utils.dateparse import parse_date
 from django.core.exceptions import ObjectDoesNotExist
 from hotel.models import Owner
@@ -163,6 +168,15 @@ class PropertyListView(generics.GenericAPIView):
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend]
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            query_params = self.request.query_params
+            use_cursor = query_params.get('pagination') == 'cursor' or 'cursor' in query_params
+            self._paginator = KeysetPagination() if use_cursor and query_params.get('sort_by') != 'distance' \
+                else self.pagination_class()
+        return self._paginator
+
     def get(self, request, *args, **kwargs):
         try:
             longitude = self.request.query_params.get('longitude')
@@ -181,6 +195,20 @@ class PropertyListView(generics.GenericAPIView):
             ratings = self.request.query_params.get('ratings', None)
             hotel_class = self.request.query_params.get('hotel_class', None)
             bidding_mode = self.request.query_params.get('bidding_mode') == 'true'
+            radius = self.request.query_params.get('radius')
+            sort_by = self.request.query_params.get('sort_by')
+            point = None
+            check_in_date, check_out_date = get_search_dates(check_in_date, check_out_date)
+            if latitude and longitude:
+                point = get_search_point(longitude, latitude)
+                radius = get_search_radius(radius)
+            cache_key = get_search_cache_key(
+                get_search_cache_params(self.request.query_params, check_in_date, check_out_date, point, radius),
+                get_search_cells(get_bounding_box(point, radius).extent) if point else None
+            )
+            cached_response = get_cached_search(cache_key)
+            if cached_response is not None:
+                return Response(apply_held_rooms(cached_response, check_in_date, check_out_date, self.request.user.id))
             # total_guests = (int(num_of_adults) if num_of_adults is not None else 0) + \
             #     (int(num_of_children) if num_of_children is not None else 0)
             if bidding_mode:
@@ -189,42 +217,36 @@ class PropertyListView(generics.GenericAPIView):
                 queryset = self.get_queryset()
             if nearby_popular_landmark:
                 queryset = queryset.filter(nearby_popular_landmark=nearby_popular_landmark)
-            if latitude and longitude:
-                point = Point(float(longitude), float(latitude), srid=4326)
-                queryset = queryset.filter(location__distance_lte=(point, D(km=20)))
+            if point:
+                queryset = filter_by_location(queryset, point, radius)
             if property_type:
                 property_type_ids = [int(id) for id in property_type.split(',') if id.isdigit()]
                 queryset = queryset.filter(property_type__id__in=property_type_ids)
             if ratings:
                 rating_ranges = [(float(rating.strip()), float(rating.strip()) + 0.5) for rating in ratings.split(',') if rating.replace('.', '', 1).isdigit()]
-                properties_with_desired_ratings = Ratings.objects \
-                    .annotate(average_rating=Avg('ratings')) \
-                    .filter(average_rating__gte=min(rating_range[0] for rating_range in rating_ranges),
-                            average_rating__lte=max(rating_range[1] for rating_range in rating_ranges)) \
-                    .values_list('property', flat=True).distinct()
-                queryset = queryset.filter(id__in=properties_with_desired_ratings)
+                queryset = queryset.filter(average_rating__gte=min(rating_range[0] for rating_range in rating_ranges),
+                                           average_rating__lte=max(rating_range[1] for rating_range in rating_ranges))
             if hotel_class:
                 queryset = queryset.filter(hotel_class=int(hotel_class))
             # if total_guests > 5:
             #     queryset = queryset.filter(property_type__id__in=settings.PREFERRED_PROPERTY_TYPES)
-            property_list = []
-            for property in queryset:
-                property_list = get_room_inventory(property,
-                                                   property_list if property_list else [],
-                                                   num_of_rooms=int(num_of_rooms) if num_of_rooms else 0,
-                                                   min_price=int(min_price) if min_price else None,
-                                                   max_price=int(max_price) if max_price else None,
-                                                   room_type=room_type if room_type else None,
-                                                   check_in_date=check_in_date if check_in_date else None,
-                                                   check_out_date=check_out_date if check_out_date else None,
-                                                   num_of_adults=int(num_of_adults if num_of_adults else 0),
-                                                   num_of_children=int(num_of_children if num_of_children else 0),
-                                                   high_to_low=high_to_low,
-                                                   session=self.request.session)
-            sorted_properties = sorted(property_list, key=lambda x: sort_properties_by_price(x, high_to_low=high_to_low))
-            page = self.paginate_queryset(sorted_properties)
+            queryset, room_queryset = search_properties(queryset, check_in_date, check_out_date,
+                                                        num_of_rooms=int(num_of_rooms) if num_of_rooms else 0,
+                                                        num_of_adults=int(num_of_adults) if num_of_adults else 0,
+                                                        num_of_children=int(num_of_children) if num_of_children else 0,
+                                                        room_type=room_type if room_type else None,
+                                                        min_price=int(min_price) if min_price else None,
+                                                        max_price=int(max_price) if max_price else None,
+                                                        high_to_low=bool(high_to_low))
+            if sort_by == 'distance' and point is not None:
+                queryset = order_by_distance(queryset, point)
+            page = self.paginate_queryset(self.serializer_class.setup_eager_loading(queryset))
+            page = attach_room_inventory(page, room_queryset, check_in_date, check_out_date)
             serializer = self.serializer_class(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            set_cached_search(cache_key, response.data)
+            response.data = apply_held_rooms(response.data, check_in_date, check_out_date, self.request.user.id)
+            return response
         except Exception as e:
             return error_response(EXCEPTION_MESSAGE + str(e), status.HTTP_400_BAD_REQUEST)
 
@@ -265,7 +287,7 @@ class RoomInventoryListView(ListAPIView):
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.filter_queryset(self.get_queryset())
+            queryset = self.serializer_class.setup_eager_loading(self.filter_queryset(self.get_queryset()))
             adjusted_availability = getattr(request, 'adjusted_availability', {})
             page = self.paginate_queryset(queryset)
             if page is not None:
@@ -303,17 +325,21 @@ class OrderSummaryView(ListAPIView):
             check_out_date = self.request.query_params.get('check_out_date')
             num_of_rooms = self.request.query_params.get('num_of_rooms')
             room = RoomInventory.objects.get(id=room_id)
-            total_booked, available_rooms, session_rooms_booked = calculate_available_rooms(room, check_in_date, check_out_date, self.request.session)
-            adjusted_availability = available_rooms - session_rooms_booked
+            total_booked, available_rooms, held_rooms = calculate_available_rooms(room, check_in_date, check_out_date, self.request.user.id)
+            adjusted_availability = available_rooms - held_rooms
             check_in_date_obj = parse_date(check_in_date)
             check_out_date_obj = parse_date(check_out_date)
             num_nights = (check_out_date_obj - check_in_date_obj).days
-            total_price = room.default_price * min(adjusted_availability, int(num_of_rooms)) * num_nights
-            gst_rate = 0.12 if room.default_price <= 7500 else 0.18
+            price_calendar = load_price_calendar(RoomInventory.objects.filter(id=room.id), check_in_date_obj,
+                                                 check_out_date_obj - datetime.timedelta(days=1))
+            stay_price = price_calendar.total_prices()[room.id] if num_nights > 0 else 0
+            nightly_price = stay_price / num_nights if num_nights > 0 else room.default_price
+            total_price = stay_price * min(adjusted_availability, int(num_of_rooms))
+            gst_rate = 0.12 if nightly_price <= 7500 else 0.18
             gst_amount = total_price * gst_rate
             final_price = total_price + gst_amount
             booked_info = BOOKED_INFO_MESSAGE.format(total_booked=total_booked)
-            session_info = SESSION_INFO_MESSAGE.format(session_rooms_booked=session_rooms_booked)
+            hold_info = HOLD_INFO_MESSAGE.format(held_rooms=held_rooms)
             availability_info = AVAILABILITY_INFO_MESSAGE.format(adjusted_availability=adjusted_availability)
             requirement_info = REQUIREMENT_INFO_MESSAGE.format(additional_rooms_needed=int(num_of_rooms) - adjusted_availability)
             serializer = self.serializer_class(room, context={"user": self.request.user})
@@ -330,7 +356,7 @@ class OrderSummaryView(ListAPIView):
                     'gst_amount': round(gst_amount),
                     'final_price': round(final_price),
                 },
-                'message': ORDER_SUFFICIENT_MESSAGE if adjusted_availability >= int(num_of_rooms) else f"{availability_info} {booked_info} {session_info} {requirement_info}"
+                'message': ORDER_SUFFICIENT_MESSAGE if adjusted_availability >= int(num_of_rooms) else f"{availability_info} {booked_info} {hold_info} {requirement_info}"
             }, status=status.HTTP_200_OK)
         except ObjectDoesNotExist:
             return error_response(ROOM_NOT_FOUND_MESSAGE, status.HTTP_400_BAD_REQUEST)
@@ -338,6 +364,24 @@ class OrderSummaryView(ListAPIView):
             return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
 
 
+class AvailabilityView(APIView):
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        try:
+            serializer = AvailabilitySerializer(data=request.data)
+            if not serializer.is_valid():
+                return error_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+            return Response({
+                'result': True,
+                'data': check_availability(serializer.validated_data['queries'], holder_id=request.user.id),
+                'message': DATA_RETRIEVAL_MESSAGE
+            }, status=status.HTTP_200_OK)
+        except Exception:
+            return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
+
+
 class PayNowView(APIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
@@ -359,54 +403,56 @@ class PayNowView(APIView):
                 num_of_rooms = booking_data.get('num_of_rooms')
                 check_in_date = booking_data.get('check_in_date')
                 check_out_date = booking_data.get('check_out_date')
-                total_booked, available_rooms, session_rooms_booked = calculate_available_rooms(room_instance, check_in_date, check_out_date, self.request.session)
-                adjusted_availability = available_rooms - session_rooms_booked
-                if available_rooms < int(num_of_rooms) or adjusted_availability < int(num_of_rooms):
+                _, free_rooms = load_free_rooms(room_instance, *get_stay_nights(to_night(check_in_date), to_night(check_out_date)))
+                if not acquire_hold(room_id, request.user.id, free_rooms, num_of_rooms):
                     return error_response(ROOM_NOT_AVAILABLE_MESSAGE, status.HTTP_400_BAD_REQUEST)
-                commission_percent = property_instance.commission_percent
-                commission_percent = property_instance.commission_percent
-                commission_amount = (amount * commission_percent) / 100
-                remaining_amount = amount - commission_amount
-                remaining_amount_in_paise = int(remaining_amount * 100)
-                on_hold_until_timestamp = self.calculate_on_hold_until(check_in_date)
-                session_key = 'room_id_' + str(room_id)
-                request.session[session_key] = {
-                    'room_id': room_id,
-                    'num_of_rooms': num_of_rooms
-                }
-                request.session.set_expiry(60)
-                order = self.create_payment_order(amount, remaining_amount_in_paise, account_id, currency, on_hold_until_timestamp)
-                if not order:
-                    return error_response("Failed to create payment order", status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-                check_in_datetime, check_out_datetime = find_datetime(check_in_date, check_out_date)
-                booking_data['check_in_date'] = check_in_datetime
-                booking_data['check_out_date'] = check_out_datetime
-
-                serializer_data = {
-                    'booking_detail': booking_data,
-                    'guest_detail': guest_data
-                }
-                serializer = CombinedSerializer(data=serializer_data, context={'request': request,
-                                                                               'property': property_instance,
-                                                                               'room': room_instance,
-                                                                               'order_id': order['id'],
-                                                                               'transfer_id': order['transfers'][0]['id']})
-                if serializer.is_valid():
-                    serializer_data = serializer.save()
-                    return Response({
-                        'result': True,
-                        'data': BookingHistorySerializer(serializer_data['booking'], fields=('id', 'order_id', 'booking_id')).data,
-                        'message': PAYMENT_SUCCESS_MESSAGE
-                    }, status=status.HTTP_200_OK)
-                else:
-                    return error_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+                try:
+                    commission_percent = property_instance.commission_percent
+                    commission_amount = (amount * commission_percent) / 100
+                    remaining_amount = amount - commission_amount
+                    remaining_amount_in_paise = int(remaining_amount * 100)
+                    on_hold_until_timestamp = self.calculate_on_hold_until(check_in_date)
+                    order = self.create_payment_order(amount, remaining_amount_in_paise, account_id, currency, on_hold_until_timestamp)
+                    if not order:
+                        release_hold(room_id, request.user.id)
+                        return error_response("Failed to create payment order", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+                    check_in_datetime, check_out_datetime = find_datetime(check_in_date, check_out_date)
+                    booking_data['check_in_date'] = check_in_datetime
+                    booking_data['check_out_date'] = check_out_datetime
+
+                    serializer_data = {
+                        'booking_detail': booking_data,
+                        'guest_detail': guest_data
+                    }
+                    serializer = CombinedSerializer(data=serializer_data, context={'request': request,
+                                                                                   'property': property_instance,
+                                                                                   'room': room_instance,
+                                                                                   'order_id': order['id'],
+                                                                                   'transfer_id': order['transfers'][0]['id']})
+                    if serializer.is_valid():
+                        serializer_data = serializer.save()
+                        return Response({
+                            'result': True,
+                            'data': BookingHistorySerializer(serializer_data['booking'], fields=('id', 'order_id', 'booking_id')).data,
+                            'message': PAYMENT_SUCCESS_MESSAGE
+                        }, status=status.HTTP_200_OK)
+                    else:
+                        release_hold(room_id, request.user.id)
+                        return error_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+                except Exception:
+                    # Anything failing after the hold must not keep the rooms held until it expires
+                    release_hold(room_id, request.user.id)
+                    raise
         except RoomInventory.DoesNotExist:
             return error_response(ROOM_NOT_FOUND_MESSAGE, status.HTTP_400_BAD_REQUEST)
         except Property.DoesNotExist:
             return error_response(PROPERTY_NOT_FOUND_MESSAGE, status.HTTP_400_BAD_REQUEST)
         except OwnerBankingDetail.DoesNotExist:
             return error_response(BANKING_DETAIL_NOT_EXIST_MESSAGE, status.HTTP_400_BAD_REQUEST)
+        except RedisError:
+            # Without the hold store overlapping checkouts cannot be told apart, so payment is refused
+            return error_response(HOLD_UNAVAILABLE_MESSAGE, status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception:
             return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
 
@@ -452,7 +498,7 @@ class BookingListView(ListAPIView):
     def get_queryset(self):
         try:
             queryset = BookingHistory.objects.filter(customer=self.request.user, book_status=True).order_by('-created_at')
-            return queryset
+            return self.serializer_class.setup_eager_loading(queryset)
         except Exception:
             return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
 
@@ -498,7 +544,7 @@ class PropertyRatingView(ListCreateAPIView):
     def list(self, request, *args, **kwargs):
         try:
             property_id = self.kwargs.get('property_id')
-            ratings = Ratings.objects.filter(property=property_id).order_by('-created_at')
+            ratings = RatingsOutSerializer.setup_eager_loading(Ratings.objects.filter(property=property_id).order_by('-created_at'))
             page = self.paginate_queryset(ratings)
             serializer = RatingsOutSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
@@ -0,0 +1,122 @@
+from datetime import timedelta
+import numpy as np
+
+
+class NightlyAvailability:
+    """Per-night inventory of a set of rooms; every matrix is shaped (rooms, nights)."""
+
+    def __init__(self, room_ids, start_date, booked, capacity, is_open, prices):
+        self.room_ids = list(room_ids)
+        self.room_index = {room_id: row for row, room_id in enumerate(self.room_ids)}
+        self.start_date = start_date
+        self.booked = booked
+        self.capacity = capacity
+        self.is_open = is_open
+        self.prices = prices
+
+    @property
+    def total_nights(self):
+        return self.booked.shape[1]
+
+    def free_rooms(self):
+        return np.maximum(np.where(self.is_open, self.capacity - self.booked, 0), 0)
+
+    def min_free_rooms(self):
+        free_rooms = self.free_rooms().min(axis=1) if self.total_nights else np.zeros(len(self.room_ids), dtype=np.int64)
+        return {room_id: int(free) for room_id, free in zip(self.room_ids, free_rooms)}
+
+    def peak_booked(self):
+        peak_booked = self.booked.max(axis=1) if self.total_nights else np.zeros(len(self.room_ids), dtype=np.int64)
+        return {room_id: int(booked) for room_id, booked in zip(self.room_ids, peak_booked)}
+
+    def stay(self, room_id, first_night, last_night, held=None):
+        """`(free_rooms, total_price)` of one room over a stay, less the rooms `held` per night."""
+        row = self.room_index[room_id]
+        first, last = (first_night - self.start_date).days, (last_night - self.start_date).days + 1
+        free_rooms = np.where(self.is_open[row, first:last], self.capacity[row, first:last] - self.booked[row, first:last], 0)
+        if held is not None:
+            free_rooms = free_rooms - np.asarray(held[first:last], dtype=np.int64)
+        return max(int(free_rooms.min()), 0), float(self.prices[row, first:last].sum())
+
+    def room_nights(self, room_id):
+        """Yield `(night, capacity, booked, is_open, price)` for every night of one room."""
+        row = self.room_index[room_id]
+        for offset in range(self.total_nights):
+            yield (self.start_date + timedelta(days=offset), int(self.capacity[row, offset]), int(self.booked[row, offset]),
+                   bool(self.is_open[row, offset]), float(self.prices[row, offset]))
+
+
+def _night_offsets(start_date, nights):
+    return np.asarray([(night - start_date).days for night in nights], dtype=np.intp)
+
+
+def build_occupancy(room_index, start_date, end_date, stays):
+    """Booked rooms per night from `(room_id, first_night, last_night, num_of_rooms)` stays, via a difference array."""
+    total_nights = (end_date - start_date).days + 1
+    diff = np.zeros((len(room_index), total_nights + 1), dtype=np.int64)
+    rows, first_nights, last_nights, counts = [], [], [], []
+    for room_id, first_night, last_night, num_of_rooms in stays:
+        row = room_index.get(room_id)
+        if row is None:
+            continue
+        first_night, last_night = max(first_night, start_date), min(last_night, end_date)
+        if first_night > last_night:
+            continue
+        rows.append(row)
+        first_nights.append(first_night)
+        last_nights.append(last_night)
+        counts.append(num_of_rooms)
+    rows = np.asarray(rows, dtype=np.intp)
+    counts = np.asarray(counts, dtype=np.int64)
+    np.add.at(diff, (rows, _night_offsets(start_date, first_nights)), counts)
+    np.add.at(diff, (rows, _night_offsets(start_date, last_nights) + 1), -counts)
+    return np.cumsum(diff[:, :-1], axis=1)
+
+
+def build_nightly_availability(rooms, start_date, end_date, stays, overrides):
+    """
+    `rooms` holds `(room_id, num_of_rooms, default_price)` and `overrides` `(room_id, night, num_of_rooms,
+    price, status)`; open overrides cap the capacity and set the price, closed ones shut the night.
+    """
+    rooms = list(rooms)
+    room_index = {room_id: row for row, (room_id, _, _) in enumerate(rooms)}
+    total_nights = max((end_date - start_date).days + 1, 0)
+    shape = (len(rooms), total_nights)
+    default_capacity = np.asarray([num_of_rooms for _, num_of_rooms, _ in rooms], dtype=np.int64).reshape(-1, 1)
+    default_price = np.asarray([price for _, _, price in rooms], dtype=np.float64).reshape(-1, 1)
+    if not total_nights:
+        empty = np.zeros(shape, dtype=np.int64)
+        return NightlyAvailability(list(room_index), start_date, empty, empty, empty.astype(bool), empty.astype(np.float64))
+
+    override_capacity = np.full(shape, np.iinfo(np.int64).max, dtype=np.int64)
+    open_count = np.zeros(shape, dtype=np.int64)
+    closed_count = np.zeros(shape, dtype=np.int64)
+    price_total = np.zeros(shape, dtype=np.float64)
+    open_rows, open_nights, open_rooms, open_prices, closed_rows, closed_nights = [], [], [], [], [], []
+    for room_id, night, num_of_rooms, price, status in overrides:
+        row = room_index.get(room_id)
+        if row is None or not start_date <= night <= end_date:
+            continue
+        if status:
+            open_rows.append(row)
+            open_nights.append(night)
+            open_rooms.append(num_of_rooms)
+            open_prices.append(price)
+        else:
+            closed_rows.append(row)
+            closed_nights.append(night)
+    open_index = (np.asarray(open_rows, dtype=np.intp), _night_offsets(start_date, open_nights))
+    np.minimum.at(override_capacity, open_index, np.asarray(open_rooms, dtype=np.int64))
+    np.add.at(open_count, open_index, 1)
+    np.add.at(price_total, open_index, np.asarray(open_prices, dtype=np.float64))
+    np.add.at(closed_count, (np.asarray(closed_rows, dtype=np.intp), _night_offsets(start_date, closed_nights)), 1)
+
+    has_override = open_count > 0
+    return NightlyAvailability(
+        list(room_index),
+        start_date,
+        build_occupancy(room_index, start_date, end_date, stays),
+        np.where(has_override, override_capacity, default_capacity),
+        closed_count == 0,
+        np.where(has_override, price_total / np.maximum(open_count, 1), default_price)
+    )
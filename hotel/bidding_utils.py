@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, field
+from itertools import count
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from .models import BiddingAmount, BiddingSession, Category, PropertyDeal, RoomInventory
+
+QUOTES_PER_OWNER = 2
+
+
+@dataclass(slots=True)
+class LedgerRoom:
+    room_id: int
+    owner_id: int
+    hotel_name: str
+    property_deal_id: int
+
+
+@dataclass(slots=True)
+class Quote:
+    sequence: int
+    room_id: int
+    hotel_name: str
+    amount: float
+    active: bool = field(default=True, compare=False)
+
+
+class BidLedger:
+    """Latest quotes of each owner of a bidding session, with a heap of their amounts for the lowest bid."""
+
+    def __init__(self):
+        self.rooms = {}
+        self.latest = {}
+        self.heap = []
+        self.sequence = count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add_room(self, room_id, owner_id, hotel_name, property_deal_id):
+        self.rooms[room_id] = LedgerRoom(room_id, owner_id, hotel_name, property_deal_id)
+
+    def record(self, room_id, amount):
+        room = self.rooms[room_id]
+        quotes = self.latest.setdefault(room.owner_id, deque(maxlen=QUOTES_PER_OWNER))
+        if len(quotes) == QUOTES_PER_OWNER:
+            quotes[0].active = False
+        quote = Quote(next(self.sequence), room_id, room.hotel_name, amount)
+        quotes.append(quote)
+        heapq.heappush(self.heap, (amount, quote.sequence, quote))
+        self.prune()
+        return quote
+
+    def prune(self):
+        while self.heap and not self.heap[0][2].active:
+            heapq.heappop(self.heap)
+        # Flagged quotes below the top are compacted away once they outnumber the live ones.
+        if len(self.heap) > 2 * QUOTES_PER_OWNER * max(len(self.latest), 1):
+            self.heap = [entry for entry in self.heap if entry[2].active]
+            heapq.heapify(self.heap)
+
+    def lowest_amount(self):
+        return self.heap[0][0] if self.heap else None
+
+    def quotes_received(self):
+        """The latest quotes of every owner, cheapest first and newest first on equal amounts."""
+        quotes = sorted((quote for quotes in self.latest.values() for quote in quotes),
+                        key=lambda quote: (quote.amount, -quote.sequence))
+        return [{'room_id': quote.room_id, 'hotel_name': quote.hotel_name, 'amount': quote.amount} for quote in quotes]
+
+
+@dataclass(slots=True)
+class SessionBootstrap:
+    session_id: int
+    bid_time_duration: int
+    properties: list
+    missing_room_ids: list
+    ledger: BidLedger
+
+
+def bootstrap_bidding_session(customer_id, room_ids, **session_fields):
+    """Open a bidding session on `room_ids` with its deals and opening bids; None if one is already open."""
+    room_ids = list(dict.fromkeys(room_ids))
+    with transaction.atomic():
+        if BiddingSession.objects.filter(customer_id=customer_id, is_open=True).exists():
+            return None
+        bid_time_duration = Category.objects.first().bid_time_duration
+        session = BiddingSession.objects.create(is_open=True, customer_id=customer_id, **session_fields)
+        rooms = RoomInventory.objects.filter(id__in=room_ids).select_related('property__owner').in_bulk()
+        found_rooms = [rooms[room_id] for room_id in room_ids if room_id in rooms]
+        deals = PropertyDeal.objects.bulk_create([
+            PropertyDeal(session=session, customer_id=customer_id, room_inventory=room, is_winning_bid=False) for room in found_rooms
+        ])
+        BiddingAmount.objects.bulk_create([
+            BiddingAmount(property_deal=deal, amount=room.deal_price)
+            for room, deal in zip(found_rooms, deals) if room.deal_price is not None
+        ])
+    ledger = BidLedger()
+    for room, deal in zip(found_rooms, deals):
+        ledger.add_room(room.id, room.property.owner_id, room.property.hotel_nick_name, deal.id)
+        if room.deal_price is not None:
+            ledger.record(room.id, room.deal_price)
+    return SessionBootstrap(
+        session_id=session.id,
+        bid_time_duration=bid_time_duration,
+        properties=[{'owner': room.property.owner.hotel_name, 'hotel_name': room.property.hotel_nick_name,
+                     'amount': room.deal_price, 'room_id': room.id} for room in found_rooms],
+        missing_room_ids=[room_id for room_id in room_ids if room_id not in rooms],
+        ledger=ledger
+    )
+
+
+class BidWriter:
+    """
+    Batches BiddingAmount inserts; with `wait_for_flush`, `add` waits for the insert and raises if it
+    fails, otherwise failed batches are retried on the next `retries` flushes.
+    """
+
+    def __init__(self, interval, batch_size, wait_for_flush=False, retries=3):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.wait_for_flush = wait_for_flush
+        self.retries = retries
+        self.pending = []
+        self.wake = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.stopped = False
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.stopped = True
+        self.wake.set()
+        if self.task:
+            await self.task
+        await self.flush()
+
+    async def add(self, property_deal_id, amount):
+        future = asyncio.get_running_loop().create_future() if self.wait_for_flush else None
+        self.pending.append((BiddingAmount(property_deal_id=property_deal_id, amount=amount), future, 0))
+        if len(self.pending) >= self.batch_size:
+            self.wake.set()
+        if future:
+            await future
+
+    async def run(self):
+        while not self.stopped:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.wake.wait(), self.interval)
+            self.wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                await sync_to_async(BiddingAmount.objects.bulk_create)([bid for bid, _, _ in batch])
+            except Exception as e:
+                print(f"Failed to save {len(batch)} bids: {e}")
+                for bid, future, attempts in batch:
+                    if future:
+                        if not future.done():
+                            future.set_exception(e)
+                    elif attempts < self.retries:
+                        self.pending.append((bid, future, attempts + 1))
+            else:
+                for _, future, _ in batch:
+                    if future and not future.done():
+                        future.set_result(None)
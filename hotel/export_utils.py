@@ -0,0 +1,87 @@
+import csv
+from datetime import timedelta
+from django.utils import timezone
+from .models import RoomInventory, RoomNight
+
+CSV_HEADER = ('room_id', 'room_name', 'night', 'capacity', 'booked', 'available_rooms', 'is_open', 'price')
+ICAL_LINE_LENGTH = 75
+
+
+class Echo:
+    """Pseudo-buffer for `csv.writer`: `write` hands the row back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_room_nights(property_id, start_date, end_date, chunk_size=2000):
+    """Yield `(room_id, room_name, night, capacity, booked, available_rooms, is_open, price)` for every room and night."""
+    rooms = list(RoomInventory.objects.filter(property_id=property_id).order_by('id').values_list(
+        'id', 'room_name', 'num_of_rooms', 'default_price'))
+    room_nights = RoomNight.objects.filter(
+        room_inventory__property_id=property_id,
+        night__gte=start_date,
+        night__lte=end_date
+    ).order_by('room_inventory_id', 'night').values_list(
+        'room_inventory_id', 'night', 'capacity', 'booked', 'is_open', 'effective_price').iterator(chunk_size=chunk_size)
+    stored = next(room_nights, None)
+    total_nights = (end_date - start_date).days + 1
+    for room_id, room_name, num_of_rooms, default_price in rooms:
+        while stored is not None and stored[0] < room_id:
+            stored = next(room_nights, None)
+        for offset in range(total_nights):
+            night = start_date + timedelta(days=offset)
+            if stored is not None and stored[:2] == (room_id, night):
+                _, _, capacity, booked, is_open, price = stored
+                stored = next(room_nights, None)
+            else:
+                capacity, booked, is_open, price = num_of_rooms, 0, True, default_price
+            yield room_id, room_name, night, capacity, booked, max(capacity - booked, 0) if is_open else 0, is_open, price
+
+
+def stream_csv(room_nights):
+    """Encode `iter_room_nights` rows as CSV lines, one chunk per row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for room_id, room_name, night, capacity, booked, available_rooms, is_open, price in room_nights:
+        yield writer.writerow((room_id, room_name, night.isoformat(), capacity, booked, available_rooms, int(is_open), price))
+
+
+def _ical_text(value):
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ical_line(line):
+    """Fold a content line at 75 octets, continuation lines starting with a space (RFC 5545 3.1)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= ICAL_LINE_LENGTH:
+        return line + '\r\n'
+    parts, start, limit = [], 0, ICAL_LINE_LENGTH
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, ICAL_LINE_LENGTH - 1
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def stream_ical(property, room_nights):
+    """Encode `iter_room_nights` rows as an iCalendar feed, one all-day event per room and night."""
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(_ical_line(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Houmuch//Inventory export//EN', 'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ical_text(property.hotel_nick_name)}'))
+    for room_id, room_name, night, capacity, booked, available_rooms, is_open, price in room_nights:
+        summary = f'{room_name}: {available_rooms} available at {price:g}' if is_open else f'{room_name}: closed'
+        yield ''.join(_ical_line(line) for line in (
+            'BEGIN:VEVENT',
+            f'UID:room-{room_id}-{night:%Y%m%d}@houmuch',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;VALUE=DATE:{night:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{night + timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{_ical_text(summary)}',
+            f'DESCRIPTION:{_ical_text(f"capacity={capacity} booked={booked} available={available_rooms} price={price:g}")}',
+            'TRANSP:TRANSPARENT',
+            'END:VEVENT'))
+    yield _ical_line('END:VCALENDAR')
@@ -12,8 +12,8 @@ class RoomInventoryFilter(filters.FilterSet):
 
 
 class BookingFilter(filters.FilterSet):
-    start_date = filters.DateFilter(field_name="check_in_date__date", lookup_expr='gte')
-    end_date = filters.DateFilter(field_name="check_in_date__date", lookup_expr='lte')
+    start_date = filters.DateFilter(field_name="check_in", lookup_expr='gte')
+    end_date = filters.DateFilter(field_name="check_in", lookup_expr='lte')
     is_complete = filters.BooleanFilter(method="filter_by_is_complete")
     is_cancel = filters.BooleanFilter(method='filter_by_is_cancel')
     is_today = filters.BooleanFilter(method='filter_by_is_today')
@@ -23,11 +23,11 @@ class BookingFilter(filters.FilterSet):
         fields = ['start_date', 'end_date', 'is_complete', 'is_cancel', 'is_today']
 
     def filter_by_is_today(self, queryset, name, value):
-        today = timezone.now().date()
+        today = timezone.localdate()
         if value:
-            return queryset.filter(check_in_date__date=today)
+            return queryset.filter(check_in=today)
         else:
-            return queryset.exclude(check_in_date__date=today)
+            return queryset.exclude(check_in=today)
 
     def filter_by_is_cancel(self, queryset, name, value):
         if value:
@@ -36,11 +36,11 @@ class BookingFilter(filters.FilterSet):
             return queryset.exclude(is_cancel=True)
 
     def filter_by_is_complete(self, queryset, name, value):
-        today = timezone.now().date()
+        today = timezone.localdate()
         if value:
-            return queryset.filter(check_out_date__date__lt=today)
+            return queryset.filter(check_out__lt=today)
         else:
-            return queryset.exclude(check_out_date__date__lt=today)
+            return queryset.exclude(check_out__lt=today)
 
 
 class TransactionFilter(filters.FilterSet):
@@ -0,0 +1,107 @@
+import csv
+import tempfile
+from datetime import date
+from django.conf import settings
+from django.db import connection, transaction
+from hotel_app_backend.messages import IMPORT_HEADER_MESSAGE, IMPORT_ROOM_MESSAGE, IMPORT_VALUE_MESSAGE, \
+    IMPORT_PRICE_RANGE_MESSAGE, IMPORT_ROW_LIMIT_MESSAGE
+from .models import RoomInventory, UpdateType
+from .utils import bulk_refresh_room_nights
+
+IMPORT_COLUMNS = ('room_id', 'date', 'default_price', 'deal_price', 'min_price', 'max_price', 'num_of_rooms', 'status')
+STATUS_VALUES = {'open': True, 'closed': False, 'true': True, 'false': False, '1': True, '0': False}
+MAX_REPORTED_ERRORS = 50
+
+CREATE_STAGING_TABLE = """
+CREATE TEMPORARY TABLE inventory_import (
+    line integer, room_inventory_id integer, night date, default_price integer, deal_price integer,
+    min_price integer, max_price integer, num_of_rooms integer, status boolean
+) ON COMMIT DROP
+"""
+
+# The last line of a room and night wins; existing overrides, soft-deleted ones included, are
+# overwritten in place and detached from the multi-range request they came from.
+MERGE_STAGING_TABLE = """
+INSERT INTO hotel_updateinventoryperiod (
+    room_inventory_id, type_id, request_id, default_price, deal_price, min_price, max_price, num_of_rooms, date, night,
+    status, is_deleted, deleted_at, created_at, updated_at
+)
+SELECT DISTINCT ON (room_inventory_id, night)
+    room_inventory_id, %(type_id)s, NULL, default_price, deal_price, min_price, max_price, num_of_rooms,
+    night::timestamp AT TIME ZONE %(time_zone)s, night, status, false, NULL, now(), now()
+FROM inventory_import
+ORDER BY room_inventory_id, night, line DESC
+ON CONFLICT (room_inventory_id, night) DO UPDATE SET
+    type_id = EXCLUDED.type_id, request_id = NULL, default_price = EXCLUDED.default_price, deal_price = EXCLUDED.deal_price,
+    min_price = EXCLUDED.min_price, max_price = EXCLUDED.max_price, num_of_rooms = EXCLUDED.num_of_rooms,
+    date = EXCLUDED.date, status = EXCLUDED.status, is_deleted = false, deleted_at = NULL, updated_at = EXCLUDED.updated_at
+"""
+
+STAGED_RANGE = 'SELECT array_agg(DISTINCT room_inventory_id), min(night), max(night) FROM inventory_import'
+
+
+def _parse_count(value, required=True):
+    value = (value or '').strip()
+    if not value and not required:
+        return None
+    number = int(value)
+    if number < 0:
+        raise ValueError(value)
+    return number
+
+
+def get_import_type_id():
+    return UpdateType.objects.filter(type__iexact=settings.INVENTORY_IMPORT_UPDATE_TYPE).values_list('id', flat=True).first()
+
+
+def validate_inventory_csv(lines, room_ids, staging_file):
+    """Validate an inventory CSV and write its rows, normalized for COPY, to `staging_file`."""
+    reader = csv.DictReader(lines)
+    missing = set(IMPORT_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        return 0, [{'line': 1, 'error': IMPORT_HEADER_MESSAGE.format(columns=', '.join(sorted(missing)))}]
+    writer = csv.writer(staging_file)
+    rows, errors = 0, []
+    for row in reader:
+        rows += 1
+        if rows > settings.INVENTORY_IMPORT_MAX_ROWS:
+            errors.append({'line': reader.line_num, 'error': IMPORT_ROW_LIMIT_MESSAGE.format(rows=settings.INVENTORY_IMPORT_MAX_ROWS)})
+            break
+        try:
+            room_id = int(row['room_id'])
+            night = date.fromisoformat(row['date'].strip())
+            default_price, min_price, max_price, num_of_rooms = (
+                _parse_count(row[column]) for column in ('default_price', 'min_price', 'max_price', 'num_of_rooms'))
+            deal_price = _parse_count(row['deal_price'], required=False)
+            status = STATUS_VALUES[row['status'].strip().lower()]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            errors.append({'line': reader.line_num, 'error': IMPORT_VALUE_MESSAGE})
+        else:
+            if room_id not in room_ids:
+                errors.append({'line': reader.line_num, 'error': IMPORT_ROOM_MESSAGE.format(room_id=room_id)})
+            elif min_price > max_price:
+                errors.append({'line': reader.line_num, 'error': IMPORT_PRICE_RANGE_MESSAGE})
+            elif not errors:
+                writer.writerow((reader.line_num, room_id, night.isoformat(), default_price,
+                                 '' if deal_price is None else deal_price, min_price, max_price, num_of_rooms, status))
+        if len(errors) >= MAX_REPORTED_ERRORS:
+            break
+    return rows, errors
+
+
+def import_inventory_overrides(lines, property_id):
+    """Upsert the overrides of an inventory CSV through a COPY-loaded staging table; nothing is written on errors."""
+    room_ids = set(RoomInventory.objects.filter(property_id=property_id).values_list('id', flat=True))
+    with tempfile.SpooledTemporaryFile(max_size=settings.INVENTORY_IMPORT_SPOOL_BYTES, mode='w+', newline='') as staging_file:
+        rows, errors = validate_inventory_csv(lines, room_ids, staging_file)
+        if errors or not rows:
+            return rows, errors
+        staging_file.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_TABLE)
+            cursor.cursor.copy_expert('COPY inventory_import FROM STDIN WITH (FORMAT csv)', staging_file)
+            cursor.execute(MERGE_STAGING_TABLE, {'type_id': get_import_type_id(), 'time_zone': settings.TIME_ZONE})
+            cursor.execute(STAGED_RANGE)
+            imported_room_ids, start_date, end_date = cursor.fetchone()
+            bulk_refresh_room_nights(RoomInventory.objects.filter(id__in=imported_room_ids), start_date, end_date)
+    return rows, errors
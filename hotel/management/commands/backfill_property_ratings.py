@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from hotel.models import Property
+from hotel.utils import refresh_property_ratings
+
+
+class Command(BaseCommand):
+    help = 'Populate Property.average_rating and Property.rating_count from existing ratings.'
+
+    def handle(self, *args, **options):
+        updated = refresh_property_ratings(Property.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Updated rating aggregates of {updated} properties.'))
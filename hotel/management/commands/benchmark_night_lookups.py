@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localdate
+from hotel.models import RoomInventory, BookingHistory, UpdateInventoryPeriod
+from hotel.utils import get_stay_range
+
+
+class Command(BaseCommand):
+    help = ('Compare date lookups that cast DateTimeField columns (`date__date`, `check_in_date__date`) with the '
+            'indexed night columns and the GiST indexed `stay` range on the current data, e.g. after `seed_perf_data`.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=200, help='Rooms sampled for the per-room lookups.')
+        parser.add_argument('--nights', type=int, default=7, help='Length of the stay window of every lookup.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per lookup; the median is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of every lookup.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rooms = list(RoomInventory.objects.values_list('id', 'property_id'))
+        if not rooms:
+            raise CommandError('No rooms to benchmark, generate data with seed_perf_data first.')
+        today = localdate()
+        windows = [(room_id, property_id, today + timedelta(days=rng.randrange(60)))
+                   for room_id, property_id in rng.sample(rooms, min(options['rooms'], len(rooms)))]
+        nights = options['nights'] - 1
+
+        lookups = {
+            'overrides of a stay': (
+                lambda room_id, property_id, first: UpdateInventoryPeriod.objects.filter(
+                    room_inventory_id=room_id, date__date__gte=first, date__date__lte=first + timedelta(days=nights),
+                    is_deleted=False, status=True),
+                lambda room_id, property_id, first: UpdateInventoryPeriod.objects.filter(
+                    room_inventory_id=room_id, night__gte=first, night__lte=first + timedelta(days=nights),
+                    is_deleted=False, status=True)
+            ),
+            'bookings overlapping a stay': (
+                lambda room_id, property_id, first: BookingHistory.objects.filter(
+                    rooms_id=room_id, check_in_date__date__lte=first + timedelta(days=nights), check_out_date__date__gte=first),
+                lambda room_id, property_id, first: BookingHistory.objects.filter(
+                    rooms_id=room_id, check_in__lte=first + timedelta(days=nights), check_out__gte=first)
+            ),
+            'bookings overlapping a stay range': (
+                lambda room_id, property_id, first: BookingHistory.objects.filter(
+                    rooms_id=room_id, check_in_date__date__lte=first + timedelta(days=nights), check_out_date__date__gte=first),
+                lambda room_id, property_id, first: BookingHistory.objects.filter(
+                    rooms_id=room_id, stay__overlap=get_stay_range(first, first + timedelta(days=nights + 1)))
+            ),
+            'bookings checking in on a day': (
+                lambda room_id, property_id, first: BookingHistory.objects.filter(property_id=property_id, check_in_date__date=first),
+                lambda room_id, property_id, first: BookingHistory.objects.filter(property_id=property_id, check_in=first)
+            ),
+        }
+        for name, (cast_lookup, night_lookup) in lookups.items():
+            cast_ms = self.measure(cast_lookup, windows, options['repeat'])
+            night_ms = self.measure(night_lookup, windows, options['repeat'])
+            self.stdout.write(f'{name}: {cast_ms:.1f} ms with casts, {night_ms:.1f} ms with indexed columns '
+                              f'({cast_ms / max(night_ms, 0.001):.1f}x) for {len(windows)} lookups')
+            if options['explain']:
+                self.stdout.write(cast_lookup(*windows[0]).explain())
+                self.stdout.write(night_lookup(*windows[0]).explain())
+        self.stdout.write(self.style.SUCCESS('Benchmark finished.'))
+
+    def measure(self, lookup, windows, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for window in windows:
+                list(lookup(*window).values_list('id', flat=True))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
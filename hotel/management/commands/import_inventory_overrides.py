@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hotel.import_utils import import_inventory_overrides, IMPORT_COLUMNS
+from hotel.models import Property
+
+
+class Command(BaseCommand):
+    help = f'Import per-night inventory overrides of a property from a CSV with the columns {", ".join(IMPORT_COLUMNS)}.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import.')
+        parser.add_argument('--property', type=int, required=True, help='Property whose rooms the file updates.')
+
+    def handle(self, *args, **options):
+        if not Property.objects.filter(id=options['property']).exists():
+            raise CommandError(f"Property {options['property']} does not exist.")
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            rows, errors = import_inventory_overrides(lines, options['property'])
+        if errors:
+            for error in errors:
+                self.stderr.write(f"line {error['line']}: {error['error']}")
+            raise CommandError('The inventory file has errors, nothing was imported.')
+        self.stdout.write(self.style.SUCCESS(f'Imported {rows} inventory overrides in {time.perf_counter() - started:.2f}s.'))
@@ -0,0 +1,42 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Subquery, OuterRef
+from django.utils.timezone import localdate
+from hotel.models import RoomInventory, RoomNight, BookingHistory, UpdateInventoryPeriod
+from hotel.utils import bulk_refresh_room_nights, get_stay_nights
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RoomNight table from rooms, inventory overrides and confirmed bookings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ROOM_NIGHT_HORIZON_DAYS,
+                            help='Number of nights ahead to materialize for every room.')
+
+    def handle(self, *args, **options):
+        start_date = localdate()
+        horizon_date = start_date + timedelta(days=options['days'])
+        rooms = RoomInventory.objects.annotate(
+            last_check_out=Subquery(BookingHistory.objects.filter(rooms=OuterRef('pk'), check_out__isnull=False).order_by(
+                '-check_out').values('check_out')[:1]),
+            last_override=Subquery(UpdateInventoryPeriod.objects.filter(room_inventory=OuterRef('pk'), is_deleted=False,
+                                                                        night__isnull=False).order_by('-night').values('night')[:1])
+        )
+        # Rooms sharing an end date are rebuilt together with one availability build and batched upsert.
+        room_ids_by_end_date = defaultdict(list)
+        for room_id, last_check_out, last_override in rooms.values_list('id', 'last_check_out', 'last_override').iterator():
+            end_date = horizon_date
+            if last_check_out:
+                end_date = max(end_date, get_stay_nights(last_check_out, last_check_out)[1])
+            if last_override:
+                end_date = max(end_date, last_override)
+            room_ids_by_end_date[end_date].append(room_id)
+        with transaction.atomic():
+            RoomNight.objects.all().delete()
+            for end_date, room_ids in room_ids_by_end_date.items():
+                bulk_refresh_room_nights(RoomInventory.objects.filter(id__in=room_ids), start_date, end_date)
+        total_rooms = sum(len(room_ids) for room_ids in room_ids_by_end_date.values())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt room nights for {total_rooms} rooms up to {horizon_date}.'))
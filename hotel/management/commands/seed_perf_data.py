@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hotel.seed_utils import PerfDataGenerator, flush_perf_data, get_perf_data_filters
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of owners, properties, rooms, overrides, bookings, bids and ratings for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Dataset size; 1.0 is 100 owners, 1,000 properties and 2,000 customers.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed generates the same dataset.')
+        parser.add_argument('--past-days', type=int, default=90, help='Nights of booking history before today.')
+        parser.add_argument('--future-days', type=int, default=180, help='Nights of inventory and bookings after today.')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Properties written per transaction.')
+        parser.add_argument('--flush', action='store_true', help='Delete previously generated data first.')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            deleted = flush_perf_data()
+            self.stdout.write(f'Deleted {sum(deleted.values())} generated rows.')
+        elif any(queryset.exists() for queryset in get_perf_data_filters()):
+            raise CommandError('Generated data already exists, rerun with --flush to replace it.')
+
+        started = time.perf_counter()
+        counts = PerfDataGenerator(
+            scale=options['scale'], seed=options['seed'], past_days=options['past_days'], future_days=options['future_days'],
+            chunk_size=options['chunk_size'], log=self.stdout.write
+        ).generate()
+        for model_name, total in counts.items():
+            self.stdout.write(f'{model_name}: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s.'))
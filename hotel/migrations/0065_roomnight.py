@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0064_rename_roominventory_propertydeal_room_inventory_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('capacity', models.IntegerField(default=0)),
+                ('booked', models.IntegerField(default=0)),
+                ('is_open', models.BooleanField(default=True)),
+                ('effective_price', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('room_inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_nights', to='hotel.roominventory')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='roomnight',
+            constraint=models.UniqueConstraint(fields=('room_inventory', 'night'), name='unique_room_inventory_night'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0065_roomnight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='average_rating',
+            field=models.FloatField(default=0, verbose_name='Average Rating'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count',
+            field=models.IntegerField(default=0, verbose_name='Rating Count'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:27
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_nights(apps, schema_editor):
+    UpdateInventoryPeriod = apps.get_model('hotel', 'UpdateInventoryPeriod')
+    UpdateInventoryPeriod.objects.filter(date__isnull=False).update(night=TruncDate('date'))
+
+
+# Re-adding a removed date used to insert a second row next to the soft-deleted one. Keep a single
+# row per room and night, preferring the live one and then the newest.
+DELETE_DUPLICATE_NIGHTS = """
+DELETE FROM hotel_updateinventoryperiod WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (PARTITION BY room_inventory_id, night ORDER BY is_deleted, id DESC) AS position
+        FROM hotel_updateinventoryperiod
+        WHERE room_inventory_id IS NOT NULL AND night IS NOT NULL
+    ) ranked
+    WHERE position > 1
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0066_property_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updateinventoryperiod',
+            name='night',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_nights, migrations.RunPython.noop),
+        migrations.RunSQL(DELETE_DUPLICATE_NIGHTS, migrations.RunSQL.noop),
+    ]
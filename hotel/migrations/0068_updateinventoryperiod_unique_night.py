@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0067_updateinventoryperiod_night'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='updateinventoryperiod',
+            constraint=models.UniqueConstraint(fields=('room_inventory', 'night'), name='unique_room_inventory_override_night'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:30
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_booking_nights(apps, schema_editor):
+    BookingHistory = apps.get_model('hotel', 'BookingHistory')
+    BookingHistory.objects.update(check_in=TruncDate('check_in_date'), check_out=TruncDate('check_out_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0007_remove_customer_deleted_at'),
+        ('hotel', '0068_updateinventoryperiod_unique_night'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinghistory',
+            name='check_in',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bookinghistory',
+            name='check_out',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_booking_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0069_bookinghistory_nights'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=models.Index(fields=['rooms', 'check_in', 'check_out'], name='booking_room_stay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=models.Index(fields=['property', 'check_in'], name='booking_property_check_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='updateinventoryperiod',
+            index=models.Index(fields=['room_inventory', 'night', 'is_deleted', 'status'], name='override_room_night_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:32
+
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+# Same nights as `get_stay_range`: check-in up to check-out, and the check-in night for a same-day stay.
+BACKFILL_STAYS = """
+UPDATE hotel_bookinghistory
+SET stay = daterange(check_in, GREATEST(check_out, check_in + 1), '[)')
+WHERE check_in IS NOT NULL AND check_out IS NOT NULL
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0070_night_indexes'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='bookinghistory',
+            name='stay',
+            field=django.contrib.postgres.fields.ranges.DateRangeField(blank=True, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_STAYS, migrations.RunSQL.noop),
+    ]
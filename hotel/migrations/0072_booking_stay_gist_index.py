@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:33
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0071_bookinghistory_stay'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['rooms', 'stay'], name='booking_room_stay_gist_idx'),
+        ),
+    ]
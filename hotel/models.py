@@ -2,6 +2,8 @@ from django.db import models
 from hotel_app_backend.validator import PhoneNumberRegex
 from django.contrib.gis.db import models as geo_models
 from django.contrib.gis.geos import Point
+from django.contrib.postgres.fields import DateRangeField
+from django.contrib.postgres.indexes import GistIndex
 from customer.models import Customer
 from django.core.validators import RegexValidator
 
@@ -153,6 +155,8 @@ class Property(models.Model):
     is_cancellation = models.BooleanField('Is Cancellation Allowed', default=False)
     status = models.BooleanField('Status', default=False)
     is_verified = models.BooleanField('Is Verified', default=False)
+    average_rating = models.FloatField('Average Rating', default=0)
+    rating_count = models.IntegerField('Rating Count', default=0)
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, blank=True, null=True)
 
@@ -233,6 +237,7 @@ class UpdateInventoryPeriod(models.Model):
     max_price = models.IntegerField(('Max Price'), default=0)
     num_of_rooms = models.IntegerField(("Num Of Rooms"), default=0)
     date = models.DateTimeField(blank=True, null=True)
+    night = models.DateField(blank=True, null=True)
     request = models.ForeignKey(UpdateRequest, on_delete=models.CASCADE, related_name="update_request", null=True)
     status = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
@@ -243,6 +248,32 @@ class UpdateInventoryPeriod(models.Model):
     def __str__(self):
         return self.type.type
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room_inventory', 'night'], name='unique_room_inventory_override_night')
+        ]
+        indexes = [
+            models.Index(fields=['room_inventory', 'night', 'is_deleted', 'status'], name='override_room_night_idx')
+        ]
+
+
+class RoomNight(models.Model):
+    room_inventory = models.ForeignKey(RoomInventory, on_delete=models.CASCADE, related_name='room_nights')
+    night = models.DateField()
+    capacity = models.IntegerField(default=0)
+    booked = models.IntegerField(default=0)
+    is_open = models.BooleanField(default=True)
+    effective_price = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.room_inventory_id} {self.night}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room_inventory', 'night'], name='unique_room_inventory_night')
+        ]
+
 
 class RoomImage(models.Model):
     room = models.ForeignKey(RoomInventory, on_delete=models.CASCADE, blank=True, null=True)
@@ -313,6 +344,9 @@ class BookingHistory(models.Model):
     transfer_id = models.CharField(max_length=20, null=True)
     check_in_date = models.DateTimeField()
     check_out_date = models.DateTimeField()
+    check_in = models.DateField(blank=True, null=True)
+    check_out = models.DateField(blank=True, null=True)
+    stay = DateRangeField(blank=True, null=True)
     amount = models.FloatField()
     currency = models.CharField(max_length=3)
     is_cancel = models.BooleanField(default=False)
@@ -328,6 +362,13 @@ class BookingHistory(models.Model):
     def __str__(self):
         return self.property.hotel_nick_name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['rooms', 'check_in', 'check_out'], name='booking_room_stay_idx'),
+            models.Index(fields=['property', 'check_in'], name='booking_property_check_in_idx'),
+            GistIndex(fields=['rooms', 'stay'], name='booking_room_stay_gist_idx')
+        ]
+
 
 class GuestDetail(models.Model):
     booking = models.ForeignKey(BookingHistory, on_delete=models.CASCADE, related_name='booking_history')
@@ -1,6 +1,10 @@
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from hotel_app_backend.messages import DATA_RETRIEVAL_MESSAGE
+from hotel_app_backend.messages import DATA_RETRIEVAL_MESSAGE, INVALID_CURSOR_MESSAGE
 
 
 class CustomPagination(PageNumberPagination):
@@ -19,3 +23,63 @@ class CustomPagination(PageNumberPagination):
             },
             'message': DATA_RETRIEVAL_MESSAGE
         })
+
+
+class KeysetPagination(CustomPagination):
+    """
+    Cursor pagination over the queryset's own ordering, e.g. `('cheapest_room_price', 'id')`. Each
+    page fetches `per_page + 1` rows after the last key of the previous page, and the response
+    carries an opaque `next_cursor` instead of page counts. The ordering must end in a unique field.
+    """
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not self.ordering or len(self.ordering) != len(queryset.query.order_by):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.results = results[:self.page_size]
+        return self.results
+
+    def get_keyset_filter(self, position):
+        keyset_filter = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            preceding = {previous.lstrip('-'): position[i] for i, previous in enumerate(self.ordering[:index])}
+            keyset_filter |= Q(**preceding, **{f'{name}__{lookup}': position[index]})
+        return keyset_filter
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if cursor['ordering'] != self.ordering or len(cursor['position']) != len(self.ordering):
+                raise ValueError
+            return cursor['position']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+
+    def encode_cursor(self, instance):
+        position = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        cursor = json.dumps({'ordering': self.ordering, 'position': position}, default=str)
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    def get_paginated_response(self, data):
+        return Response({
+            'result': True,
+            'data': data,
+            'pagination': {
+                'per_page': self.page_size,
+                'next_cursor': self.encode_cursor(self.results[-1]) if self.has_next else None
+            },
+            'message': DATA_RETRIEVAL_MESSAGE
+        })
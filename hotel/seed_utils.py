@@ -0,0 +1,486 @@
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+import numpy as np
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from customer.models import Customer
+from .models import Category, Owner, PropertyType, RoomType, BedType, BathroomType, RoomFeature, CommonAmenities, \
+    Property, PropertyImage, PropertyCancellation, RoomInventory, RoomImage, UpdateType, UpdateInventoryPeriod, \
+    BookingHistory, GuestDetail, BiddingSession, PropertyDeal, BiddingAmount, Ratings, OwnerBankingDetail, \
+    BankingAddress, Product, SubscriptionPlan, SubscriptionTransaction, CancellationReason, RoomNight, OTP
+from .utils import refresh_property_ratings, bulk_refresh_room_nights, get_stay_range
+from hotel_app_backend.cache_utils import invalidate_search_cells
+
+SEED_CENTER = (72.8777, 19.0760)
+
+
+def _aware(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+def _first_or_create(model, defaults=None, **lookup):
+    return model.objects.filter(**lookup).order_by('id').first() or model.objects.create(**lookup, **(defaults or {}))
+
+
+def get_masters():
+    """Master rows every generated owner, property and room points to, reusing existing ones by name."""
+    return SimpleNamespace(
+        category=_first_or_create(Category, category='Gold', defaults={'bid_time_duration': 5}),
+        property_type=_first_or_create(PropertyType, property_type='Hotel'),
+        room_types=[_first_or_create(RoomType, room_type=name) for name in ('Deluxe', 'Suite')],
+        bed_type=_first_or_create(BedType, bed_type='King'),
+        bathroom_type=_first_or_create(BathroomType, bathroom_type='Attached'),
+        room_feature=_first_or_create(RoomFeature, room_feature='Balcony'),
+        common_amenity=_first_or_create(CommonAmenities, common_ameninity='Wifi'),
+        update_types=[_first_or_create(UpdateType, type=name) for name in ('Single', 'Range', 'Multi Range')],
+        cancellation_reason=_first_or_create(CancellationReason, reason='Change of plans')
+    )
+
+
+def create_owner(masters, phone_number='9000000000'):
+    """A verified owner with a banking account and an active subscription, bypassing the mail and payment signals."""
+    owner = Owner.objects.bulk_create([Owner(
+        hotel_name='Seed Hotels', category=masters.category, email=f'owner{phone_number}@example.com',
+        phone_number=phone_number, address='Seed Address', is_verified=True, is_email_verified=True,
+        welcome_mail_sent=True, is_active=True
+    )])[0]
+    banking_detail = OwnerBankingDetail.objects.create(
+        hotel_owner=owner, email=owner.email, phone=phone_number, contact_name='Seed Owner', type='route',
+        account_id='acc_seed', legal_business_name='Seed Hotels', business_type='partnership'
+    )
+    BankingAddress.objects.create(owner_banking=banking_detail, street1='Street 1', street2='Street 2', city='Mumbai',
+                                  state='Maharashtra', postal_code='400001')
+    Product.objects.create(product_id='acc_prd_seed', owner_banking=banking_detail, settlements_account_number='1234567890',
+                           settlements_ifsc_code='HDFC0000001', settlements_beneficiary_name='Seed Owner')
+    plan = SubscriptionPlan.objects.bulk_create([SubscriptionPlan(name='Monthly', price=999, duration=3,
+                                                                  description='Monthly plan', razorpay_plan_id='plan_seed')])[0]
+    SubscriptionTransaction.objects.create(subscription_plan=plan, owner=owner, razorpay_subscription_id='sub_seed',
+                                           payment_status=True)
+    return owner
+
+
+def seed_dataset(num_of_properties, seed=0, rooms_per_property=2, ratings_per_property=3, horizon_days=60):
+    """
+    Seed `num_of_properties` verified properties around SEED_CENTER for a single owner, each with rooms,
+    images, a cancellation policy, an inventory override, a confirmed booking, a bidding deal and ratings
+    from a single customer, so every owner and customer endpoint has `num_of_properties` rows to page
+    through. Rows are written with `bulk_create` and signals are replayed in bulk afterwards.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    with transaction.atomic():
+        masters = get_masters()
+        owner = create_owner(masters)
+        customer = Customer.objects.create(first_name='Seed', last_name='Customer', email='customer@example.com',
+                                           phone_number='8000000000', device_id='device_id', fcm_token='fcm_token')
+        properties = Property.objects.bulk_create([
+            Property(
+                hotel_nick_name=f'Seed Property {index}', manager_name='Manager', hotel_phone_number='9000000000',
+                number_of_rooms=rooms_per_property * 10, check_in_time='12:00 PM', check_out_time='11:00 AM',
+                location=Point(SEED_CENTER[0] + rng.uniform(-0.05, 0.05), SEED_CENTER[1] + rng.uniform(-0.05, 0.05),
+                               srid=4326),
+                nearby_popular_landmark='Landmark', owner=owner, property_type=masters.property_type,
+                hotel_class=rng.randint(1, 5), is_cancellation=True, status=True, is_verified=True
+            )
+            for index in range(num_of_properties)
+        ])
+        Property.room_types.through.objects.bulk_create([
+            Property.room_types.through(property_id=property.id, roomtype_id=room_type.id)
+            for property in properties for room_type in masters.room_types
+        ])
+        PropertyImage.objects.bulk_create([
+            PropertyImage(property=property, image=f'properties/{property.id}/{index}.jpg')
+            for property in properties for index in range(2)
+        ])
+        PropertyCancellation.objects.bulk_create([
+            PropertyCancellation(property=property, cancellation_days=2, cancellation_percents=50) for property in properties
+        ])
+
+        rooms = RoomInventory.objects.bulk_create([
+            RoomInventory(
+                property=property, room_name=f'Room {index}', floor=index + 1, room_view='City', area_sqft=300,
+                room_type=masters.room_types[index % len(masters.room_types)], bathroom_type=masters.bathroom_type,
+                num_of_rooms=10, adult_capacity=2, children_capacity=1, default_price=price, deal_price=price - 500,
+                min_price=price - 1000, max_price=price + 1000, is_verified=True, status=True
+            )
+            for property in properties for index in range(rooms_per_property)
+            for price in [rng.randrange(2000, 9000, 100)]
+        ])
+        for through_model, field_name, target in (
+            (RoomInventory.bed_type.through, 'bedtype_id', masters.bed_type),
+            (RoomInventory.room_features.through, 'roomfeature_id', masters.room_feature),
+            (RoomInventory.common_amenities.through, 'commonamenities_id', masters.common_amenity),
+        ):
+            through_model.objects.bulk_create([through_model(roominventory_id=room.id, **{field_name: target.id})
+                                               for room in rooms])
+        RoomImage.objects.bulk_create([RoomImage(room=room, image=f'rooms/{room.id}.jpg') for room in rooms])
+        UpdateInventoryPeriod.objects.bulk_create([
+            UpdateInventoryPeriod(
+                room_inventory=room, type=masters.update_types[0], date=_aware(night, 0), night=night,
+                default_price=room.default_price + 500, deal_price=room.deal_price, min_price=room.min_price,
+                max_price=room.max_price + 500, num_of_rooms=room.num_of_rooms - 2
+            )
+            for room, night in ((room, today + timedelta(days=rng.randrange(horizon_days))) for room in rooms)
+        ])
+
+        sessions = BiddingSession.objects.bulk_create([
+            BiddingSession(is_open=False, no_of_adults=2, no_of_children=0, num_of_rooms=1, customer=customer,
+                           check_in_date=_aware(today + timedelta(days=7)), check_out_date=_aware(today + timedelta(days=9)))
+            for _ in properties
+        ])
+        deals = PropertyDeal.objects.bulk_create([
+            PropertyDeal(session=session, customer=customer, room_inventory=room, is_winning_bid=True)
+            for session, room in zip(sessions, rooms[::rooms_per_property])
+        ])
+        BiddingAmount.objects.bulk_create([BiddingAmount(property_deal=deal, amount=deal.room_inventory.deal_price)
+                                           for deal in deals])
+
+        bookings = []
+        for index, (property, room) in enumerate(zip(properties, rooms[::rooms_per_property])):
+            check_in_date = today + timedelta(days=rng.randrange(3, horizon_days - 3))
+            nights = rng.randint(1, 3)
+            bookings.append(BookingHistory(
+                booking_id=f'S{seed:02d}{index:06d}', property=property, customer=customer, num_of_rooms=rng.randint(1, 3),
+                rooms=room, order_id=f'order_seed_{index}', transfer_id=f'trf_seed_{index}', payment_id=f'pay_seed_{index}',
+                check_in_date=_aware(check_in_date), check_out_date=_aware(check_in_date + timedelta(days=nights)),
+                check_in=check_in_date, check_out=check_in_date + timedelta(days=nights),
+                stay=get_stay_range(check_in_date, check_in_date + timedelta(days=nights)), amount=room.default_price * nights, currency='INR', book_status=True, is_confirmed=True
+            ))
+        bookings = BookingHistory.objects.bulk_create(bookings)
+        GuestDetail.objects.bulk_create([GuestDetail(booking=booking, no_of_adults=2, no_of_children=0) for booking in bookings])
+        Ratings.objects.bulk_create([
+            Ratings(property=property, customer=customer, ratings=rng.randint(1, 5), review='Seed review')
+            for property in properties for _ in range(ratings_per_property)
+        ])
+
+        property_queryset = Property.objects.filter(id__in=[property.id for property in properties])
+        refresh_property_ratings(property_queryset)
+        bulk_refresh_room_nights(RoomInventory.objects.filter(property__in=property_queryset), today,
+                                 today + timedelta(days=horizon_days))
+    return SimpleNamespace(masters=masters, owner=owner, customer=customer, properties=properties, rooms=rooms,
+                           bookings=bookings, deals=deals)
+
+
+PERF_EMAIL_DOMAIN = 'perf.houmuch.test'
+SEED_CLUSTERS = (
+    ('Mumbai', 72.8777, 19.0760, 5), ('Delhi', 77.2090, 28.6139, 5), ('Bengaluru', 77.5946, 12.9716, 4),
+    ('Goa', 73.8278, 15.4989, 3), ('Chennai', 80.2707, 13.0827, 3), ('Hyderabad', 78.4867, 17.3850, 3),
+    ('Jaipur', 75.7873, 26.9124, 2), ('Kolkata', 88.3639, 22.5726, 2), ('Udaipur', 73.7125, 24.5854, 1),
+    ('Manali', 77.1892, 32.2432, 1)
+)
+PEAK_SEASONS = (((12, 15), (1, 5), 1.6), ((4, 25), (6, 15), 1.35), ((10, 15), (11, 15), 1.2))
+WEEKEND_MULTIPLIER = 1.15
+REVIEWS = ('Great stay', 'Clean rooms', 'Friendly staff', 'Average experience', 'Would visit again')
+
+
+def get_season_multiplier(night):
+    """Price multiplier of a night: its peak season, if any, times the Friday/Saturday uplift."""
+    multiplier = 1.0
+    key = (night.month, night.day)
+    for start, end, peak_multiplier in PEAK_SEASONS:
+        if (start <= key <= end) if start <= end else (key >= start or key <= end):
+            multiplier = peak_multiplier
+            break
+    return multiplier * WEEKEND_MULTIPLIER if night.weekday() in (4, 5) else multiplier
+
+
+class PerfDataGenerator:
+    """
+    Load-testing dataset that grows linearly with `scale`. One unit is 100 owners, 1,000 properties
+    clustered around popular destinations, 2,000 customers and 2,000 bidding sessions, plus seasonal
+    inventory overrides and bookings that overlap up to each room's capacity. Properties are written
+    in chunks with `bulk_create`, so memory stays flat and no per-row signal runs; RoomNight rows and
+    rating aggregates are rebuilt once per chunk instead.
+    """
+    owners_per_scale = 100
+    properties_per_scale = 1000
+    customers_per_scale = 2000
+    sessions_per_scale = 2000
+    base_occupancy = 0.45
+    cancel_rate = 0.07
+    pending_rate = 0.03
+
+    def __init__(self, scale=1.0, seed=0, past_days=90, future_days=180, chunk_size=100, batch_size=5000, log=None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.scale = scale
+        self.today = timezone.localdate()
+        self.future_days = future_days
+        self.start_date = self.today - timedelta(days=past_days)
+        self.nights = [self.start_date + timedelta(days=offset) for offset in range(past_days + future_days)]
+        self.season = np.asarray([get_season_multiplier(night) for night in self.nights])
+        self.peak_offsets = np.flatnonzero(self.season > 1).tolist()
+        self.check_in_acceptance = np.minimum(self.base_occupancy * self.season, 1.0).tolist()
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.counts = defaultdict(int)
+        self.cluster_rooms = defaultdict(list)
+        self.num_of_bookings = 0
+
+    def scaled(self, count):
+        return max(int(round(count * self.scale)), 1)
+
+    def bulk_create(self, model, objects):
+        objects = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] += len(objects)
+        return objects
+
+    def generate(self):
+        self.masters = get_masters()
+        with transaction.atomic():
+            owners = self.create_owners(self.scaled(self.owners_per_scale))
+            customer_ids = self.create_customers(self.scaled(self.customers_per_scale))
+        total_properties = self.scaled(self.properties_per_scale)
+        for offset in range(0, total_properties, self.chunk_size):
+            count = min(self.chunk_size, total_properties - offset)
+            with transaction.atomic():
+                self.create_properties(offset, count, owners, customer_ids)
+            self.log(f'{offset + count}/{total_properties} properties')
+        total_sessions = self.scaled(self.sessions_per_scale)
+        for offset in range(0, total_sessions, self.batch_size):
+            with transaction.atomic():
+                self.create_bidding_sessions(min(self.batch_size, total_sessions - offset), customer_ids)
+        return dict(self.counts)
+
+    def create_owners(self, count):
+        owners = self.bulk_create(Owner, [
+            Owner(hotel_name=f'Perf Hotels {index}', category=self.masters.category, email=f'owner{index}@{PERF_EMAIL_DOMAIN}',
+                  phone_number=f'6{self.seed % 10}{index:08d}', address=f'{index} Perf Street', is_verified=True,
+                  is_email_verified=True, welcome_mail_sent=True, is_active=True, bidding_mode=self.rng.random() < 0.5)
+            for index in range(count)
+        ])
+        banking_details = self.bulk_create(OwnerBankingDetail, [
+            OwnerBankingDetail(hotel_owner=owner, email=owner.email, phone=owner.phone_number, contact_name='Perf Owner',
+                               type='route', account_id=f'acc_perf{owner.id}', legal_business_name='Perf Hotels',
+                               business_type='partnership')
+            for owner in owners
+        ])
+        self.bulk_create(Product, [
+            Product(product_id=f'acc_prd_perf{banking_detail.id}', owner_banking=banking_detail,
+                    settlements_account_number='1234567890', settlements_ifsc_code='HDFC0000001',
+                    settlements_beneficiary_name='Perf Owner')
+            for banking_detail in banking_details
+        ])
+        return owners
+
+    def create_customers(self, count):
+        return [customer.id for customer in self.bulk_create(Customer, [
+            Customer(first_name='Perf', last_name=f'Customer {index}', email=f'customer{index}@{PERF_EMAIL_DOMAIN}',
+                     phone_number=f'7{self.seed % 10}{index:08d}', device_id=f'device-{index}')
+            for index in range(count)
+        ])]
+
+    def create_properties(self, offset, count, owners, customer_ids):
+        rng = self.rng
+        clusters = rng.choices(SEED_CLUSTERS, weights=[weight for *_, weight in SEED_CLUSTERS], k=count)
+        hotel_classes = rng.choices(range(1, 6), weights=(1, 3, 5, 3, 1), k=count)
+        room_plans = [
+            [(rng.choice(self.masters.room_types), rng.randint(2, 10), int(round(1200 * hotel_class * rng.uniform(0.8, 1.6), -2)))
+             for _ in range(rng.randint(2, 6))]
+            for hotel_class in hotel_classes
+        ]
+        properties = self.bulk_create(Property, [
+            Property(
+                hotel_nick_name=f'{name} Stay {offset + index}', manager_name='Perf Manager', hotel_phone_number=owner.phone_number,
+                number_of_rooms=sum(num_of_rooms for _, num_of_rooms, _ in room_plan), check_in_time='12:00 PM',
+                check_out_time='11:00 AM', location=Point(longitude + rng.gauss(0, 0.08), latitude + rng.gauss(0, 0.08), srid=4326),
+                nearby_popular_landmark=f'{name} Central', owner=owner, property_type=self.masters.property_type,
+                hotel_class=hotel_class, pet_friendly=rng.random() < 0.3, breakfast_included=rng.random() < 0.5,
+                is_cancellation=True, status=True, is_verified=True
+            )
+            for index, ((name, longitude, latitude, _), hotel_class, room_plan, owner) in enumerate(
+                zip(clusters, hotel_classes, room_plans, rng.choices(owners, k=count)))
+        ])
+        self.bulk_create(Property.room_types.through, [
+            Property.room_types.through(property_id=property.id, roomtype_id=room_type_id)
+            for property, room_plan in zip(properties, room_plans)
+            for room_type_id in {room_type.id for room_type, _, _ in room_plan}
+        ])
+        self.bulk_create(PropertyImage, [PropertyImage(property=property, image=f'properties/perf/{property.id}/{index}.jpg')
+                                         for property in properties for index in range(3)])
+        self.bulk_create(PropertyCancellation, [
+            PropertyCancellation(property=property, cancellation_days=days, cancellation_percents=percents)
+            for property in properties for days, percents in ((7, 10), (2, 50))
+        ])
+        rooms = self.bulk_create(RoomInventory, [
+            RoomInventory(
+                property=property, room_name=f'{room_type.room_type} {index + 1}', floor=index + 1, room_view='City',
+                area_sqft=250 + 50 * index, room_type=room_type, bathroom_type=self.masters.bathroom_type,
+                num_of_rooms=num_of_rooms, adult_capacity=2, children_capacity=1, default_price=price,
+                deal_price=int(price * 0.85), min_price=int(price * 0.7), max_price=int(price * 1.3), is_verified=True, status=True
+            )
+            for property, room_plan in zip(properties, room_plans)
+            for index, (room_type, num_of_rooms, price) in enumerate(room_plan)
+        ])
+        for through_model, field_name, target in (
+            (RoomInventory.bed_type.through, 'bedtype_id', self.masters.bed_type),
+            (RoomInventory.room_features.through, 'roomfeature_id', self.masters.room_feature),
+            (RoomInventory.common_amenities.through, 'commonamenities_id', self.masters.common_amenity),
+        ):
+            self.bulk_create(through_model, [through_model(roominventory_id=room.id, **{field_name: target.id}) for room in rooms])
+        self.bulk_create(RoomImage, [RoomImage(room=room, image=f'rooms/perf/{room.id}.jpg') for room in rooms])
+        self.create_overrides(rooms)
+        self.create_bookings(rooms, customer_ids)
+        self.bulk_create(Ratings, [
+            Ratings(property=property, customer_id=rng.choice(customer_ids), review=rng.choice(REVIEWS),
+                    ratings=rng.choices(range(1, 6), weights=(1, 2, 5, 10, 7))[0])
+            for property in properties for _ in range(rng.randint(0, 25))
+        ])
+        cluster_of = {property.id: name for property, (name, *_) in zip(properties, clusters)}
+        for room in rooms:
+            self.cluster_rooms[cluster_of[room.property_id]].append((room.id, room.deal_price))
+
+        property_ids = [property.id for property in properties]
+        refresh_property_ratings(Property.objects.filter(id__in=property_ids))
+        bulk_refresh_room_nights(RoomInventory.objects.filter(property_id__in=property_ids), self.today,
+                                 self.today + timedelta(days=self.future_days), batch_size=self.batch_size)
+        self.counts['RoomNight'] += len(rooms) * (self.future_days + 1)
+
+    def create_overrides(self, rooms):
+        """Per-night price overrides on peak and weekend nights, and a few closed maintenance nights."""
+        overrides = []
+        for room in rooms:
+            room_overrides = {}
+            for offset in self.peak_offsets:
+                price = int(round(room.default_price * self.season[offset], -2))
+                room_overrides[offset] = dict(default_price=price, deal_price=int(price * 0.85), min_price=int(price * 0.7),
+                                              max_price=int(price * 1.3), num_of_rooms=room.num_of_rooms)
+            if self.rng.random() < 0.1:
+                for offset in self.rng.sample(range(len(self.nights)), self.rng.randint(1, 3)):
+                    room_overrides[offset] = dict(default_price=room.default_price, num_of_rooms=0, status=False)
+            overrides.extend(
+                UpdateInventoryPeriod(room_inventory=room, type=self.masters.update_types[0], date=_aware(self.nights[offset], 0),
+                                      night=self.nights[offset], **fields)
+                for offset, fields in room_overrides.items()
+            )
+        self.bulk_create(UpdateInventoryPeriod, overrides)
+
+    def create_bookings(self, rooms, customer_ids):
+        """
+        Stays whose check-in nights follow the season, lasting 1-14 nights. A stay is only kept while the
+        room still has capacity on every night it covers, so bookings overlap as they would in production.
+        """
+        rng, total_nights = self.rng, len(self.nights)
+        bookings, guests = [], []
+        for room in rooms:
+            occupancy = np.zeros(total_nights, dtype=np.int64)
+            target = int(room.num_of_rooms * total_nights * self.base_occupancy / 3)
+            for _ in range(target * 2):
+                first = rng.randrange(total_nights)
+                if rng.random() > self.check_in_acceptance[first]:
+                    continue
+                nights = min(1 + int(rng.expovariate(1 / 1.7)), 14)
+                last = min(first + nights, total_nights)
+                num_of_rooms = 1 if rng.random() < 0.8 else rng.randint(2, 3)
+                if occupancy[first:last].max() + num_of_rooms > room.num_of_rooms:
+                    continue
+                roll = rng.random()
+                is_cancel, book_status = roll < self.cancel_rate, roll >= self.cancel_rate + self.pending_rate
+                if book_status and not is_cancel:
+                    occupancy[first:last] += num_of_rooms
+                self.num_of_bookings += 1
+                number = self.num_of_bookings
+                check_in_date = self.nights[first]
+                bookings.append(BookingHistory(
+                    booking_id=f'P{self.seed:03d}{number:09d}', property_id=room.property_id, customer_id=rng.choice(customer_ids),
+                    rooms=room, num_of_rooms=num_of_rooms, order_id=f'order_perf{number}', transfer_id=f'trf_perf{number}',
+                    payment_id=f'pay_perf{number}' if book_status else None, check_in_date=_aware(check_in_date, 14),
+                    check_out_date=_aware(check_in_date + timedelta(days=nights), 11), check_in=check_in_date,
+                    check_out=check_in_date + timedelta(days=nights), stay=get_stay_range(check_in_date, check_in_date + timedelta(days=nights)),
+                    amount=float(self.season[first:last].sum()) * room.default_price * num_of_rooms, currency='INR',
+                    is_cancel=is_cancel, cancel_date=timezone.now() if is_cancel else None, book_status=book_status or is_cancel,
+                    is_confirmed=book_status
+                ))
+                guests.append((rng.randint(1, 2 * num_of_rooms), rng.randint(0, num_of_rooms) if rng.random() < 0.3 else 0))
+        bookings = self.bulk_create(BookingHistory, bookings)
+        self.bulk_create(GuestDetail, [GuestDetail(booking=booking, no_of_adults=adults, no_of_children=children)
+                                       for booking, (adults, children) in zip(bookings, guests)])
+
+    def create_bidding_sessions(self, count, customer_ids):
+        """Sessions against 3-6 rooms of one destination, with falling quotes and a winner once closed."""
+        rng = self.rng
+        clusters = list(self.cluster_rooms)
+        sessions, room_choices = [], []
+        for _ in range(count):
+            cluster_rooms = self.cluster_rooms[rng.choice(clusters)]
+            check_in_date = self.today + timedelta(days=rng.randrange(1, max(self.future_days, 2)))
+            sessions.append(BiddingSession(
+                is_open=rng.random() < 0.05, no_of_adults=rng.randint(1, 4), no_of_children=rng.randint(0, 2),
+                num_of_rooms=rng.randint(1, 2), customer_id=rng.choice(customer_ids), check_in_date=_aware(check_in_date, 14),
+                check_out_date=_aware(check_in_date + timedelta(days=rng.randint(1, 4)), 11)
+            ))
+            room_choices.append(rng.sample(cluster_rooms, min(len(cluster_rooms), rng.randint(3, 6))))
+        sessions = self.bulk_create(BiddingSession, sessions)
+        deals, quotes = [], []
+        for session, rooms in zip(sessions, room_choices):
+            session_quotes = []
+            for _, deal_price in rooms:
+                amount, amounts = deal_price * rng.uniform(1.0, 1.2), []
+                for _ in range(rng.randint(1, 5)):
+                    amounts.append(round(amount, 2))
+                    amount *= rng.uniform(0.95, 0.99)
+                session_quotes.append(amounts)
+            winner = None if session.is_open else min(range(len(rooms)), key=lambda index: session_quotes[index][-1])
+            for index, (room_id, _) in enumerate(rooms):
+                deals.append(PropertyDeal(session=session, customer_id=session.customer_id, room_inventory_id=room_id,
+                                          is_winning_bid=index == winner, is_active=session.is_open))
+            quotes.extend(session_quotes)
+        deals = self.bulk_create(PropertyDeal, deals)
+        self.bulk_create(BiddingAmount, [BiddingAmount(property_deal=deal, amount=amount)
+                                         for deal, amounts in zip(deals, quotes) for amount in amounts])
+
+
+def get_perf_data_filters():
+    owners = Owner.objects.filter(email__endswith=f'@{PERF_EMAIL_DOMAIN}')
+    customers = Customer.objects.filter(email__endswith=f'@{PERF_EMAIL_DOMAIN}')
+    return owners, customers
+
+
+def flush_perf_data():
+    """
+    Delete everything `PerfDataGenerator` wrote, children first and with one DELETE per table, so
+    millions of rows go without Django collecting them or running per-row delete signals.
+    """
+    owners, customers = get_perf_data_filters()
+    properties = Property.objects.filter(owner__in=owners)
+    rooms = RoomInventory.objects.filter(property__in=properties)
+    bookings = BookingHistory.objects.filter(Q(property__in=properties) | Q(customer__in=customers))
+    deals = PropertyDeal.objects.filter(Q(room_inventory__in=rooms) | Q(customer__in=customers))
+    banking_details = OwnerBankingDetail.objects.filter(hotel_owner__in=owners)
+    locations = list(properties.values_list('location', flat=True))
+    deleted = {}
+    with transaction.atomic():
+        for queryset in (
+            RoomNight.objects.filter(room_inventory__in=rooms),
+            GuestDetail.objects.filter(booking__in=bookings),
+            bookings,
+            BiddingAmount.objects.filter(property_deal__in=deals),
+            deals,
+            BiddingSession.objects.filter(customer__in=customers),
+            Ratings.objects.filter(Q(property__in=properties) | Q(customer__in=customers)),
+            UpdateInventoryPeriod.objects.filter(room_inventory__in=rooms),
+            RoomImage.objects.filter(room__in=rooms),
+            RoomInventory.bed_type.through.objects.filter(roominventory__in=rooms),
+            RoomInventory.room_features.through.objects.filter(roominventory__in=rooms),
+            RoomInventory.common_amenities.through.objects.filter(roominventory__in=rooms),
+            rooms,
+            PropertyImage.objects.filter(property__in=properties),
+            PropertyCancellation.objects.filter(property__in=properties),
+            Property.room_types.through.objects.filter(property__in=properties),
+            properties,
+            Product.objects.filter(owner_banking__in=banking_details),
+            BankingAddress.objects.filter(owner_banking__in=banking_details),
+            banking_details,
+            SubscriptionTransaction.objects.filter(owner__in=owners),
+            OTP.objects.filter(user__in=owners),
+            owners,
+            customers,
+        ):
+            deleted[queryset.model.__name__] = queryset._raw_delete(queryset.db)
+    invalidate_search_cells(locations)
+    return deleted
@@ -5,6 +5,10 @@ from .models import Owner, PropertyType, RoomType, BedType, BathroomType, RoomFe
     Product, SubscriptionPlan, SubscriptionTransaction, GuestDetail, CancellationReason, SubCancellationReason
 from customer.models import Customer
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+from hotel_app_backend.messages import EXPORT_WINDOW_MESSAGE
 
 
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
@@ -131,6 +135,7 @@ class PropertySerializer(serializers.ModelSerializer):
     class Meta:
         model = Property
         exclude = ['owner']
+        read_only_fields = ['average_rating', 'rating_count']
 
 
 class PropertyOutSerializer(DynamicFieldsModelSerializer):
@@ -145,13 +150,27 @@ class PropertyOutSerializer(DynamicFieldsModelSerializer):
         owner = instance.owner
         return owner.address if owner and hasattr(owner, 'address') else None
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads in a fixed number of queries, whatever the page size."""
+        return queryset.select_related('owner__category', 'property_type').prefetch_related(
+            'room_types',
+            Prefetch('propertyimage_set', queryset=PropertyImage.objects.order_by('id'), to_attr='prefetched_images'),
+            Prefetch('propertycancellation_set', queryset=PropertyCancellation.objects.order_by('id'),
+                     to_attr='prefetched_cancellation_policies')
+        )
+
     def get_images(self, obj):
-        image_urls = [image.image for image in PropertyImage.objects.filter(property=obj) if image.property is not None]
-        return image_urls
+        images = getattr(obj, 'prefetched_images', None)
+        if images is None:
+            images = PropertyImage.objects.filter(property=obj)
+        return [image.image for image in images]
 
     def get_cancellation_policy(self, obj):
-        cancellation_policies = [CancellationSerializer(policy).data for policy in PropertyCancellation.objects.filter(property=obj)]
-        return cancellation_policies
+        cancellation_policies = getattr(obj, 'prefetched_cancellation_policies', None)
+        if cancellation_policies is None:
+            cancellation_policies = PropertyCancellation.objects.filter(property=obj)
+        return CancellationSerializer(cancellation_policies, many=True).data
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -176,7 +195,7 @@ class UpdatedPeriodSerializer(DynamicFieldsModelSerializer):
 
     class Meta:
         model = UpdateInventoryPeriod
-        exclude = ['created_at', 'updated_at', 'room_inventory']
+        exclude = ['created_at', 'updated_at', 'room_inventory', 'night']
 
 
 class RoomInventorySerializer(serializers.ModelSerializer):
@@ -205,9 +224,18 @@ class RoomInventoryOutSerializer(DynamicFieldsModelSerializer):
     common_amenities = CommonAmenitiesSerializer(many=True)
     images = serializers.SerializerMethodField()
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('room_type', 'bathroom_type').prefetch_related(
+            'bed_type', 'room_features', 'common_amenities',
+            Prefetch('roomimage_set', queryset=RoomImage.objects.order_by('id'), to_attr='prefetched_images')
+        )
+
     def get_images(self, obj):
-        image_urls = [image.image for image in RoomImage.objects.filter(room=obj) if image.room is not None]
-        return image_urls
+        images = getattr(obj, 'prefetched_images', None)
+        if images is None:
+            images = RoomImage.objects.filter(room=obj)
+        return [image.image for image in images]
 
     class Meta:
         model = RoomInventory
@@ -275,8 +303,20 @@ class BookingHistorySerializer(DynamicFieldsModelSerializer):
     guests = serializers.SerializerMethodField()
     address = serializers.SerializerMethodField()
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('customer', 'rooms__room_type', 'property__owner').prefetch_related(
+            Prefetch('booking_history', queryset=GuestDetail.objects.order_by('id'), to_attr='prefetched_guests')
+        )
+
+    def get_guest_detail(self, instance):
+        guests = getattr(instance, 'prefetched_guests', None)
+        if guests is None:
+            return GuestDetail.objects.filter(booking=instance).first()
+        return guests[0] if guests else None
+
     def get_guests(self, instance):
-        guests = GuestDetail.objects.filter(booking=instance).first()
+        guests = self.get_guest_detail(instance)
         return guests.no_of_adults + guests.no_of_children if guests else None
 
     def get_property(self, instance):
@@ -356,6 +396,10 @@ class SubscriptionOutSerializer(serializers.ModelSerializer):
 class RatingsOutSerializer(serializers.ModelSerializer):
     customer = CustomerOutSerializer()
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('customer')
+
     class Meta:
         model = Ratings
         fields = '__all__'
@@ -397,11 +441,11 @@ class BookingRetrieveSerializer(BookingHistorySerializer):
         return cancellation_policies
 
     def get_num_of_adults(self, instance):
-        guests = GuestDetail.objects.filter(booking=instance).first()
+        guests = self.get_guest_detail(instance)
         return guests.no_of_adults
 
     def get_num_of_children(self, instance):
-        guests = GuestDetail.objects.filter(booking=instance).first()
+        guests = self.get_guest_detail(instance)
         return guests.no_of_children
 
 
@@ -416,6 +460,24 @@ class PropertyDealSerializer(serializers.ModelSerializer):
     room_inventory = RoomInventoryOutSerializer(fields=('room_type', 'room_name', 'deal_price'))
     session = BiddingSessionSerializer(fields=('id', 'is_open', 'no_of_adults', 'no_of_children', 'num_of_rooms', 'check_in_date', 'check_out_date'))
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('customer', 'session', 'room_inventory__room_type')
+
     class Meta:
         model = PropertyDeal
         fields = ['id', 'customer', 'room_inventory', 'session', 'is_winning_bid', 'is_active', 'created_at', 'updated_at']
+
+
+class InventoryExportSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    export_format = serializers.ChoiceField(choices=('csv', 'ics'), default='csv')
+
+    def validate(self, data):
+        data.setdefault('start_date', timezone.localdate())
+        data.setdefault('end_date', data['start_date'] + relativedelta(years=+1, days=-1))
+        nights = (data['end_date'] - data['start_date']).days + 1
+        if not 0 < nights <= settings.INVENTORY_EXPORT_MAX_NIGHTS:
+            raise serializers.ValidationError(EXPORT_WINDOW_MESSAGE.format(nights=settings.INVENTORY_EXPORT_MAX_NIGHTS))
+        return data
@@ -1,10 +1,19 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from .models import Owner, SubscriptionPlan, BookingHistory
-from .utils import send_mail
+from django.conf import settings
+from .models import Owner, SubscriptionPlan, BookingHistory, RoomInventory, Property, PropertyImage, \
+    PropertyCancellation, Ratings, UpdateInventoryPeriod, RoomNight
+from .utils import send_mail, refresh_room_nights, get_stay_nights, get_stay_range, to_night, invalidate_property_search, \
+    refresh_property_ratings
+from hotel_app_backend.cache_utils import invalidate_search_cells
 from hotel_app_backend.utils import razorpay_client
 from customer.email_utils import vendor_welcome_data
-from django.utils.timezone import now
+from django.utils.timezone import now, localdate
+from django.db.models import Min, Max
+from datetime import timedelta
+
+# RoomInventory fields the RoomNight rows of a room depend on.
+ROOM_NIGHT_FIELDS = ('num_of_rooms', 'default_price', 'status')
 
 
 @receiver(post_save, sender=Owner)
@@ -47,3 +56,114 @@ def set_booking_id(sender, instance, *args, **kwargs):
         else:
             new_id_number = 1
         instance.booking_id = f'{prefix}{new_id_number:04d}'
+
+
+def is_cascade_delete(sender, origin):
+    # Rows deleted along with their room must not write RoomNight rows back for it.
+    return origin is not None and not isinstance(origin, sender) and getattr(origin, 'model', None) is not sender
+
+
+def refresh_previous_room_nights(room_id, start_date, end_date):
+    room_inventory = RoomInventory.objects.filter(id=room_id).first()
+    if room_inventory:
+        refresh_room_nights(room_inventory, start_date, end_date)
+
+
+@receiver(pre_save, sender=UpdateInventoryPeriod)
+def set_override_night(sender, instance, *args, **kwargs):
+    if instance.date:
+        instance.night = to_night(instance.date)
+    instance._previous_override = sender.objects.filter(pk=instance.pk).values_list(
+        'room_inventory_id', 'night').first() if instance.pk else None
+
+
+@receiver(post_save, sender=UpdateInventoryPeriod)
+@receiver(post_delete, sender=UpdateInventoryPeriod)
+def sync_override_room_nights(sender, instance, origin=None, **kwargs):
+    if is_cascade_delete(sender, origin):
+        return
+    previous_override = getattr(instance, '_previous_override', None)
+    if previous_override and None not in previous_override and previous_override != (instance.room_inventory_id, instance.night):
+        room_id, night = previous_override
+        refresh_previous_room_nights(room_id, night, night)
+    if instance.room_inventory_id is not None and instance.night:
+        refresh_room_nights(instance.room_inventory, instance.night, instance.night)
+
+
+@receiver(pre_save, sender=BookingHistory)
+def set_booking_nights(sender, instance, *args, **kwargs):
+    if instance.check_in_date and instance.check_out_date:
+        instance.check_in, instance.check_out = to_night(instance.check_in_date), to_night(instance.check_out_date)
+        instance.stay = get_stay_range(instance.check_in, instance.check_out)
+    instance._previous_stay = sender.objects.filter(pk=instance.pk).values_list(
+        'rooms_id', 'check_in', 'check_out').first() if instance.pk else None
+
+
+@receiver(post_save, sender=BookingHistory)
+@receiver(post_delete, sender=BookingHistory)
+def sync_booking_room_nights(sender, instance, origin=None, **kwargs):
+    if is_cascade_delete(sender, origin):
+        return
+    previous_stay = getattr(instance, '_previous_stay', None)
+    if previous_stay and None not in previous_stay and previous_stay != (instance.rooms_id, instance.check_in, instance.check_out):
+        room_id, check_in, check_out = previous_stay
+        refresh_previous_room_nights(room_id, *get_stay_nights(check_in, check_out))
+    if instance.rooms_id is None or not instance.check_in_date or not instance.check_out_date:
+        return
+    first_night, last_night = get_stay_nights(to_night(instance.check_in_date), to_night(instance.check_out_date))
+    refresh_room_nights(instance.rooms, first_night, last_night)
+
+
+@receiver(pre_save, sender=RoomInventory)
+def remember_room_inventory(sender, instance, **kwargs):
+    instance._previous_inventory = sender.objects.filter(pk=instance.pk).values_list(
+        *ROOM_NIGHT_FIELDS).first() if instance.pk else None
+
+
+@receiver(post_save, sender=RoomInventory)
+def sync_room_inventory_room_nights(sender, instance, created, update_fields=None, **kwargs):
+    previous_inventory = getattr(instance, '_previous_inventory', None)
+    if not created and (update_fields is not None and not set(ROOM_NIGHT_FIELDS).intersection(update_fields)
+                        or previous_inventory == tuple(getattr(instance, field) for field in ROOM_NIGHT_FIELDS)):
+        invalidate_property_search([instance.property_id])
+        return
+    start_date = localdate()
+    end_date = start_date + timedelta(days=settings.ROOM_NIGHT_HORIZON_DAYS)
+    stored = RoomNight.objects.filter(room_inventory=instance).aggregate(first=Min('night'), last=Max('night'))
+    refresh_room_nights(instance, min(filter(None, (start_date, stored['first']))),
+                        max(filter(None, (end_date, stored['last']))))
+
+
+@receiver(pre_save, sender=Property)
+def remember_property_location(sender, instance, **kwargs):
+    instance._previous_location = sender.objects.filter(pk=instance.pk).values_list('location', flat=True).first() \
+        if instance.pk else None
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_location_search(sender, instance, **kwargs):
+    invalidate_search_cells([instance.location, getattr(instance, '_previous_location', None)])
+
+
+@receiver(post_delete, sender=RoomInventory)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyCancellation)
+@receiver(post_delete, sender=PropertyCancellation)
+def invalidate_related_property_search(sender, instance, **kwargs):
+    if instance.property_id:
+        invalidate_property_search([instance.property_id])
+
+
+@receiver(post_save, sender=Ratings)
+@receiver(post_delete, sender=Ratings)
+def update_property_ratings(sender, instance, **kwargs):
+    refresh_property_ratings(Property.objects.filter(id=instance.property_id))
+    invalidate_property_search([instance.property_id])
+
+
+@receiver(post_save, sender=Owner)
+def invalidate_owner_property_search(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_property_search(instance.owner_property.values_list('id', flat=True))
@@ -0,0 +1,202 @@
+import json
+import os
+import time
+from collections import namedtuple
+from unittest.mock import patch, Mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from .import_utils import IMPORT_COLUMNS
+from .seed_utils import seed_dataset, SEED_CENTER
+
+Route = namedtuple('Route', ['name', 'method', 'path', 'data', 'max_queries', 'paginated', 'per_row', 'status', 'format'],
+                   defaults=[None, 10, False, 0, status.HTTP_200_OK, 'json'])
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def razorpay_response(*args, **kwargs):
+    return Mock(status_code=200, json=Mock(return_value={'id': 'order_perf', 'transfers': [{'id': 'trf_perf'}]}))
+
+
+class PerformanceTestMixin:
+    """
+    Seeds `scale` properties and requests every route of an app, asserting a query budget per
+    route and that paginated routes run the same number of queries for one row as for a full
+    page, so an N+1 in a serializer or view fails here first. Redis inventory holds are patched
+    out, since only database queries are counted. `per_row` is the per-row allowance
+    of routes that still issue queries per row. Set PERFORMANCE_REPORT to a file path to append
+    the measured queries and timings as JSON lines. Concrete classes are tagged `performance`, so
+    `manage.py test --exclude-tag performance` skips them.
+    """
+    scale = 10
+    page_size = 50
+    max_seconds = 2.0
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(cls.scale, seed=cls.scale)
+
+    def setUp(self):
+        cache.clear()
+        for target in ('hotel.views.send_mail', 'customer.views.send_mail', 'hotel.signals.send_mail'):
+            patch(target, return_value={'MessageId': 'perf'}).start()
+        for target in ('hotel.views.razorpay_request', 'customer.views.razorpay_request'):
+            patch(target, side_effect=razorpay_response).start()
+        patch('hotel.views.razorpay_client', **{'subscription.create.return_value': {'id': 'sub_perf'}}).start()
+        for target in ('customer.search_utils.get_held_rooms', 'customer.utils.get_held_rooms', 'customer.filters.get_held_rooms'):
+            patch(target, return_value={}).start()
+        patch('customer.search_utils.get_held_room_ids', return_value=[]).start()
+        patch('customer.search_utils.get_held_nights', return_value={}).start()
+        patch('customer.views.acquire_hold', return_value=True).start()
+        for target in ('customer.views.release_hold', 'hotel.views.release_hold'):
+            patch(target).start()
+        self.addCleanup(patch.stopall)
+        self.client.force_authenticate(user=self.get_user())
+
+    def measure(self, route, per_page=None):
+        path = route.path
+        if per_page:
+            path += ('&' if '?' in path else '?') + f'per_page={per_page}'
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, route.method)(path, route.data, format=route.format)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.report(route, per_page, len(queries), elapsed)
+        return response, len(queries), elapsed
+
+    def report(self, route, per_page, num_queries, elapsed):
+        report_path = os.getenv('PERFORMANCE_REPORT')
+        if report_path:
+            with open(report_path, 'a') as report:
+                report.write(json.dumps({'test': type(self).__name__, 'scale': self.scale, 'route': route.name,
+                                         'per_page': per_page, 'queries': num_queries, 'seconds': round(elapsed, 4)}) + '\n')
+
+    def test_routes_stay_within_budget(self):
+        for route in self.get_routes():
+            with self.subTest(route=route.name):
+                response, num_queries, elapsed = self.measure(route, self.page_size if route.paginated else None)
+                self.assertEqual(response.status_code, route.status, getattr(response, 'data', None))
+                rows = len(response.data['data']) if route.paginated else 0
+                self.assertLessEqual(num_queries, route.max_queries + route.per_row * rows)
+                self.assertLess(elapsed, self.max_seconds)
+
+    def test_paginated_routes_do_not_query_per_row(self):
+        for route in self.get_routes():
+            if not route.paginated:
+                continue
+            with self.subTest(route=route.name):
+                _, single_row_queries, _ = self.measure(route, 1)
+                response, full_page_queries, _ = self.measure(route, self.page_size)
+                rows = len(response.data['data'])
+                self.assertLessEqual(full_page_queries - single_row_queries, route.per_row * max(rows - 1, 0))
+
+
+@tag('performance')
+@override_settings(CACHES=LOCMEM_CACHES)
+class HotelPerformanceTest(PerformanceTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Property and room creation mail the verification request to the first superuser.
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+
+    def get_user(self):
+        return self.dataset.owner
+
+    def get_routes(self):
+        owner, booking, room, masters = self.dataset.owner, self.dataset.bookings[0], self.dataset.rooms[0], self.dataset.masters
+        property_id = self.dataset.properties[0].id
+        account_id = owner.banking_details.get().id
+        plan_id = owner.owner_subscription.get().subscription_plan_id
+        export_end_date = timezone.localdate() + timedelta(days=90)
+        return [
+            Route('login', 'post', '/hotel/login/', {'phone_number': owner.phone_number, 'fcm_token': 'fcm'}, 8),
+            Route('register', 'post', '/hotel/register/', {'phone_number': '9111111111', 'email': 'new@example.com'}, 10,
+                  status=status.HTTP_201_CREATED),
+            Route('owner_profile', 'get', '/hotel/ownerProfile/', max_queries=10),
+            Route('owner_profile_update', 'patch', '/hotel/ownerProfile/', {'hotel_name': 'Renamed'}, 8,
+                  status=status.HTTP_201_CREATED),
+            Route('category_retrieve', 'get', '/hotel/categoryRetrieve/', max_queries=3),
+            Route('master_retrieve', 'get', '/hotel/masterRetrieve/', max_queries=12),
+            Route('send_otp', 'get', '/hotel/verifyOtp/', max_queries=3),
+            Route('verify_otp', 'post', '/hotel/verifyOtp/', {'otp': 'xxxxxx'}, 3, status=status.HTTP_400_BAD_REQUEST),
+            Route('account_get', 'get', '/hotel/getAccount/', max_queries=5),
+            Route('account_update', 'patch', f'/hotel/updateAccount/{account_id}/', {
+                'settlements': {'account_number': '1234567890', 'ifsc_code': 'HDFC0000001', 'beneficiary_name': 'Seed Owner'},
+                'tnc_accepted': True
+            }, 5),
+            Route('booking_history', 'get', '/hotel/bookingHistory/', max_queries=6, paginated=True),
+            Route('transactions', 'get', '/hotel/transactions/', max_queries=6, paginated=True),
+            Route('subscription_plan', 'get', '/hotel/subscriptionPlan/', max_queries=4, paginated=True),
+            Route('subscription', 'get', '/hotel/subscription/', max_queries=5),
+            Route('subscription_create', 'post', '/hotel/subscription/', {'subscription_plan': plan_id}, 8),
+            Route('ratings', 'get', '/hotel/ratings/', max_queries=5, paginated=True),
+            Route('booking_retrieve', 'get', f'/hotel/bookingRetrieve/{booking.id}/', max_queries=8),
+            Route('cancel_booking', 'post', f'/hotel/cancelBooking/{booking.id}/', {'cancel_reason': 'Overbooked'}, 25),
+            Route('update_inventory', 'get', f'/hotel/updateInventory/{property_id}/', max_queries=8, paginated=True),
+            Route('deal_history', 'get', '/hotel/dealHistory/', max_queries=5, paginated=True),
+            Route('property_list', 'get', '/hotel/properties/', max_queries=8, paginated=True),
+            Route('property_retrieve', 'get', f'/hotel/properties/{property_id}/', max_queries=10),
+            Route('room_inventory_list', 'get', '/hotel/roomInventories/', max_queries=10, paginated=True),
+            Route('room_inventory_retrieve', 'get', f'/hotel/roomInventories/{room.id}/', max_queries=12),
+            Route('inventory_export', 'get', f'/hotel/inventoryExport/{property_id}/?end_date={export_end_date}', max_queries=6),
+            Route('inventory_export_ics', 'get',
+                  f'/hotel/inventoryExport/{property_id}/?end_date={export_end_date}&export_format=ics', max_queries=6),
+            Route('inventory_import', 'post', f'/hotel/inventoryImport/{property_id}/', {'file': self.get_import_file(property_id)},
+                  20, format='multipart'),
+            # The seeded owner already has an active account, so this measures the rejection of a second one.
+            Route('account_create', 'post', '/hotel/createAccount/', {
+                'contact_name': 'Seed Owner', 'legal_business_name': 'Seed Hotels', 'business_type': 'partnership'
+            }, 3, status=status.HTTP_400_BAD_REQUEST),
+            Route('property_create', 'post', '/hotel/properties/', {
+                'hotel_nick_name': 'Perf Property', 'manager_name': 'Manager', 'number_of_rooms': 20,
+                'nearby_popular_landmark': 'Landmark', 'property_type': masters.property_type.id,
+                'room_types': [room_type.id for room_type in masters.room_types], 'location': {'coordinates': list(SEED_CENTER)},
+                'images': ['properties/perf.jpg'], 'cancellation_data': [{'cancellation_days': 2, 'cancellation_percents': 50}]
+            }, 25),
+            Route('property_update', 'patch', f'/hotel/properties/{property_id}/', {
+                'number_of_rooms': 30, 'images': ['properties/perf.jpg'],
+                'cancellation_data': [{'cancellation_days': 5, 'cancellation_percents': 25}]
+            }, 25),
+            Route('room_inventory_create', 'post', f'/hotel/roomInventories/?property_id={property_id}', {
+                'room_name': 'Perf Room', 'floor': 3, 'room_view': 'City', 'area_sqft': 300, 'room_type': masters.room_types[0].id,
+                'bathroom_type': masters.bathroom_type.id, 'bed_type': [masters.bed_type.id],
+                'room_features': [masters.room_feature.id], 'common_amenities': [masters.common_amenity.id], 'num_of_rooms': 5,
+                'adult_capacity': 2, 'children_capacity': 1, 'default_price': 4000, 'deal_price': 3500, 'min_price': 3000,
+                'max_price': 5000, 'images': ['rooms/perf.jpg']
+            }, 45),
+            Route('room_inventory_update', 'patch', f'/hotel/roomInventories/{room.id}/', {
+                'default_price': room.default_price + 100,
+                'updated_period': {'type': masters.update_types[0].id, 'dates': [str(export_end_date)], 'default_price': room.default_price,
+                                   'min_price': room.min_price, 'max_price': room.max_price, 'num_of_rooms': 8}
+            }, 35),
+            Route('room_inventory_delete', 'delete', f'/hotel/roomInventories/{self.dataset.rooms[1].id}/', max_queries=30),
+            Route('property_delete', 'delete', f'/hotel/properties/{self.dataset.properties[-1].id}/', max_queries=60,
+                  status=status.HTTP_204_NO_CONTENT),
+        ]
+
+    def get_import_file(self, property_id):
+        start_date = timezone.localdate() + timedelta(days=7)
+        lines = [','.join(IMPORT_COLUMNS)] + [
+            f'{room.id},{start_date + timedelta(days=offset)},{room.default_price},,{room.min_price},{room.max_price},1,open'
+            for room in self.dataset.rooms if room.property_id == property_id for offset in range(30)
+        ]
+        return SimpleUploadedFile('inventory.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+
+class HotelPerformanceScale100Test(HotelPerformanceTest):
+    scale = 100
+
+
+class HotelPerformanceScale1000Test(HotelPerformanceTest):
+    scale = 1000
@@ -2,11 +2,30 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from .models import Owner, PropertyType, RoomFeature, RoomType, BathroomType, BedType, \
     CommonAmenities, Property, RoomInventory, Category, OwnerBankingDetail, \
-    BookingHistory, SubscriptionPlan, SubscriptionTransaction, Ratings, GuestDetail
+    BookingHistory, SubscriptionPlan, SubscriptionTransaction, Ratings, GuestDetail, BiddingAmount, BiddingSession, \
+    UpdateType, UpdateRequest, UpdateInventoryPeriod
 from django.contrib.gis.geos import Point
 from django.contrib.auth.models import User
 from customer.models import Customer
 from django.utils import timezone
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, DatabaseError
+from datetime import date
+from .availability_utils import build_nightly_availability
+from .utils import get_stay_range
+from .export_utils import stream_csv, stream_ical
+from .import_utils import validate_inventory_csv
+from .bidding_utils import BidLedger, BidWriter, bootstrap_bidding_session
+from .seed_utils import seed_dataset
+from unittest.mock import patch, AsyncMock
+from types import SimpleNamespace
+from hotel_app_backend.outbox_utils import Outbox, DROP_OLDEST, DISCONNECT
+from hotel_app_backend.registry_utils import ConnectionRegistry
+from hotel_app_backend.backplane_utils import RedisBackplane
+from starlette.websockets import WebSocketState
+import asyncio
+import io
 
 
 class BaseHotelViewTest(APITestCase):
@@ -586,3 +605,363 @@ class BookingRetrieveViewTest(BaseHotelViewTest):
         )
         response = self.get_booking(booking_history_instance.pk)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class NightlyAvailabilityTest(SimpleTestCase):
+    def test_non_overlapping_bookings_do_not_add_up(self):
+        stays = [(1, date(2024, 1, 1), date(2024, 1, 1), 2), (1, date(2024, 1, 2), date(2024, 1, 3), 2)]
+        availability = build_nightly_availability([(1, 3, 100)], date(2024, 1, 1), date(2024, 1, 3), stays, [])
+        self.assertEqual(availability.booked.tolist(), [[2, 2, 2]])
+        self.assertEqual(availability.min_free_rooms(), {1: 1})
+
+    def test_overrides_cap_capacity_and_close_nights(self):
+        overrides = [(1, date(2024, 1, 2), 1, 300, True), (2, date(2024, 1, 1), 5, 100, False)]
+        availability = build_nightly_availability([(1, 3, 100), (2, 2, 50)], date(2024, 1, 1), date(2024, 1, 2), [], overrides)
+        self.assertEqual(availability.min_free_rooms(), {1: 1, 2: 0})
+        self.assertEqual(availability.prices.tolist(), [[100, 300], [50, 50]])
+
+    def test_overbooked_nights_have_no_free_rooms(self):
+        overrides = [(1, date(2024, 1, 1), 1, 100, True)]
+        stays = [(1, date(2024, 1, 1), date(2024, 1, 1), 2)]
+        availability = build_nightly_availability([(1, 3, 100)], date(2024, 1, 1), date(2024, 1, 2), stays, overrides)
+        self.assertEqual(availability.min_free_rooms(), {1: 0})
+        self.assertEqual(availability.stay(1, date(2024, 1, 1), date(2024, 1, 1))[0], 0)
+
+
+class StayRangeTest(SimpleTestCase):
+    def test_stay_range_covers_occupied_nights(self):
+        stay = get_stay_range(date(2024, 1, 1), date(2024, 1, 3))
+        self.assertEqual((stay.lower, stay.upper), (date(2024, 1, 1), date(2024, 1, 3)))
+
+    def test_same_day_stay_occupies_check_in_night(self):
+        stay = get_stay_range(date(2024, 1, 1), date(2024, 1, 1))
+        self.assertEqual((stay.lower, stay.upper), (date(2024, 1, 1), date(2024, 1, 2)))
+
+
+class InventoryExportViewTest(BaseHotelViewTest):
+    def export(self, property_id, params):
+        self.client.force_authenticate(user=self.hotel, token=self.token)
+        return self.client.get(f'/hotel/inventoryExport/{property_id}/', params)
+
+    def test_inventory_export(self):
+        property_instance = self.create_property()
+        response = self.export(property_instance.id, {'start_date': '2024-01-01', 'end_date': '2024-01-07'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines()[0],
+                         'room_id,room_name,night,capacity,booked,available_rooms,is_open,price')
+        response = self.export(property_instance.id, {'start_date': '2024-01-07', 'end_date': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.export(property_instance.id + 1, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class InventoryExportEncodingTest(SimpleTestCase):
+    room_nights = [(1, 'Deluxe, sea view', date(2024, 1, 1), 3, 1, 2, True, 120.0),
+                   (1, 'Deluxe, sea view', date(2024, 1, 2), 3, 0, 0, False, 120.0)]
+
+    def test_csv_has_a_row_per_room_night(self):
+        lines = ''.join(stream_csv(iter(self.room_nights))).splitlines()
+        self.assertEqual(lines[1:], ['1,"Deluxe, sea view",2024-01-01,3,1,2,1,120.0', '1,"Deluxe, sea view",2024-01-02,3,0,0,0,120.0'])
+
+    def test_ical_has_an_event_per_room_night(self):
+        feed = ''.join(stream_ical(SimpleNamespace(hotel_nick_name='Seaside'), iter(self.room_nights)))
+        self.assertEqual(feed.count('BEGIN:VEVENT'), 2)
+        self.assertIn('UID:room-1-20240102@houmuch', feed)
+        self.assertIn('SUMMARY:Deluxe\\, sea view: 2 available at 120', feed)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in feed.split('\r\n')))
+
+
+INVENTORY_CSV_HEADER = 'room_id,date,default_price,deal_price,min_price,max_price,num_of_rooms,status\n'
+
+
+class InventoryImportValidationTest(SimpleTestCase):
+    def test_valid_rows_are_staged_for_copy(self):
+        staging_file = io.StringIO()
+        rows, errors = validate_inventory_csv(io.StringIO(INVENTORY_CSV_HEADER + '1,2024-01-01,100,,80,120,3,closed\n'), {1}, staging_file)
+        self.assertEqual((rows, errors), (1, []))
+        self.assertEqual(staging_file.getvalue(), '2,1,2024-01-01,100,,80,120,3,False\r\n')
+
+    def test_invalid_rows_are_reported_by_line(self):
+        lines = io.StringIO(INVENTORY_CSV_HEADER + '2,2024-01-01,100,,80,120,3,open\n1,2024-02-30,100,,80,120,3,open\n'
+                            '1,2024-01-02,100,,130,120,3,open\n')
+        rows, errors = validate_inventory_csv(lines, {1}, io.StringIO())
+        self.assertEqual(rows, 3)
+        self.assertEqual([error['line'] for error in errors], [2, 3, 4])
+
+    def test_missing_columns_are_reported(self):
+        rows, errors = validate_inventory_csv(io.StringIO('room_id,date\n1,2024-01-01\n'), {1}, io.StringIO())
+        self.assertEqual(rows, 0)
+        self.assertEqual(len(errors), 1)
+
+
+class InventoryImportViewTest(BaseHotelViewTest):
+    def import_inventory(self, property_id, data):
+        self.client.force_authenticate(user=self.hotel, token=self.token)
+        return self.client.post(f'/hotel/inventoryImport/{property_id}/', data, format='multipart')
+
+    def test_inventory_import(self):
+        property_instance = self.create_property()
+        response = self.import_inventory(property_instance.id, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = io.BytesIO((INVENTORY_CSV_HEADER + '999,2024-01-01,100,,80,120,3,open\n').encode())
+        upload.name = 'inventory.csv'
+        response = self.import_inventory(property_instance.id, {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+        response = self.import_inventory(property_instance.id + 1, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_imported_night_leaves_its_multi_range_request(self):
+        property_instance = self.create_property()
+        room = RoomInventory.objects.create(property=property_instance, room_name="Sample Room", floor=2, room_view="City View",
+                                            area_sqft=300.5, room_type=RoomType.objects.create(room_type='Suite'),
+                                            bathroom_type=BathroomType.objects.create(bathroom_type='Private'), num_of_rooms=5,
+                                            adult_capacity=2, children_capacity=1, default_price=100, min_price=80,
+                                            max_price=120, status=True)
+        single_type = UpdateType.objects.create(type='Single')
+        override = UpdateInventoryPeriod.objects.create(
+            room_inventory=room, type=UpdateType.objects.create(type='Multi Range'),
+            request=UpdateRequest.objects.create(request='2030-01-01, 2030-01-03'), num_of_rooms=2,
+            date=timezone.make_aware(timezone.datetime(2030, 1, 1, 12))
+        )
+        upload = io.BytesIO((INVENTORY_CSV_HEADER + f'{room.id},2030-01-01,100,,80,120,3,open\n').encode())
+        upload.name = 'inventory.csv'
+        response = self.import_inventory(property_instance.id, {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        override.refresh_from_db()
+        self.assertEqual((override.type_id, override.request_id, override.num_of_rooms), (single_type.id, None, 3))
+
+
+class UpdatePeriodTest(BaseHotelViewTest):
+    def test_fields_outside_the_override_are_ignored(self):
+        room = RoomInventory.objects.create(property=self.create_property(), room_name="Sample Room", floor=2, room_view="City View",
+                                            area_sqft=300.5, room_type=RoomType.objects.create(room_type='Suite'),
+                                            bathroom_type=BathroomType.objects.create(bathroom_type='Private'), num_of_rooms=5,
+                                            adult_capacity=2, children_capacity=1, default_price=100, min_price=80,
+                                            max_price=120, status=True)
+        self.client.force_authenticate(user=self.hotel, token=self.token)
+        response = self.client.patch(f'/hotel/roomInventories/{room.id}/', {'updated_period': {
+            'type': UpdateType.objects.create(type='Single').id, 'dates': ['2030-01-01'], 'num_of_rooms': 3,
+            'date': '2031-01-01T00:00:00Z', 'night': '2031-01-01', 'request': 1, 'unknown': True
+        }}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        override = UpdateInventoryPeriod.objects.get(room_inventory=room)
+        self.assertEqual((override.night, override.num_of_rooms, override.request_id), (date(2030, 1, 1), 3, None))
+
+
+class BidLedgerTest(SimpleTestCase):
+    def setUp(self):
+        self.ledger = BidLedger()
+        self.ledger.add_room(1, 10, 'Seaside', 100)
+        self.ledger.add_room(2, 20, 'Hilltop', 200)
+        self.ledger.record(1, 500)
+        self.ledger.record(2, 450)
+
+    def test_lowest_quote_follows_bids(self):
+        self.ledger.record(1, 400)
+        self.assertEqual(self.ledger.lowest_amount(), 400)
+        self.assertEqual([quote['amount'] for quote in self.ledger.quotes_received()], [400, 450, 500])
+
+    def test_only_latest_two_quotes_per_owner_count(self):
+        self.ledger.record(1, 300)
+        self.ledger.record(1, 480)
+        self.ledger.record(1, 490)
+        self.assertEqual(self.ledger.lowest_amount(), 450)
+        self.assertEqual([quote['amount'] for quote in self.ledger.quotes_received()], [450, 480, 490])
+
+
+class BidWriterTest(SimpleTestCase):
+    async def test_bids_are_saved_in_batches_and_on_stop(self):
+        with patch.object(BiddingAmount.objects, 'bulk_create') as bulk_create:
+            writer = BidWriter(interval=60, batch_size=100, wait_for_flush=False)
+            writer.start()
+            for amount in (500, 450, 400):
+                await writer.add(1, amount)
+            bulk_create.assert_not_called()
+            await writer.stop()
+            self.assertEqual([bid.amount for bid in bulk_create.call_args.args[0]], [500, 450, 400])
+
+    async def test_durable_bids_wait_for_the_insert(self):
+        with patch.object(BiddingAmount.objects, 'bulk_create') as bulk_create:
+            writer = BidWriter(interval=0.001, batch_size=100, wait_for_flush=True)
+            writer.start()
+            await writer.add(1, 500)
+            bulk_create.assert_called_once()
+            await writer.stop()
+
+
+class QuoteHandlerTest(SimpleTestCase):
+    async def test_unsaved_quote_is_not_recorded_or_broadcast(self):
+        import websocket as bidding_server
+        ledger = BidLedger()
+        ledger.add_room(1, 10, 'Hotel', 100)
+        ledger.record(1, 500)
+        bidding_server.manager.registry.session('quote-test').ledger = ledger
+        self.addCleanup(bidding_server.manager.registry.sessions.pop, 'quote-test', None)
+        with patch.object(bidding_server.bid_writer, 'add', side_effect=DatabaseError('down')), \
+                patch.object(bidding_server.manager, 'send_to', new=AsyncMock()) as send_to, \
+                patch.object(bidding_server.manager, 'send_to_role', new=AsyncMock()) as send_to_role:
+            await bidding_server.handle_quote('quote-test', {'room_id': 1, 'amount': 400.0, 'member': 'node:1', 'owner': 10})
+        self.assertEqual(ledger.lowest_amount(), 500)
+        send_to_role.assert_not_called()
+        send_to.assert_awaited_once_with('quote-test', "Your bid could not be saved, please try again.", members=['node:1'])
+
+    async def test_quote_for_an_unknown_session_is_logged(self):
+        import websocket as bidding_server
+        with patch('builtins.print') as log, \
+                patch.object(bidding_server.manager, 'send_to', new=AsyncMock()) as send_to:
+            await bidding_server.handle_quote('unknown-test', {'room_id': 1, 'amount': 400.0, 'member': 'node:1', 'owner': 10})
+        send_to.assert_not_called()
+        self.assertIn('unknown-test', log.call_args.args[0])
+
+
+class QuoteAfterCustomerLeftTest(SimpleTestCase):
+    async def test_owner_is_told_the_session_is_closed(self):
+        import websocket as bidding_server
+        manager = bidding_server.manager
+        customer, owner = StalledWebSocket(), StalledWebSocket()
+        owner.release.set()
+        await manager.join(customer, 'left-test', 'customer', customer_id=1)
+        await manager.join(owner, 'left-test', 'owner', owner_id=10)
+        await manager.disconnect(customer, 'left-test')
+        with patch.object(manager.backplane, 'publish', new=AsyncMock()) as publish:
+            await bidding_server.publish_quote(owner, 'left-test', 1, 400.0)
+        publish.assert_not_called()
+        outbox = manager.registry.get(owner).outbox
+        await manager.disconnect(owner, 'left-test')
+        await outbox.task
+        self.assertEqual(owner.sent, ["The session has been closed."])
+
+
+class BiddingConnectionManagerTest(SimpleTestCase):
+    def test_unregistered_socket_has_no_member(self):
+        import websocket as bidding_server
+        websocket = object()
+        self.assertIsNone(bidding_server.manager.member_id(websocket))
+        self.assertIsNone(bidding_server.manager.owner_id(websocket))
+        self.assertFalse(bidding_server.manager.is_connected(websocket, '7'))
+
+
+class BiddingSessionBootstrapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(5, seed=5)
+
+    def bootstrap(self, rooms):
+        with CaptureQueriesContext(connection) as queries:
+            bootstrap = bootstrap_bidding_session(self.dataset.customer.id, [room.id for room in rooms] + [0], num_of_rooms=1)
+        BiddingSession.objects.filter(id=bootstrap.session_id).update(is_open=False)
+        return bootstrap, len(queries)
+
+    def test_bootstrap_queries_do_not_grow_with_rooms(self):
+        single, single_queries = self.bootstrap(self.dataset.rooms[:1])
+        full, full_queries = self.bootstrap(self.dataset.rooms[:5])
+        self.assertEqual(single_queries, full_queries)
+        self.assertEqual(full.missing_room_ids, [0])
+        self.assertEqual([room['room_id'] for room in full.properties], [room.id for room in self.dataset.rooms[:5]])
+        self.assertEqual(BiddingAmount.objects.filter(property_deal__session_id=full.session_id).count(), 5)
+        self.assertEqual(full.ledger.lowest_amount(), min(room.deal_price for room in self.dataset.rooms[:5]))
+
+    def test_customer_with_an_open_session_is_refused(self):
+        bootstrap_bidding_session(self.dataset.customer.id, [self.dataset.rooms[0].id])
+        self.assertIsNone(bootstrap_bidding_session(self.dataset.customer.id, [self.dataset.rooms[1].id]))
+
+
+class StalledWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.application_state = WebSocketState.CONNECTED
+        self.release = asyncio.Event()
+
+    async def send_text(self, message):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self):
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+class OutboxTest(SimpleTestCase):
+    async def close_outbox(self, outbox):
+        self.closed.append(outbox)
+
+    async def test_full_outbox_drops_oldest_messages(self):
+        self.closed = []
+        websocket = StalledWebSocket()
+        outbox = Outbox(websocket, size=2, overflow=DROP_OLDEST, on_close=self.close_outbox)
+        outbox.put('first')
+        await asyncio.sleep(0)
+        for message in ('second', 'third', 'fourth'):
+            outbox.put(message)
+        self.assertEqual(outbox.dropped, 1)
+        websocket.release.set()
+        outbox.close()
+        await outbox.task
+        self.assertEqual(websocket.sent, ['first', 'third', 'fourth'])
+        self.assertEqual(websocket.application_state, WebSocketState.DISCONNECTED)
+        self.assertEqual(self.closed, [outbox])
+
+    async def test_full_outbox_disconnects_slow_client(self):
+        self.closed = []
+        websocket = StalledWebSocket()
+        outbox = Outbox(websocket, size=1, overflow=DISCONNECT, on_close=self.close_outbox)
+        await asyncio.sleep(0)
+        outbox.put('first')
+        outbox.put('second')
+        self.assertFalse(outbox.put('third'))
+        with self.assertRaises(asyncio.CancelledError):
+            await outbox.task
+        self.assertEqual(websocket.application_state, WebSocketState.DISCONNECTED)
+        self.assertEqual(self.closed, [outbox])
+
+
+class RedisBackplaneTest(SimpleTestCase):
+    async def test_slow_session_does_not_hold_up_other_sessions(self):
+        release, delivered = asyncio.Event(), []
+
+        async def deliver(session_id, event):
+            if event['wait']:
+                await release.wait()
+            delivered.append((session_id, event['number']))
+
+        backplane = RedisBackplane(deliver, 'redis://localhost:6379/0')
+        backplane.dispatch('1', {'number': 1, 'wait': True})
+        backplane.dispatch('1', {'number': 2, 'wait': False})
+        backplane.dispatch('2', {'number': 3, 'wait': False})
+        await asyncio.sleep(0)
+        self.assertEqual(delivered, [('2', 3)])
+        release.set()
+        await backplane.deliveries['1'][1]
+        self.assertEqual(delivered, [('2', 3), ('1', 1), ('1', 2)])
+        self.assertEqual(backplane.deliveries, {})
+
+
+class ConnectionRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = ConnectionRegistry()
+        self.sockets = {name: object() for name in ('customer', 'owner_a', 'owner_a_tablet', 'owner_b')}
+        outbox = SimpleNamespace(queue=asyncio.Queue(), dropped=0)
+        self.registry.add(self.sockets['customer'], '7', 'customer', 'customer', outbox)
+        self.registry.add(self.sockets['owner_a'], '7', 'owner_a', 'owner', outbox, owner_id=10)
+        self.registry.add(self.sockets['owner_a_tablet'], '7', 'owner_a_tablet', 'owner', outbox, owner_id=10)
+        self.registry.add(self.sockets['owner_b'], '7', 'owner_b', 'owner', outbox, owner_id=20)
+
+    def recipients(self, event):
+        return sorted(connection.member_id for connection in self.registry.recipients('7', event))
+
+    def test_recipients_follow_event_address(self):
+        self.assertEqual(self.recipients({'members': ['owner_b', 'unknown']}), ['owner_b'])
+        self.assertEqual(self.recipients({'owners': [10]}), ['owner_a', 'owner_a_tablet'])
+        self.assertEqual(self.recipients({'role': 'owner', 'exclude_owners': [10]}), ['owner_b'])
+        self.assertEqual(self.recipients({'role': None, 'exclude': ['customer']}), ['owner_a', 'owner_a_tablet', 'owner_b'])
+        self.assertEqual(self.registry.recipients('8', {}), [])
+
+    def test_removing_connections_clears_indexes(self):
+        self.registry.remove(self.sockets['owner_a'])
+        session = self.registry.sessions['7']
+        self.assertEqual(session.owners, {10: {'owner_a_tablet'}, 20: {'owner_b'}})
+        self.assertEqual(self.registry.stats()['7']['connections'], 3)
+        for name in ('customer', 'owner_a_tablet', 'owner_b'):
+            self.registry.remove(self.sockets[name])
+        self.assertIsNone(self.registry.remove(self.sockets['owner_b']))
+        self.assertEqual((self.registry.sessions, self.registry.sockets), ({}, {}))
@@ -4,7 +4,8 @@ from .views import PropertyViewSet, HotelRegisterView, HotelLoginView, OwnerProf
     MasterRetrieveView, RoomInventoryViewSet, OTPVerificationView, CategoryRetrieveView, \
     BookingListView, AccountCreateApi, AccountUpdateApi, SubscriptionView, \
     SubscriptionPlanView, TransactionListView, RatingsListView, CancelBookingView, \
-    BookingRetrieveView, AccountGetApi, UpdateInventoryList, DealListView
+    BookingRetrieveView, AccountGetApi, UpdateInventoryList, DealListView, InventoryExportView, \
+    InventoryImportView
 
 
 router = DefaultRouter()
@@ -31,6 +32,8 @@ urlpatterns = [
     path('cancelBooking/<int:id>/', CancelBookingView.as_view(), name="vendor_cancel_booking"),
     path('bookingRetrieve/<int:pk>/', BookingRetrieveView.as_view(), name='booking_retrieve'),
     path('updateInventory/<int:id>/', UpdateInventoryList.as_view(), name='update_inventory'),
+    path('inventoryExport/<int:id>/', InventoryExportView.as_view(), name='inventory_export'),
+    path('inventoryImport/<int:id>/', InventoryImportView.as_view(), name='inventory_import'),
     path('dealHistory/', DealListView.as_view(), name="Deal History"),
     path('', include(router.urls)),
 ]
@@ -1,5 +1,6 @@
 import jwt
 from datetime import datetime, timedelta
+from rest_framework import serializers
 from rest_framework.response import Response
 import random
 from django.template.loader import render_to_string
@@ -7,13 +8,16 @@ from django.core.cache import cache
 from hotel_app_backend.boto_utils import ses_client
 from django.conf import settings
 from django.utils import timezone
-import copy
-from .models import UpdateInventoryPeriod, UpdateType, UpdateRequest
+from django.db.backends.postgresql.psycopg_any import DateRange
+from .models import UpdateInventoryPeriod, UpdateType, UpdateRequest, BookingHistory, RoomNight, Property, Ratings
 from dateutil import parser
 import calendar
+import numpy as np
 from collections import defaultdict
-from django.db.models import F, Func
-from .serializer import UpdateInventoryPeriodSerializer
+from django.db.models import Avg, Count, Subquery, OuterRef, FloatField, IntegerField
+from django.db.models.functions import Coalesce
+from .availability_utils import build_nightly_availability, NightlyAvailability
+from hotel_app_backend.cache_utils import invalidate_search_cells
 
 
 def generate_token(id):
@@ -115,16 +119,156 @@ def generate_date_range(start_date, end_date):
     return start_date, end_date
 
 
+def to_night(value):
+    if isinstance(value, str):
+        value = parser.parse(value)
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def get_stay_nights(check_in_date, check_out_date):
+    """
+    Return the first and last night occupied by a stay. Guests sleep from check-in up to the night
+    before check-out; a same-day stay still occupies its check-in night.
+    """
+    return check_in_date, max(check_out_date - timedelta(days=1), check_in_date)
+
+
+def get_stay_range(check_in_date, check_out_date):
+    """The half-open `daterange` of the nights occupied by a stay, as stored in `BookingHistory.stay`."""
+    first_night, last_night = get_stay_nights(check_in_date, check_out_date)
+    return DateRange(first_night, last_night + timedelta(days=1), '[)')
+
+
+def refresh_property_ratings(property_queryset):
+    """Recompute `average_rating` and `rating_count` of the given properties in a single UPDATE."""
+    ratings = Ratings.objects.filter(property=OuterRef('pk')).values('property')
+    return property_queryset.update(
+        average_rating=Coalesce(Subquery(ratings.annotate(average=Avg('ratings')).values('average'),
+                                         output_field=FloatField()), 0.0),
+        rating_count=Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total'),
+                                       output_field=IntegerField()), 0)
+    )
+
+
+def invalidate_property_search(property_ids):
+    invalidate_search_cells(Property.objects.filter(id__in=property_ids).values_list('location', flat=True))
+
+
+def load_nightly_availability(rooms, start_date, end_date):
+    """
+    Build a `NightlyAvailability` for `rooms`, an iterable of `(room_id, num_of_rooms, default_price)`,
+    between `start_date` and `end_date` (inclusive) with one bookings query and one overrides query.
+    Bookings are matched with `stay && daterange`, an index range scan on `booking_room_stay_gist_idx`.
+    """
+    rooms = list(rooms)
+    room_ids = [room_id for room_id, _, _ in rooms]
+    bookings = BookingHistory.objects.filter(
+        rooms_id__in=room_ids,
+        book_status=True,
+        is_cancel=False,
+        stay__overlap=get_stay_range(start_date, end_date + timedelta(days=1))
+    ).values_list('rooms_id', 'check_in', 'check_out', 'num_of_rooms')
+    stays = ((room_id, *get_stay_nights(check_in, check_out), num_of_rooms)
+             for room_id, check_in, check_out, num_of_rooms in bookings.iterator())
+    overrides = UpdateInventoryPeriod.objects.filter(
+        room_inventory_id__in=room_ids,
+        night__gte=start_date,
+        night__lte=end_date,
+        is_deleted=False
+    ).values_list('room_inventory_id', 'night', 'num_of_rooms', 'default_price', 'status')
+    return build_nightly_availability(rooms, start_date, end_date, stays, overrides.iterator())
+
+
+def load_stored_availability(rooms, start_date, end_date):
+    """
+    Build a `NightlyAvailability` for `rooms`, an iterable of `(room_id, num_of_rooms, default_price)`,
+    from the RoomNight table with a single query. Nights without a row keep the room's own
+    inventory and price, as in property search.
+    """
+    rooms = list(rooms)
+    total_nights = (end_date - start_date).days + 1
+    room_index = {room_id: row for row, (room_id, _, _) in enumerate(rooms)}
+    capacity = np.repeat(np.asarray([num_of_rooms for _, num_of_rooms, _ in rooms], dtype=np.int64).reshape(-1, 1), total_nights, axis=1)
+    prices = np.repeat(np.asarray([price for _, _, price in rooms], dtype=np.float64).reshape(-1, 1), total_nights, axis=1)
+    booked = np.zeros_like(capacity)
+    is_open = np.ones(capacity.shape, dtype=bool)
+    room_nights = RoomNight.objects.filter(
+        room_inventory_id__in=list(room_index),
+        night__gte=start_date,
+        night__lte=end_date
+    ).values_list('room_inventory_id', 'night', 'capacity', 'booked', 'is_open', 'effective_price')
+    for room_id, night, night_capacity, night_booked, night_open, price in room_nights.iterator():
+        index = (room_index[room_id], (night - start_date).days)
+        capacity[index], booked[index], is_open[index], prices[index] = night_capacity, night_booked, night_open, price
+    return NightlyAvailability(list(room_index), start_date, booked, capacity, is_open, prices)
+
+
+def refresh_room_nights(room_inventory, start_date, end_date):
+    """
+    Recompute the RoomNight rows of `room_inventory` between `start_date` and `end_date` (inclusive)
+    from confirmed bookings and live inventory overrides, and upsert them in a single statement.
+    """
+    if start_date > end_date:
+        return
+    availability = load_nightly_availability(
+        [(room_inventory.id, room_inventory.num_of_rooms, room_inventory.default_price)], start_date, end_date)
+    RoomNight.objects.bulk_create(
+        [
+            RoomNight(room_inventory=room_inventory, night=night, capacity=capacity, booked=booked, is_open=is_open,
+                      effective_price=price)
+            for night, capacity, booked, is_open, price in availability.room_nights(room_inventory.id)
+        ],
+        update_conflicts=True,
+        unique_fields=['room_inventory', 'night'],
+        update_fields=['capacity', 'booked', 'is_open', 'effective_price', 'updated_at']
+    )
+    invalidate_property_search([room_inventory.property_id])
+
+
+def bulk_refresh_room_nights(room_queryset, start_date, end_date, batch_size=5000):
+    """
+    Same as `refresh_room_nights` for every room of `room_queryset` at once: one availability build
+    for all rooms and a batched upsert, for seeding and rebuilding large inventories.
+    """
+    if start_date > end_date:
+        return
+    rooms = list(room_queryset.values_list('id', 'num_of_rooms', 'default_price', 'property_id'))
+    availability = load_nightly_availability([room[:3] for room in rooms], start_date, end_date)
+    RoomNight.objects.bulk_create(
+        [
+            RoomNight(room_inventory_id=room_id, night=night, capacity=capacity, booked=booked, is_open=is_open,
+                      effective_price=price)
+            for room_id in availability.room_ids
+            for night, capacity, booked, is_open, price in availability.room_nights(room_id)
+        ],
+        update_conflicts=True,
+        unique_fields=['room_inventory', 'night'],
+        update_fields=['capacity', 'booked', 'is_open', 'effective_price', 'updated_at'],
+        batch_size=batch_size
+    )
+    invalidate_property_search({property_id for _, _, _, property_id in rooms})
+
+
+OVERRIDE_FIELDS = ('type', 'default_price', 'deal_price', 'min_price', 'max_price', 'num_of_rooms', 'status')
+
+
 def update_period(updated_period_data, instance):
-    dates = updated_period_data.pop('dates', [])
-    removed_dates = updated_period_data.pop('removed_dates', [])
+    """
+    Apply an owner's override to every night in `dates` with a single `INSERT ... ON CONFLICT DO
+    UPDATE` on (room_inventory, night), which also revives soft-deleted nights, and soft-delete the
+    nights in `removed_dates` with a single UPDATE. Keys other than OVERRIDE_FIELDS are ignored.
+    """
+    dates = updated_period_data.get('dates', [])
+    removed_dates = updated_period_data.get('removed_dates', [])
+    updated_period_data = {field: value for field, value in updated_period_data.items() if field in OVERRIDE_FIELDS}
     type_id = updated_period_data['type']
     current_time = datetime.now().time()
     if not dates and type_id == 1:
         dates = [datetime.now().date().strftime('%Y-%m-%d')]
     update_request = None
-    new_periods = []
-    update_map = {}
+    affected_dates = []
     if 'type' in updated_period_data:
         updated_period_data['type'] = UpdateType.objects.get(id=type_id)
         if type_id == 3 and dates:
@@ -139,23 +283,19 @@ def update_period(updated_period_data, instance):
                     all_dates_within_ranges.extend(generate_date_range(start_date, end_date))
             dates = all_dates_within_ranges
 
-    for date in dates:
-        if type(date) is str:
-            date = parser.parse(date).date()
-        updated_period_data_copy = copy.deepcopy(updated_period_data)
-        updated_period_data_copy['date'] = datetime.combine(date, current_time)
-        existing_instance = UpdateInventoryPeriod.objects.filter(date__date=date, room_inventory=instance, is_deleted=False).first()
-        if existing_instance:
-            for key, value in updated_period_data_copy.items():
-                setattr(existing_instance, key, value)
-            update_map[existing_instance.id] = existing_instance
-        else:
-            new_periods.append(UpdateInventoryPeriod(room_inventory=instance, request=update_request, **updated_period_data_copy))
-
-    if new_periods:
-        UpdateInventoryPeriod.objects.bulk_create(new_periods)
-    if update_map:
-        UpdateInventoryPeriod.objects.bulk_update(update_map.values(), updated_period_data_copy.keys())
+    nights = sorted({parser.parse(date).date() if type(date) is str else date for date in dates})
+    if nights:
+        affected_dates.extend(nights)
+        UpdateInventoryPeriod.objects.bulk_create(
+            [
+                UpdateInventoryPeriod(room_inventory=instance, request=update_request, night=night,
+                                      date=datetime.combine(night, current_time), **updated_period_data)
+                for night in nights
+            ],
+            update_conflicts=True,
+            unique_fields=['room_inventory', 'night'],
+            update_fields=[*updated_period_data, 'date', 'is_deleted', 'deleted_at', 'updated_at'] + (['request'] if update_request else [])
+        )
 
     if removed_dates:
         payload_removed_dates_set = set(removed_dates)
@@ -167,12 +307,15 @@ def update_period(updated_period_data, instance):
                 processed_removed_dates.extend(generate_date_range(start_date, end_date))
             removed_dates = [date.strftime('%Y-%m-%d') for date in processed_removed_dates]
 
+        parsed_removed_dates = [parser.parse(date).date() for date in removed_dates]
+        affected_dates.extend(parsed_removed_dates)
         instances_to_mark_deleted = UpdateInventoryPeriod.objects.filter(
             room_inventory=instance,
-            date__date__in=[parser.parse(date).date() for date in removed_dates]
+            night__in=parsed_removed_dates,
+            is_deleted=False
         )
+        update_requests_to_check = list(UpdateRequest.objects.filter(update_request__in=instances_to_mark_deleted).distinct())
         instances_to_mark_deleted.update(is_deleted=True, deleted_at=datetime.now())
-        update_requests_to_check = {instance.request for instance in instances_to_mark_deleted}
 
         for update_request in update_requests_to_check:
             current_dates = set(update_request.request.split(', '))
@@ -185,6 +328,9 @@ def update_period(updated_period_data, instance):
                 update_request.deleted_at = datetime.now()
                 update_request.save()
 
+    if affected_dates:
+        refresh_room_nights(instance, min(affected_dates), max(affected_dates))
+
 
 def get_days_before_check_in(booking, days_before_check_in):
     check_in_time_str = booking.property.check_in_time
@@ -202,43 +348,41 @@ def find_month_year(month_year, grouped_data):
     return None
 
 
-def get_updated_inventory(room_inventory, start_date, end_date):
-    updated_inventory = UpdateInventoryPeriod.objects.filter(room_inventory=room_inventory,
-                                                             date__range=(start_date, end_date),
-                                                             is_deleted=False).select_related(
-        'request', 'type').annotate(
-        month=Func(F('date'), function='EXTRACT', template="%(function)s(MONTH from %(expressions)s)"),
-        year=Func(F('date'), function='EXTRACT', template="%(function)s(YEAR from %(expressions)s)"),
-    ).order_by('year', 'month', 'type')
-
-    grouped_data = []
-    multi_range_data = []
-
-    for item in updated_inventory:
+def load_inventory_calendars(room_ids, start_date, end_date):
+    """
+    Owner calendar of every room in `room_ids` between `start_date` and `end_date` from a single
+    overrides query: regular overrides grouped by month and update type, multi range overrides by
+    request. Groups are indexed by dicts and emitted as plain dicts.
+    """
+    date_field = serializers.DateTimeField()
+    overrides = UpdateInventoryPeriod.objects.filter(
+        room_inventory_id__in=room_ids,
+        night__range=(start_date, end_date),
+        is_deleted=False
+    ).select_related('request', 'type').order_by('type_id', 'night', 'id')
+    months = {room_id: {} for room_id in room_ids}
+    multi_ranges = {room_id: {} for room_id in room_ids}
+    for item in overrides:
         if item.type_id == 3 and item.request:
-            request_id_group = next((g for g in multi_range_data if g.get('request_id') == item.request_id), None)
-            if not request_id_group:
-                request_details = item.request.request if item.request else "Unknown Request"
-                request_id_group = {
-                    'request_id': item.request_id,
-                    'request_details': request_details,
-                    'default_price': item.default_price 
-                }
-                multi_range_data.append(request_id_group)
-            serialized_item = UpdateInventoryPeriodSerializer(item).data
+            multi_ranges[item.room_inventory_id].setdefault(item.request_id, {
+                'request_id': item.request_id,
+                'request_details': item.request.request,
+                'default_price': item.default_price
+            })
         else:
-            month_year = f"{calendar.month_name[int(item.month)]} {int(item.year)}"
-            month_year_group = next((g for g in grouped_data if g.get('month_year') == month_year), None)
-            if not month_year_group:
-                month_year_group = {'month_year': month_year, 'types': defaultdict(list)}
-                grouped_data.append(month_year_group)
-            serialized_item = UpdateInventoryPeriodSerializer(item).data
-            month_year_group['types'][item.type.type].append(serialized_item)
-
-    for group in grouped_data:
-        group['types'] = dict(group['types'])
-
+            types = months[item.room_inventory_id].setdefault((item.night.year, item.night.month), defaultdict(list))
+            types[item.type.type].append({'date': date_field.to_representation(item.date), 'default_price': item.default_price})
     return {
-        'regular_updates': grouped_data,
-        'multi_range_updates': multi_range_data
+        room_id: {
+            'regular_updates': [
+                {'month_year': f"{calendar.month_name[month]} {year}", 'types': dict(types)}
+                for (year, month), types in sorted(months[room_id].items())
+            ],
+            'multi_range_updates': list(multi_ranges[room_id].values())
+        }
+        for room_id in room_ids
     }
+
+
+def get_updated_inventory(room_inventory, start_date, end_date):
+    return load_inventory_calendars([room_inventory.id], start_date, end_date)[room_inventory.id]
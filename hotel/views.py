@@ -10,13 +10,14 @@ from .models import Owner, PropertyType, RoomType, BedType, \
 from .serializer import RegisterSerializer, LoginSerializer, OwnerProfileSerializer, \
     PropertySerializer, PropertyOutSerializer, PropertyTypeSerializer, RoomTypeSerializer, PropertyDealSerializer, \
     BedTypeSerializer, BathroomTypeSerializer, RoomFeatureSerializer, CommonAmenitiesSerializer, \
-    OTPVerificationSerializer, RoomInventorySerializer, RoomInventoryOutSerializer, UpdatedPeriodSerializer, \
+    OTPVerificationSerializer, RoomInventorySerializer, RoomInventoryOutSerializer, \
     CategorySerializer, PropertyImageSerializer, BookingHistorySerializer, HotelOwnerBankingSerializer, BookingRetrieveSerializer, \
     PatchRequestSerializer, AccountSerializer, SubscriptionPlanSerializer, SubscriptionSerializer, UpdateTypeSerializer, \
-    SubscriptionOutSerializer, RatingsOutSerializer, CancellationReasonSerializer, TransactionSerializer, CancelBookingSerializer
+    SubscriptionOutSerializer, RatingsOutSerializer, CancellationReasonSerializer, TransactionSerializer, CancelBookingSerializer, \
+    InventoryExportSerializer
 from .utils import generate_token, model_name_to_snake_case, generate_response, generate_otp, send_mail, get_days_before_check_in, \
     error_response, deletion_success_response, check_plan_expiry, update_period, \
-    get_updated_inventory
+    get_updated_inventory, load_inventory_calendars, load_stored_availability, invalidate_property_search
 from hotel_app_backend.messages import PHONE_REQUIRED_MESSAGE, PHONE_ALREADY_PRESENT_MESSAGE, \
     REGISTRATION_SUCCESS_MESSAGE, EXCEPTION_MESSAGE, LOGIN_SUCCESS_MESSAGE, \
     NOT_REGISTERED_MESSAGE, OWNER_NOT_FOUND_MESSAGE, PROFILE_MESSAGE, PROFILE_UPDATE_MESSAGE, \
@@ -27,8 +28,12 @@ from hotel_app_backend.messages import PHONE_REQUIRED_MESSAGE, PHONE_ALREADY_PRE
     ACCOUNT_PRODUCT_UPDATION_FAIL_MESSAGE, ACCOUNT_DETAIL_UPDATE_MESSAGE, BANKING_DETAIL_NOT_EXIST_MESSAGE, \
     PRODUCT_AND_BANK_DETAIL_SUCESS_MESSAGE, REFUND_SUCCESFULL_MESSAGE, REFUND_ERROR_MESSAGE, ORDER_ERROR_MESSAGE, \
     ADD_ROOM_LIMIT_MESSAGE, NOT_ALLOWED_TO_REGISTER_AS_VENDOR_MESSAGE, EMAIL_ERROR_MESSAGE, PROPERTY_NOT_FOUND_MESSAGE, \
-    ROOM_NOT_FOUND_MESSAGE, BOOKING_NOT_FOUND_MESSAGE, ACCOUNT_CREATE_FAIL_MESSAGE
+    ROOM_NOT_FOUND_MESSAGE, BOOKING_NOT_FOUND_MESSAGE, ACCOUNT_CREATE_FAIL_MESSAGE, INVENTORY_IMPORT_MESSAGE, \
+    INVENTORY_IMPORT_ERROR_MESSAGE, IMPORT_FILE_MESSAGE
 from hotel_app_backend.razorpay_utils import razorpay_request
+from hotel_app_backend.hold_utils import release_hold
+from .export_utils import iter_room_nights, stream_csv, stream_ical
+from .import_utils import import_inventory_overrides
 from .authentication import JWTAuthentication
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from .paginator import CustomPagination
@@ -42,15 +47,15 @@ from django.conf import settings
 from django.shortcuts import get_object_or_404
 import hashlib
 import hmac
+import io
 import json
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from collections import defaultdict
 from django.utils.dateparse import parse_datetime
 from django.utils.timezone import now
 from dateutil.relativedelta import relativedelta
 from django.db.models import Sum
-from customer.utils import calculate_available_rooms
 from customer.models import Customer
 from customer.email_utils import customer_booking_confirmation_data, vendor_booking_confirmation_data, vendor_cancellation_data, \
     vendor_otp_data, vendor_property_verification_data, vendor_room_verification_data, customer_cancellation_data
@@ -302,6 +307,7 @@ class PropertyViewSet(ModelViewSet):
                 PropertyImage.objects.bulk_create([
                     PropertyImage(property=instance, image=image) for image in images
                 ])
+                invalidate_property_search([instance.id])
 
             if cancellation_data_list:
                 PropertyCancellation.objects.bulk_create([
@@ -311,6 +317,7 @@ class PropertyViewSet(ModelViewSet):
                         cancellation_percents=cancellation_data['cancellation_percents']
                     ) for cancellation_data in cancellation_data_list
                 ])
+                invalidate_property_search([instance.id])
             admin_email = User.objects.filter(is_superuser=True).first().email
             data = vendor_property_verification_data(admin_email, instance)
             send_mail(data)
@@ -353,6 +360,7 @@ class PropertyViewSet(ModelViewSet):
                     for image_url in set(images) - set(stored_images.values_list('image', flat=True))
                 ]
                 PropertyImage.objects.bulk_create(new_images)
+                invalidate_property_search([instance.id])
             if not is_cancellation:
                 PropertyCancellation.objects.filter(property=instance).delete()
             if cancellation_data_list:
@@ -379,7 +387,7 @@ class PropertyViewSet(ModelViewSet):
 
     def list(self, request):
         try:
-            queryset = Property.objects.filter(owner=request.user).order_by('-id')
+            queryset = PropertyOutSerializer.setup_eager_loading(Property.objects.filter(owner=request.user).order_by('-id'))
             page = self.paginate_queryset(queryset)
             serializer = PropertyOutSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
@@ -428,6 +436,7 @@ class RoomInventoryViewSet(ModelViewSet):
                     image_instances.append(RoomImage(room=instance, image=image))
             if image_instances:
                 RoomImage.objects.bulk_create(image_instances)
+                invalidate_property_search([property_instance.id])
             admin_email = User.objects.filter(is_superuser=True).first().email
             data = vendor_room_verification_data(admin_email, instance, property_instance)
             send_mail(data)
@@ -458,16 +467,17 @@ class RoomInventoryViewSet(ModelViewSet):
     def list(self, request):
         try:
             # cache_response("room_inventory_list", request.user)
-            queryset = self.filter_queryset(RoomInventory.objects.filter(property__owner=request.user))
+            queryset = self.filter_queryset(RoomInventoryOutSerializer.setup_eager_loading(
+                RoomInventory.objects.filter(property__owner=request.user).order_by('-id')))
             page = self.paginate_queryset(queryset)
             today = now().date()
             start_date = today.replace(day=1)
             end_date = start_date + relativedelta(months=+4)
+            calendars = load_inventory_calendars([room_inventory.id for room_inventory in page], start_date, end_date)
             serialized_data = []
             for room_inventory in page:
                 inventory_data = RoomInventoryOutSerializer(room_inventory).data
-                updated_inventory = get_updated_inventory(room_inventory, start_date, end_date)
-                inventory_data['updated_inventory'] = updated_inventory
+                inventory_data['updated_inventory'] = calendars[room_inventory.id]
                 serialized_data.append(inventory_data)
 
             return self.get_paginated_response(serialized_data)
@@ -512,6 +522,7 @@ class RoomInventoryViewSet(ModelViewSet):
                     for image_url in set(images) - set(stored_images.values_list('image', flat=True))
                 ]
                 RoomImage.objects.bulk_create(new_images)
+                invalidate_property_search([instance.property_id])
             if removed_images:
                 for removed_image_url in removed_images:
                     delete_image_from_s3(removed_image_url)
@@ -695,7 +706,7 @@ class BookingListView(ListAPIView):
     def get_queryset(self):
         try:
             queryset = BookingHistory.objects.filter(property__owner=self.request.user, book_status=True).order_by('created_at')
-            return queryset
+            return self.serializer_class.setup_eager_loading(queryset)
         except Exception:
             return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
 
@@ -707,7 +718,7 @@ class BookingRetrieveView(RetrieveAPIView):
 
     def get_queryset(self):
         queryset = BookingHistory.objects.filter(property__owner=self.request.user, book_status=True).order_by('-created_at')
-        return queryset
+        return self.serializer_class.setup_eager_loading(queryset)
 
     def retrieve(self, request, *args, **kwargs):
         try:
@@ -729,7 +740,7 @@ class TransactionListView(ListAPIView):
 
     def get_queryset(self):
         queryset = BookingHistory.objects.filter(property__owner=self.request.user).order_by('-created_at')
-        return queryset
+        return self.serializer_class.setup_eager_loading(queryset)
 
     def list(self, request, *args, **kwargs):
         try:
@@ -812,7 +823,7 @@ class RatingsListView(ListAPIView):
     def list(self, request, *args, **kwargs):
         try:
             property = Property.objects.filter(owner=self.request.user).first()
-            ratings = Ratings.objects.filter(property=property).order_by('-created_at')
+            ratings = RatingsOutSerializer.setup_eager_loading(Ratings.objects.filter(property=property).order_by('-created_at'))
             page = self.paginate_queryset(ratings)
             serializer = RatingsOutSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
@@ -830,7 +841,7 @@ class DealListView(ListAPIView):
 
     def get_queryset(self):
         queryset = PropertyDeal.objects.filter(room_inventory__property__owner=self.request.user).order_by('-created_at')
-        return queryset
+        return self.serializer_class.setup_eager_loading(queryset)
 
     def list(self, request):
         try:
@@ -907,32 +918,85 @@ class UpdateInventoryList(ListAPIView):
     def list(self, request, *args, **kwargs):
         try:
             property = kwargs.get('id')
-            queryset = RoomInventory.objects.filter(property=property)
+            queryset = RoomInventoryOutSerializer.setup_eager_loading(RoomInventory.objects.filter(property=property).order_by('-id'))
             page = self.paginate_queryset(queryset)
             date_str = self.request.query_params.get('date', datetime.now().strftime('%Y-%m-%d'))
             start_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             end_date = start_date + relativedelta(months=+4)
+            room_ids = [room_inventory.id for room_inventory in page]
+            calendars = load_inventory_calendars(room_ids, start_date, end_date)
+            updates = {update.room_inventory_id: update for update in UpdateInventoryPeriod.objects.filter(
+                room_inventory_id__in=room_ids, night=start_date, is_deleted=False)}
+            availability = load_stored_availability(
+                [(room_inventory.id, room_inventory.num_of_rooms, room_inventory.default_price) for room_inventory in page],
+                start_date, start_date)
             results = []
             for room_inventory in page:
-                update = UpdateInventoryPeriod.objects.filter(room_inventory=room_inventory, date=start_date).first()
-                updated_inventory = get_updated_inventory(room_inventory, start_date, end_date)
-                _, available_rooms, _ = calculate_available_rooms(RoomInventory.objects.get(id=room_inventory.id), start_date, start_date, self.request.session)
-                if update:
-                    serializer = UpdatedPeriodSerializer(update, fields=('default_price', 'min_price', 'max_price', 'deal_price', 'num_of_rooms'))
-                else:
-                    serializer = UpdatedPeriodSerializer(room_inventory, fields=('default_price', 'min_price', 'max_price', 'deal_price', 'num_of_rooms'))
+                current = updates.get(room_inventory.id, room_inventory)
                 room_inventory_data = RoomInventoryOutSerializer(room_inventory, fields=('id', 'room_type', 'room_name', 'images', 'status')).data
                 results.append({
                     **room_inventory_data,
-                    **serializer.data,
-                    "available_rooms": available_rooms,
-                    'updated_inventory': updated_inventory
+                    **{field: getattr(current, field) for field in ('default_price', 'min_price', 'max_price', 'deal_price', 'num_of_rooms')},
+                    "available_rooms": availability.stay(room_inventory.id, start_date, start_date)[0],
+                    'updated_inventory': calendars[room_inventory.id]
                 })
             return self.get_paginated_response(results)
         except Exception:
             return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
 
 
+class InventoryExportView(APIView):
+    """
+    Stream a property's availability and price per room and night as CSV or iCal for channel
+    managers, from `start_date` (default today) for a year or up to `end_date`.
+    """
+    authentication_classes = (JWTAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request, id):
+        try:
+            property = Property.objects.get(id=id, owner=request.user)
+            serializer = InventoryExportSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                return error_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+            start_date, end_date = serializer.validated_data['start_date'], serializer.validated_data['end_date']
+            room_nights = iter_room_nights(property.id, start_date, end_date)
+            if serializer.validated_data['export_format'] == 'ics':
+                response = StreamingHttpResponse(stream_ical(property, room_nights), content_type='text/calendar; charset=utf-8')
+            else:
+                response = StreamingHttpResponse(stream_csv(room_nights), content_type='text/csv; charset=utf-8')
+            filename = f"inventory_{property.id}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{serializer.validated_data['export_format']}"
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        except Property.DoesNotExist:
+            return error_response(PROPERTY_NOT_FOUND_MESSAGE, status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
+
+
+class InventoryImportView(APIView):
+    """Import a CSV of per-night inventory overrides for the rooms of one of the owner's properties."""
+    authentication_classes = (JWTAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def post(self, request, id):
+        try:
+            property = Property.objects.get(id=id, owner=request.user)
+            upload = request.FILES.get('file')
+            if not upload:
+                return error_response(IMPORT_FILE_MESSAGE, status.HTTP_400_BAD_REQUEST)
+            rows, errors = import_inventory_overrides(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''), property.id)
+            if errors:
+                return Response({'result': False, 'message': INVENTORY_IMPORT_ERROR_MESSAGE, 'errors': errors},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return Response({'result': True, 'data': {'rows': rows}, 'message': INVENTORY_IMPORT_MESSAGE.format(rows=rows)},
+                            status=status.HTTP_200_OK)
+        except Property.DoesNotExist:
+            return error_response(PROPERTY_NOT_FOUND_MESSAGE, status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return error_response(EXCEPTION_MESSAGE, status.HTTP_400_BAD_REQUEST)
+
+
 @csrf_exempt
 def razorpay_webhook(request):
     print("Received Razorpay webhook call")
@@ -956,6 +1020,7 @@ def razorpay_webhook(request):
                 booking.payment_id = payment_id
                 booking.book_status = True
                 booking.save()
+                release_hold(booking.rooms_id, booking.customer_id)
                 customer_data = customer_booking_confirmation_data(booking, guest, policies)
                 send_mail(customer_data)
                 vendor_data = vendor_booking_confirmation_data(booking, guest)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import uuid
+from contextlib import suppress
+from django.conf import settings
+from redis import asyncio as redis_asyncio
+from redis.exceptions import RedisError
+
+# Identifies this websocket server process, so member ids stay unique across workers and nodes.
+NODE_ID = uuid.uuid4().hex[:12]
+SESSION_PREFIX = 'bidding_session'
+
+
+def new_member_id(websocket):
+    return f'{NODE_ID}:{id(websocket)}'
+
+
+class LocalBackplane:
+    """
+    Session membership and message fan-out inside one process, for a single worker. Events are
+    handed to `deliver(session_id, event)` in publish order.
+    """
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.sessions = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def join(self, session_id, member_id, role, **info):
+        self.sessions.setdefault(session_id, {})[member_id] = {'role': role, **info}
+
+    async def leave(self, session_id, member_id):
+        members = self.sessions.get(session_id, {})
+        members.pop(member_id, None)
+        if not members:
+            self.sessions.pop(session_id, None)
+
+    async def members(self, session_id):
+        """Map every member of a session, on any process, to its `role` and join info."""
+        return dict(self.sessions.get(session_id, {}))
+
+    async def close_session(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    async def publish(self, session_id, event):
+        await self.deliver(session_id, event)
+
+
+class RedisBackplane(LocalBackplane):
+    """
+    Session membership in a Redis hash per session and fan-out over a pub/sub channel per session,
+    so any worker or node can host any participant. Redis delivers a channel's messages in publish
+    order, which keeps every session ordered, and each process only subscribes to the sessions it
+    hosts members of. The listener hands events to one delivery task per session, so a slow handler
+    holds up its own session only. Membership expires after BIDDING_BACKPLANE_MEMBERSHIP_TTL, so
+    sessions of a crashed process do not linger.
+    """
+
+    def __init__(self, deliver, url):
+        super().__init__(deliver)
+        self.redis = redis_asyncio.from_url(url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.listener = None
+        self.deliveries = {}
+
+    @staticmethod
+    def members_key(session_id):
+        return f'{SESSION_PREFIX}:{session_id}:members'
+
+    @staticmethod
+    def channel(session_id):
+        return f'{SESSION_PREFIX}:{session_id}:events'
+
+    async def start(self):
+        # The node channel keeps the pub/sub connection open while no session is hosted here.
+        await self.pubsub.subscribe(f'{SESSION_PREFIX}:node:{NODE_ID}')
+        self.listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        tasks = [self.listener] if self.listener else []
+        tasks += [task for _, task in self.deliveries.values()]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+
+    async def listen(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except RedisError as e:
+                print("Backplane connection error:", e)
+                await asyncio.sleep(1)
+                continue
+            if message and message['type'] == 'message':
+                self.dispatch(message['channel'].decode().split(':')[1], json.loads(message['data']))
+
+    def dispatch(self, session_id, event):
+        """Queue an event for its session's delivery task, started when the session has none."""
+        if session_id not in self.deliveries:
+            queue = asyncio.Queue()
+            self.deliveries[session_id] = (queue, asyncio.create_task(self.drain(session_id, queue)))
+        self.deliveries[session_id][0].put_nowait(event)
+
+    async def drain(self, session_id, queue):
+        while not queue.empty():
+            event = queue.get_nowait()
+            try:
+                await self.deliver(session_id, event)
+            except Exception as e:
+                print(f"Failed to deliver event of session {session_id}: {e}")
+        del self.deliveries[session_id]
+
+    async def join(self, session_id, member_id, role, **info):
+        if session_id not in self.sessions:
+            await self.pubsub.subscribe(self.channel(session_id))
+        await super().join(session_id, member_id, role, **info)
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            pipeline.hset(self.members_key(session_id), member_id, json.dumps({'role': role, **info}))
+            pipeline.expire(self.members_key(session_id), settings.BIDDING_BACKPLANE_MEMBERSHIP_TTL)
+            await pipeline.execute()
+
+    async def leave(self, session_id, member_id):
+        await super().leave(session_id, member_id)
+        if session_id not in self.sessions:
+            await self.pubsub.unsubscribe(self.channel(session_id))
+        await self.redis.hdel(self.members_key(session_id), member_id)
+
+    async def members(self, session_id):
+        members = await self.redis.hgetall(self.members_key(session_id))
+        return {member_id.decode(): json.loads(info) for member_id, info in members.items()}
+
+    async def close_session(self, session_id):
+        await self.redis.delete(self.members_key(session_id))
+
+    async def publish(self, session_id, event):
+        await self.redis.publish(self.channel(session_id), json.dumps(event))
+
+
+def get_backplane(deliver):
+    """The backplane selected by BIDDING_BACKPLANE, `redis` to run several websocket workers or nodes."""
+    if settings.BIDDING_BACKPLANE == 'redis':
+        return RedisBackplane(deliver, settings.BIDDING_BACKPLANE_URL)
+    return LocalBackplane(deliver)
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import math
+from django.conf import settings
+from django.core.cache import cache
+
+SEARCH_CACHE_PREFIX = 'property_search'
+SEARCH_CACHE_GLOBAL_CELL = 'all'
+
+
+def get_search_cell(longitude, latitude):
+    cell_size = settings.PROPERTY_SEARCH_CACHE_CELL_DEGREES
+    return f'{math.floor(longitude / cell_size)}:{math.floor(latitude / cell_size)}'
+
+
+def get_search_cells(extent):
+    """Grid cells overlapping the `(xmin, ymin, xmax, ymax)` extent of a search."""
+    cell_size = settings.PROPERTY_SEARCH_CACHE_CELL_DEGREES
+    xmin, ymin, xmax, ymax = extent
+    return [
+        f'{x}:{y}'
+        for x in range(math.floor(xmin / cell_size), math.floor(xmax / cell_size) + 1)
+        for y in range(math.floor(ymin / cell_size), math.floor(ymax / cell_size) + 1)
+    ]
+
+
+def _version_key(cell):
+    return f'{SEARCH_CACHE_PREFIX}:version:{cell}'
+
+
+def get_search_cache_key(params, cells=None):
+    """
+    Build the cache key of a search from its normalized `params` and the current version of every
+    cell it covers. Searches without a location depend on the global version instead.
+    """
+    version_keys = [_version_key(cell) for cell in (cells or [SEARCH_CACHE_GLOBAL_CELL])]
+    versions = cache.get_many(version_keys)
+    payload = json.dumps({
+        'params': params,
+        'versions': [versions.get(key, 0) for key in version_keys]
+    }, sort_keys=True, default=str)
+    return f'{SEARCH_CACHE_PREFIX}:{hashlib.sha1(payload.encode()).hexdigest()}'
+
+
+def get_cached_search(cache_key):
+    return cache.get(cache_key)
+
+
+def set_cached_search(cache_key, data):
+    cache.set(cache_key, data, timeout=settings.PROPERTY_SEARCH_CACHE_TIMEOUT)
+
+
+def invalidate_search_cells(locations):
+    """
+    Bump the version of the cells containing `locations` (points) and the global version, so every
+    cached search covering them misses on its next lookup.
+    """
+    cells = {get_search_cell(location.x, location.y) for location in locations if location is not None}
+    cells.add(SEARCH_CACHE_GLOBAL_CELL)
+    for cell in cells:
+        key = _version_key(cell)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
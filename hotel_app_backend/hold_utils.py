@@ -0,0 +1,167 @@
+import time
+from datetime import timedelta
+from functools import lru_cache
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+HOLD_PREFIX = 'inventory_hold'
+HELD_ROOMS_KEY = f'{HOLD_PREFIX}:rooms'
+
+# Every room keeps three keys: `holds` maps a holder to its JSON hold, `expiry` scores holders by
+# their expiry timestamp and `nights` counts the rooms held per night. Expired holds are released
+# lazily by whichever script touches the room next, so the counters never need a sweeper.
+_RELEASE_FUNCTIONS = """
+local function release(hold_id)
+    local hold = redis.call('HGET', KEYS[1], hold_id)
+    if hold then
+        hold = cjson.decode(hold)
+        for _, night in ipairs(hold['nights']) do
+            if redis.call('HINCRBY', KEYS[3], night, -hold['rooms']) <= 0 then
+                redis.call('HDEL', KEYS[3], night)
+            end
+        end
+        redis.call('HDEL', KEYS[1], hold_id)
+    end
+    redis.call('ZREM', KEYS[2], hold_id)
+end
+
+local function purge(now)
+    for _, hold_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+        release(hold_id)
+    end
+end
+"""
+
+# KEYS: holds, expiry, nights, held rooms index. ARGV: holder, now, expires_at, ttl, room id,
+# rooms, then night/free pairs. The holder's previous hold on the room is replaced; returns 1 when
+# every night still has `rooms` free after the other holds, 0 otherwise.
+ACQUIRE_SCRIPT = _RELEASE_FUNCTIONS + """
+purge(ARGV[2])
+release(ARGV[1])
+local rooms = tonumber(ARGV[6])
+local nights = {}
+for index = 7, #ARGV, 2 do
+    local held = tonumber(redis.call('HGET', KEYS[3], ARGV[index]) or '0')
+    if held + rooms > tonumber(ARGV[index + 1]) then
+        return 0
+    end
+    table.insert(nights, ARGV[index])
+end
+for _, night in ipairs(nights) do
+    redis.call('HINCRBY', KEYS[3], night, rooms)
+end
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode({rooms = rooms, nights = nights}))
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+local indexed_until = tonumber(redis.call('ZSCORE', KEYS[4], ARGV[5]) or '0')
+if indexed_until < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[4], ARGV[3], ARGV[5])
+end
+for index = 1, 3 do
+    redis.call('EXPIRE', KEYS[index], math.max(redis.call('TTL', KEYS[index]), tonumber(ARGV[4])))
+end
+return 1
+"""
+
+# KEYS: holds, expiry, nights, held rooms index. ARGV: holder, now, room id.
+RELEASE_SCRIPT = _RELEASE_FUNCTIONS + """
+purge(ARGV[2])
+release(ARGV[1])
+if redis.call('ZCARD', KEYS[2]) == 0 then
+    redis.call('ZREM', KEYS[4], ARGV[3])
+end
+return 1
+"""
+
+# KEYS: holds, expiry, nights. ARGV: now, holder to leave out (or ''), then nights. Returns the
+# rooms held by others on each of the nights.
+HELD_NIGHTS_SCRIPT = _RELEASE_FUNCTIONS + """
+purge(ARGV[1])
+local own_rooms, own_nights = 0, {}
+local own_hold = ARGV[2] ~= '' and redis.call('HGET', KEYS[1], ARGV[2])
+if own_hold then
+    own_hold = cjson.decode(own_hold)
+    own_rooms = own_hold['rooms']
+    for _, night in ipairs(own_hold['nights']) do
+        own_nights[night] = true
+    end
+end
+local held_nights = {}
+for index = 3, #ARGV do
+    local held = tonumber(redis.call('HGET', KEYS[3], ARGV[index]) or '0')
+    if own_nights[ARGV[index]] then
+        held = held - own_rooms
+    end
+    table.insert(held_nights, held)
+end
+return held_nights
+"""
+
+
+@lru_cache(maxsize=None)
+def _get_scripts():
+    connection = get_redis_connection('default')
+    return connection, {
+        'acquire': connection.register_script(ACQUIRE_SCRIPT),
+        'release': connection.register_script(RELEASE_SCRIPT),
+        'held_nights': connection.register_script(HELD_NIGHTS_SCRIPT)
+    }
+
+
+def _room_keys(room_id):
+    return [f'{HOLD_PREFIX}:{room_id}:holds', f'{HOLD_PREFIX}:{room_id}:expiry', f'{HOLD_PREFIX}:{room_id}:nights']
+
+
+def acquire_hold(room_id, holder_id, free_rooms, num_of_rooms):
+    """
+    Hold `num_of_rooms` on every night of `free_rooms` (night -> rooms free) unless other holds use
+    them up. Unlike the readers, this raises RedisError: without Redis a hold cannot be taken safely.
+    """
+    _, scripts = _get_scripts()
+    now = time.time()
+    ttl = settings.INVENTORY_HOLD_SECONDS
+    nights = [value for night, free in sorted(free_rooms.items()) for value in (night.isoformat(), free)]
+    return bool(scripts['acquire'](keys=_room_keys(room_id) + [HELD_ROOMS_KEY],
+                                   args=[holder_id, now, now + ttl, ttl, room_id, int(num_of_rooms), *nights]))
+
+
+def release_hold(room_id, holder_id):
+    """Release the holder's hold on a room; holds that already expired are a no-op."""
+    try:
+        _, scripts = _get_scripts()
+        scripts['release'](keys=_room_keys(room_id) + [HELD_ROOMS_KEY], args=[holder_id, time.time(), room_id])
+    except RedisError:
+        pass
+
+
+def get_held_room_ids():
+    """Ids of the rooms that may have an active hold, read from the held rooms index."""
+    try:
+        connection, _ = _get_scripts()
+        connection.zremrangebyscore(HELD_ROOMS_KEY, '-inf', time.time())
+        return [int(room_id) for room_id in connection.zrange(HELD_ROOMS_KEY, 0, -1)]
+    except RedisError:
+        return []
+
+
+def get_held_nights(room_ids, first_night, last_night, holder_id=None):
+    """Rooms held by others on each night of the stay, for every room with active holds."""
+    room_ids = list(room_ids)
+    if not room_ids:
+        return {}
+    nights = [(first_night + timedelta(days=offset)).isoformat() for offset in range((last_night - first_night).days + 1)]
+    try:
+        connection, scripts = _get_scripts()
+        now = time.time()
+        pipeline = connection.pipeline(transaction=False)
+        for room_id in room_ids:
+            scripts['held_nights'](keys=_room_keys(room_id), args=[now, holder_id or '', *nights], client=pipeline)
+        held_nights = pipeline.execute()
+    except RedisError:
+        return {}
+    return {room_id: [int(held) for held in held] for room_id, held in zip(room_ids, held_nights) if any(held)}
+
+
+def get_held_rooms(room_ids, first_night, last_night, holder_id=None):
+    """The most rooms held by others on any night of the stay, for every room with active holds."""
+    return {room_id: max(held) for room_id, held in get_held_nights(room_ids, first_night, last_night, holder_id).items()}
@@ -40,7 +40,8 @@ PAYMENT_SUCCESS_MESSAGE = _('Room IDs set in session successfully.')
 ROOM_IDS_MISSING_MESSAGE = _('Room IDs are missing.')
 ORDER_SUFFICIENT_MESSAGE = _('Sufficient rooms available.')
 BOOKED_INFO_MESSAGE = _("{total_booked} room(s) already booked.")
-SESSION_INFO_MESSAGE = _("{session_rooms_booked} room(s) currently locked/reserved in session.")
+HOLD_INFO_MESSAGE = _("{held_rooms} room(s) currently held by other guests.")
+HOLD_UNAVAILABLE_MESSAGE = _("Rooms cannot be reserved right now, please try again shortly.")
 AVAILABILITY_INFO_MESSAGE = _("{adjusted_availability} room(s) available.")
 REQUIREMENT_INFO_MESSAGE = _("{additional_rooms_needed} more required.")
 PLAN_EXPIRY_MESSAGE = _("Plan has expired")
@@ -65,3 +66,15 @@ PROPERTY_NOT_FOUND_MESSAGE = _("Property not found.")
 NOT_ALLOWED_TO_REGISTER_AS_CUSTOMER_MESSAGE = _('this phone number is already registed as vendor.')
 NOT_ALLOWED_TO_REGISTER_AS_VENDOR_MESSAGE = _('this phone number is already registed as customer.')
 BOOKING_NOT_FOUND_MESSAGE = _('Booking not found.')
+INVALID_CURSOR_MESSAGE = _("Invalid cursor.")
+AVAILABILITY_TARGET_MESSAGE = _("Send either room_id or property_id for every availability query.")
+CHECK_OUT_DATE_MESSAGE = _("Check-out date must not be before the check-in date.")
+EXPORT_WINDOW_MESSAGE = _("The export window must end on or after its start and cover at most {nights} nights.")
+INVENTORY_IMPORT_MESSAGE = _("{rows} inventory overrides imported.")
+INVENTORY_IMPORT_ERROR_MESSAGE = _("The inventory file has errors, nothing was imported.")
+IMPORT_FILE_MESSAGE = _("Upload the inventory CSV as `file`.")
+IMPORT_HEADER_MESSAGE = _("Missing columns: {columns}.")
+IMPORT_ROOM_MESSAGE = _("Room {room_id} does not belong to this property.")
+IMPORT_VALUE_MESSAGE = _("Invalid value: expected a room id, an ISO date, non-negative whole prices and rooms, and open or closed.")
+IMPORT_PRICE_RANGE_MESSAGE = _("Min price must not exceed max price.")
+IMPORT_ROW_LIMIT_MESSAGE = _("Files are limited to {rows} rows.")
@@ -0,0 +1,60 @@
+import asyncio
+from contextlib import suppress
+from starlette.websockets import WebSocketState
+
+DROP_OLDEST = 'drop_oldest'
+DISCONNECT = 'disconnect'
+
+
+class Outbox:
+    """Bounded send queue of one websocket with its own writer task; `on_close(outbox)` runs when it stops."""
+    _CLOSE = object()
+
+    def __init__(self, websocket, size, overflow, on_close):
+        self.websocket = websocket
+        # One spare slot, so the close marker always fits behind the queued messages.
+        self.queue = asyncio.Queue(maxsize=size + 1)
+        self.size = size
+        self.overflow = overflow
+        self.on_close = on_close
+        self.dropped = 0
+        self.closing = False
+        self.task = asyncio.create_task(self.run())
+
+    def put(self, message):
+        """Queue a text (str) or JSON message; returns False when it was not queued."""
+        if self.closing or self.task.done():
+            return False
+        if self.queue.qsize() >= self.size:
+            if self.overflow == DISCONNECT:
+                self.task.cancel()
+                return False
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+        return True
+
+    def close(self):
+        """Close the websocket once the queued messages are sent."""
+        if self.closing:
+            return
+        self.closing = True
+        self.queue.put_nowait(self._CLOSE)
+
+    async def run(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                if message is self._CLOSE:
+                    break
+                if isinstance(message, str):
+                    await self.websocket.send_text(message)
+                else:
+                    await self.websocket.send_json(message)
+        except Exception as e:
+            print(f"Failed to send message to client : {e}")
+        finally:
+            with suppress(Exception):
+                if self.websocket.application_state == WebSocketState.CONNECTED:
+                    await self.websocket.close()
+            await self.on_close(self)
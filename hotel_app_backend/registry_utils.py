@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass(slots=True, eq=False)
+class Connection:
+    websocket: Any
+    session_id: str
+    member_id: str
+    role: str
+    outbox: Any
+    owner_id: Optional[int] = None
+
+
+@dataclass(slots=True)
+class SessionState:
+    """Connections of one bidding session on this process, indexed by member, role and owner."""
+    session_id: str
+    connections: dict = field(default_factory=dict)
+    roles: dict = field(default_factory=dict)
+    owners: dict = field(default_factory=dict)
+    ledger: Any = None
+
+    def footprint(self):
+        return {
+            'connections': len(self.connections),
+            'owners': len(self.owners),
+            'queued_messages': sum(connection.outbox.queue.qsize() for connection in self.connections.values()),
+            'dropped_messages': sum(connection.outbox.dropped for connection in self.connections.values()),
+            'ledger_quotes': len(self.ledger) if self.ledger is not None else 0,
+        }
+
+
+class ConnectionRegistry:
+    """Bidding connections of this process by socket and by session; a session is forgotten with its last connection."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.sockets = {}
+
+    def session(self, session_id):
+        if session_id not in self.sessions:
+            self.sessions[session_id] = SessionState(session_id)
+        return self.sessions[session_id]
+
+    def get(self, websocket):
+        return self.sockets.get(id(websocket))
+
+    def add(self, websocket, session_id, member_id, role, outbox, owner_id=None):
+        connection = Connection(websocket, session_id, member_id, role, outbox, owner_id)
+        session = self.session(session_id)
+        session.connections[member_id] = connection
+        session.roles.setdefault(role, set()).add(member_id)
+        if owner_id is not None:
+            session.owners.setdefault(owner_id, set()).add(member_id)
+        self.sockets[id(websocket)] = connection
+        return connection
+
+    def remove(self, websocket):
+        connection = self.sockets.pop(id(websocket), None)
+        if connection is None:
+            return None
+        session = self.sessions[connection.session_id]
+        del session.connections[connection.member_id]
+        _discard(session.roles, connection.role, connection.member_id)
+        if connection.owner_id is not None:
+            _discard(session.owners, connection.owner_id, connection.member_id)
+        if not session.connections:
+            del self.sessions[connection.session_id]
+        return connection
+
+    def drop_ledger(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.ledger = None
+
+    def recipients(self, session_id, event):
+        """Connections addressed by an event's `members`, `owners` or `role`, less `exclude` and `exclude_owners`."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return []
+        if 'members' in event:
+            member_ids = event['members']
+        elif 'owners' in event:
+            member_ids = [member_id for owner_id in event['owners'] for member_id in session.owners.get(owner_id, ())]
+        elif event.get('role') is not None:
+            member_ids = session.roles.get(event['role'], ())
+        else:
+            member_ids = session.connections
+        exclude = set(event.get('exclude', ()))
+        exclude_owners = set(event.get('exclude_owners', ()))
+        return [
+            session.connections[member_id] for member_id in member_ids
+            if member_id in session.connections and member_id not in exclude
+            and session.connections[member_id].owner_id not in exclude_owners
+        ]
+
+    def stats(self):
+        return {session_id: session.footprint() for session_id, session in self.sessions.items()}
+
+
+def _discard(index, key, member_id):
+    members = index.get(key)
+    if members is not None:
+        members.discard(member_id)
+        if not members:
+            del index[key]
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'customer',
     'hotel',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'corsheaders'
 ]
 
@@ -166,6 +167,17 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'IGNORE_EXCEPTIONS': True,
+        }
+    }
+}
+
 
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
@@ -223,3 +235,50 @@ RAZORPAY_BASE_URL = os.getenv("RAZORPAY_BASE_URL")
 RAZORPAY_AUTH_TOKEN = os.getenv("RAZORPAY_AUTH_TOKEN")
 BACKEND_URL = os.getenv("BACKEND_URL")
 SERVER_KEY = os.getenv("SERVER_KEY")
+
+# Number of nights ahead kept in the RoomNight table for every room.
+ROOM_NIGHT_HORIZON_DAYS = int(os.getenv("ROOM_NIGHT_HORIZON_DAYS", 365))
+
+# Property search radius in kilometres: used when the request sends none, and the largest accepted.
+PROPERTY_SEARCH_DEFAULT_RADIUS_KM = float(os.getenv("PROPERTY_SEARCH_DEFAULT_RADIUS_KM", 20))
+PROPERTY_SEARCH_MAX_RADIUS_KM = float(os.getenv("PROPERTY_SEARCH_MAX_RADIUS_KM", 100))
+
+# Property search cache: entry lifetime in seconds, invalidation grid size in degrees and the number
+# of decimals search coordinates are rounded to so nearby clients share entries.
+PROPERTY_SEARCH_CACHE_TIMEOUT = int(os.getenv("PROPERTY_SEARCH_CACHE_TIMEOUT", 300))
+PROPERTY_SEARCH_CACHE_CELL_DEGREES = float(os.getenv("PROPERTY_SEARCH_CACHE_CELL_DEGREES", 0.25))
+PROPERTY_SEARCH_COORDINATE_PRECISION = int(os.getenv("PROPERTY_SEARCH_COORDINATE_PRECISION", 3))
+
+# Seconds a room stays held for a customer between PayNow and the payment capture webhook.
+INVENTORY_HOLD_SECONDS = int(os.getenv("INVENTORY_HOLD_SECONDS", 600))
+
+# Largest number of (room or property, stay) queries accepted by one batch availability request.
+AVAILABILITY_BATCH_MAX_QUERIES = int(os.getenv("AVAILABILITY_BATCH_MAX_QUERIES", 100))
+
+# Longest window, in nights, of one CSV or iCal inventory export.
+INVENTORY_EXPORT_MAX_NIGHTS = int(os.getenv("INVENTORY_EXPORT_MAX_NIGHTS", 366))
+
+# Inventory CSV imports: largest number of rows accepted, bytes of validated rows kept in memory
+# before the staging file spills to disk, and the UpdateType name given to imported nights.
+INVENTORY_IMPORT_MAX_ROWS = int(os.getenv("INVENTORY_IMPORT_MAX_ROWS", 100000))
+INVENTORY_IMPORT_SPOOL_BYTES = int(os.getenv("INVENTORY_IMPORT_SPOOL_BYTES", 8 * 1024 * 1024))
+INVENTORY_IMPORT_UPDATE_TYPE = os.getenv("INVENTORY_IMPORT_UPDATE_TYPE", "Single")
+
+# Bidding websocket backplane: `local` keeps sessions in the websocket process, so it must run a
+# single worker; `redis` shares membership and messages so any worker or node can host any
+# participant. Membership of abandoned sessions expires after the TTL in seconds.
+BIDDING_BACKPLANE = os.getenv("BIDDING_BACKPLANE", "local")
+BIDDING_BACKPLANE_URL = os.getenv("BIDDING_BACKPLANE_URL", os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'))
+BIDDING_BACKPLANE_MEMBERSHIP_TTL = int(os.getenv("BIDDING_BACKPLANE_MEMBERSHIP_TTL", 3600))
+
+# Bids are saved behind their broadcast: every interval in milliseconds or once the batch size is
+# waiting. `memory` acknowledges bids before they are saved and retries failed batches, `database`
+# acknowledges them once committed.
+BIDDING_WRITE_BEHIND_INTERVAL_MS = int(os.getenv("BIDDING_WRITE_BEHIND_INTERVAL_MS", 20))
+BIDDING_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("BIDDING_WRITE_BEHIND_BATCH_SIZE", 200))
+BIDDING_WRITE_BEHIND_DURABILITY = os.getenv("BIDDING_WRITE_BEHIND_DURABILITY", "memory")
+
+# Messages queued per bidding websocket before the overflow policy applies to a slow client:
+# `drop_oldest` discards the oldest queued message, `disconnect` closes the client.
+BIDDING_OUTBOX_SIZE = int(os.getenv("BIDDING_OUTBOX_SIZE", 100))
+BIDDING_OUTBOX_OVERFLOW = os.getenv("BIDDING_OUTBOX_OVERFLOW", "drop_oldest")
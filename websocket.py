@@ -12,6 +12,7 @@ from django import setup
 import django
 import asyncio
 import json
+from contextlib import asynccontextmanager
 from typing import List
 from django.db.models import Min
 from django.conf import settings
@@ -19,11 +20,24 @@ import requests
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hotel_app_backend.settings")
 django.setup()
 
-from hotel.models import Owner, BiddingSession, Property, PropertyDeal, RoomInventory, BiddingAmount, Category
+from hotel.models import Owner, BiddingSession, PropertyDeal, RoomInventory, BiddingAmount
 from customer.models import Customer
+from hotel_app_backend.backplane_utils import get_backplane, new_member_id
+from hotel_app_backend.registry_utils import ConnectionRegistry
+from hotel_app_backend.outbox_utils import Outbox
+from hotel.bidding_utils import BidWriter, bootstrap_bidding_session
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await manager.backplane.start()
+    bid_writer.start()
+    yield
+    await manager.backplane.stop()
+    await bid_writer.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -53,9 +67,18 @@ class Singleton:
 
 
 class ConnectionManager(Singleton):
+    """
+    Websockets connected to this process, kept in a registry indexed by socket, member, role and
+    owner. Membership and messages go through the backplane, so participants of a session can be
+    connected to different processes; every process delivers an event to its own sockets the event
+    is addressed to. Each joined socket sends through its own bounded outbox, so delivering an event
+    never waits on a client.
+    """
     def __init__(self):
         self.active_connections = []
-        self.room_clients = {}
+        self.registry = ConnectionRegistry()
+        self.handlers = {}
+        self.backplane = get_backplane(self.deliver)
 
     async def connect(self, websocket: WebSocket):
         try:
@@ -63,60 +86,93 @@ class ConnectionManager(Singleton):
         except Exception as e:
             print(e)
 
-    async def disconnect(self, websocket: WebSocket, room_id):
-        self.room_clients[room_id].remove(websocket)
-        print(f"Client #{id(websocket)} left the chat")
-        await websocket.close()
-
-    async def save_active_room(self, websocket: WebSocket, room_id):
-        self.room_clients[room_id] = [websocket]
-        print(self.room_clients)
-
-    async def update_active_room(self, websocket: WebSocket, room_id):
-        self.room_clients[room_id].append(websocket)
-        print(self.room_clients)
-
-    async def remove_active_room(self, websocket: WebSocket, session_id):
-        if session_id in self.room_clients:
-            if websocket in self.room_clients[session_id]:
-                self.room_clients[session_id].remove(websocket)
-                print(f"Removed WebSocket from active rooms: {id(websocket)}")
-
-    async def disconnect_and_remove_room(self, websocket: WebSocket, session_id):
-        if session_id in self.room_clients:
-            if websocket in self.room_clients[session_id]:
-                self.room_clients[session_id].remove(websocket)
-                if 'session_connections' in active_rooms[session_id]:
-                    if websocket in active_rooms[session_id]['session_connections']:
-                        active_rooms[session_id]['session_connections'].remove(websocket)
-        print(f"Client #{id(websocket)} left the chat")
-        await websocket.close()
+    async def join(self, websocket: WebSocket, session_id, role, **info):
+        member_id = new_member_id(websocket)
+        outbox = Outbox(
+            websocket, settings.BIDDING_OUTBOX_SIZE, settings.BIDDING_OUTBOX_OVERFLOW,
+            on_close=lambda outbox: self.leave(websocket, session_id)
+        )
+        self.registry.add(websocket, session_id, member_id, role, outbox, owner_id=info.get('owner_id'))
+        await self.backplane.join(session_id, member_id, role, **info)
+        return member_id
+
+    def member_id(self, websocket: WebSocket):
+        connection = self.registry.get(websocket)
+        return connection.member_id if connection else None
+
+    def owner_id(self, websocket: WebSocket):
+        connection = self.registry.get(websocket)
+        return connection.owner_id if connection else None
+
+    def is_connected(self, websocket: WebSocket, session_id):
+        connection = self.registry.get(websocket)
+        return connection is not None and connection.session_id == session_id
+
+    async def leave(self, websocket: WebSocket, session_id):
+        """Forget a socket and its membership; the socket itself is left to its outbox."""
+        if self.is_connected(websocket, session_id):
+            connection = self.registry.remove(websocket)
+            await self.backplane.leave(session_id, connection.member_id)
+            print(f"Client #{id(websocket)} left the chat")
+
+    async def disconnect(self, websocket: WebSocket, session_id):
+        """Leave the session now and close the socket once its queued messages are sent."""
+        connection = self.registry.get(websocket)
+        await self.leave(websocket, session_id)
+        if connection:
+            connection.outbox.close()
+        elif websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close()
 
     async def send_message(self, message: str, websocket: WebSocket):
-        if websocket.application_state == WebSocketState.CONNECTED:
+        connection = self.registry.get(websocket)
+        if connection:
+            connection.outbox.put(message)
+        elif websocket.application_state == WebSocketState.CONNECTED:
             await websocket.send_text(message)
 
-    async def send_personal_message(self, message: str, receiver_id: int, user_info, room_id):
-        for connection in self.room_clients[room_id]:
-            if id(connection) == receiver_id:
-                combined_message = f"{message}"
-                await connection.send_text(combined_message)
+    async def send_to(self, room_id, message: str, **address):
+        """Send `message` to the members of a session `address` selects, see `ConnectionRegistry.recipients`."""
+        await self.backplane.publish(room_id, {'type': 'text', 'message': message, **address})
+
+    async def send_personal_message(self, message: str, receiver_id: str, user_info, room_id):
+        await self.send_to(room_id, message, members=[receiver_id])
+
+    async def send_combind_personal_message(self, message: str, receiver_ids: List[str], user_info, room_id):
+        await self.send_to(room_id, message, members=list(receiver_ids))
 
-    async def send_combind_personal_message(self, message: str, receiver_ids: List[int], user_info, room_id):
-        for connection in self.room_clients[room_id]:
-            if id(connection) in receiver_ids:
-                combined_message = f"{message}"
-                await connection.send_text(combined_message)
+    async def send_to_role(self, room_id, role, message: str, exclude=(), exclude_owners=()):
+        await self.send_to(room_id, message, role=role, exclude=list(exclude), exclude_owners=list(exclude_owners))
 
-    async def broadcast_to_room(self, room_id: str, message: str):
-        for websocket in self.room_clients[room_id]:
+    async def broadcast_to_room(self, room_id: str, message):
+        await self.backplane.publish(room_id, {'type': 'json', 'message': message})
+
+    async def close_role(self, room_id, role, message: str):
+        """Send `message` to every member with `role` and disconnect them, on whichever process they are."""
+        await self.backplane.publish(room_id, {'type': 'close', 'message': message, 'role': role})
+
+    async def deliver(self, session_id, event):
+        if event['type'] in self.handlers:
             try:
-                await websocket.send_json(message)
+                await self.handlers[event['type']](session_id, event)
             except Exception as e:
-                print(f"Failed to send message to client : {e}")
+                print(f"Failed to handle {event['type']} event of session {session_id}: {e}")
+            return
+        if session_id not in self.registry.sessions:
+            print(f"Skipped {event['type']} event of session {session_id}: no connection of the session on this process")
+            return
+        for connection in self.registry.recipients(session_id, event):
+            connection.outbox.put(event['message'])
+            if event['type'] == 'close':
+                await self.disconnect(connection.websocket, session_id)
 
 
 manager = ConnectionManager()
+bid_writer = BidWriter(
+    settings.BIDDING_WRITE_BEHIND_INTERVAL_MS / 1000,
+    settings.BIDDING_WRITE_BEHIND_BATCH_SIZE,
+    wait_for_flush=settings.BIDDING_WRITE_BEHIND_DURABILITY == 'database'
+)
 
 
 class JWTAuthentication:
@@ -224,44 +280,6 @@ async def send_push_notification(receivers, message, title, type):
         print("Error in sending notification:", e)
 
 
-@sync_to_async
-def save_bidding_session(customer_id, no_of_adults, no_of_children, num_of_rooms, check_in_date, check_out_date):
-    existing_open_session = BiddingSession.objects.filter(customer_id=customer_id, is_open=True).first()
-
-    if existing_open_session:
-        return "You have already created one session."  # or raise Exception("Customer already has an open session")
-
-    # Create a new session for the customer
-    result_instance = BiddingSession.objects.create(
-        is_open=True,
-        customer_id=customer_id,
-        no_of_adults=no_of_adults,
-        no_of_children=no_of_children,
-        num_of_rooms=num_of_rooms,
-        check_in_date=check_in_date,
-        check_out_date=check_out_date
-    )
-
-    # Return the ID of the created session
-    return result_instance.id
-
-
-@sync_to_async
-def save_property_deal(session_id, customer_id, room_id):
-    try:
-        room_inventory = RoomInventory.objects.get(id=room_id)
-        property_deal = PropertyDeal.objects.create(
-            session_id=session_id,
-            customer_id=customer_id,
-            room_inventory=room_inventory,
-            is_winning_bid=False
-        )
-        return property_deal.id
-    except Exception as e:
-        print("An error occurred while creating property deal:", e)
-        return None
-
-
 @sync_to_async
 def featch_property_deal(session_id, room_id):
     try:
@@ -290,73 +308,11 @@ def update_property_deal_winning_bid_status(property_deal_id):
     property_deal.save()
 
 
-@sync_to_async
-def get_all_quotes_for_session_sync(session_id):
-    try:
-        # Query all bidding amounts for the given session ID
-        bidding_amounts = BiddingAmount.objects.filter(
-            property_deal__session_id=session_id
-        )
-
-        # Dictionary to store quotes for each owner
-        owner_quotes = {}
-
-        # Extract relevant information from each bidding amount
-        for amount in bidding_amounts:
-            room_id = amount.property_deal.room_inventory_id
-            property_id = RoomInventory.objects.get(id=room_id).property_id
-            hotel_nick_name = Property.objects.filter(id=property_id).values_list('hotel_nick_name', flat=True).first()
-
-            owner_id = amount.property_deal.room_inventory.property.owner.id
-
-            if owner_id not in owner_quotes:
-                owner_quotes[owner_id] = []
-
-            owner_quotes[owner_id].append({
-                'room_id': room_id,
-                'hotel_nick_name': hotel_nick_name,
-                'amount': amount.amount,
-                'created_at': amount.created_at
-            })
-
-        # Sort quotes by created_at for each owner and select the last two
-        last_two_quotes = []
-        for owner_id, quotes in owner_quotes.items():
-            sorted_quotes = sorted(quotes, key=lambda x: x['created_at'], reverse=True)[:2]
-            last_two_quotes.extend(sorted_quotes)
-
-        return last_two_quotes
-    except Exception as e:
-        print(f"Error retrieving quotes for session {session_id}: {e}")
-        return []
-
-
 @sync_to_async
 def get_last_bidding_amount(property_deal_id):
     return BiddingAmount.objects.filter(property_deal_id=property_deal_id).aggregate(Min('amount'))
 
 
-async def create_bidding_session(customer_id, no_of_adults=None, no_of_children=None, num_of_rooms=None, check_in_date=None, check_out_date=None):
-    print("Creating bidding session...")
-    try:
-        bidding_session_id = await save_bidding_session(customer_id, no_of_adults, no_of_children, num_of_rooms, check_in_date, check_out_date)
-        return bidding_session_id
-    except Exception as e:
-        print("An error occurred while creating bidding session:", e)
-        return None
-
-
-async def create_property_deal(session_id, customer_id, room_id):
-    try:
-
-        deal_id = await save_property_deal(session_id, customer_id, room_id)
-        return deal_id
-
-    except Exception as e:
-        print("An error occurred while creating property deal:", e)
-        return None
-
-
 async def get_property_deal(session_id, room_id):
     try:
         await featch_property_deal(session_id, room_id)
@@ -392,51 +348,88 @@ async def get_hotel_name_by_room_id(room_id):
         return str(e)
 
 
-async def get_owner_name_by_room_id(room_id):
-    try:
-        room_inventory = await sync_to_async(RoomInventory.objects.get)(id=room_id)
-        owner_name = await sync_to_async(lambda: room_inventory.property.owner.hotel_name)()
-        return owner_name
-    except Exception as e:
-        return str(e)
+async def close_session(websocket, session_id: str, owner_message: str, customer_message: str):
+    await bid_writer.flush()
+    await update_is_open(session_id)
+    # Disconnect all owners associated with the session, on every process
+    await manager.close_role(session_id, 'owner', owner_message)
+    await manager.send_message(customer_message, websocket)
+    await manager.disconnect(websocket, session_id)
+    await manager.backplane.close_session(session_id)
+    manager.registry.drop_ledger(session_id)
 
 
 async def handle_customer_stop(websocket, session_id: str):
-    await update_is_open(session_id)
-    # Disconnect all owners associated with the session
-    if session_id in active_rooms:
-        if 'session_connections' in active_rooms[session_id]:
-            for connection in active_rooms[session_id]['session_connections']:
-                await connection.send_text("The session has been closed by the customer.")
-                await manager.disconnect(connection, session_id)
-        await websocket.send_text("The session has been closed successfully.")
-        await manager.disconnect(websocket, session_id)
-        del active_rooms[session_id]
+    if manager.is_connected(websocket, session_id):
+        await close_session(websocket, session_id, "The session has been closed by the customer.",
+                            "The session has been closed successfully.")
 
 
 async def server_timeout(websocket, session_id: str):
     await asyncio.sleep(900)
-    await update_is_open(session_id)
-    # Disconnect all owners associated with the session
-    if session_id in active_rooms:
-        if 'session_connections' in active_rooms[session_id]:
-            for connection in active_rooms[session_id]['session_connections']:
-                await connection.send_text("The session time has ended.")
-                await manager.disconnect(connection, session_id)
-        await websocket.send_text("The session time has ended.")
-        await manager.disconnect(websocket, session_id)
-        # Remove the session from the active_rooms dictionary
-        del active_rooms[session_id]
-
-
-async def get_all_quotes_for_session(session_id):
+    if manager.is_connected(websocket, session_id):
+        await close_session(websocket, session_id, "The session time has ended.", "The session time has ended.")
+
+
+async def publish_quote(websocket, session_id: str, room_id: int, bidding_amount: float):
+    """Hand an owner's quote to the customer's process, which keeps the ledger, unless the customer has left."""
+    members = await manager.backplane.members(session_id)
+    if not any(member['role'] == 'customer' for member in members.values()):
+        await manager.send_message("The session has been closed.", websocket)
+        return
+    await manager.backplane.publish(session_id, {
+        'type': 'quote',
+        'room_id': room_id,
+        'amount': bidding_amount,
+        'member': manager.member_id(websocket),
+        'owner': manager.owner_id(websocket)
+    })
+
+
+async def handle_quote(session_id: str, event):
+    """
+    Record a quote in the session's ledger and tell the customer and owners where the bids stand.
+    Runs on the process hosting the customer, which owns the ledger, for quotes sent on any process.
+    The bid is saved behind the broadcast by `bid_writer`.
+    """
+    session = manager.registry.sessions.get(session_id)
+    if session is None or session.ledger is None:
+        # Only the customer's process holds the ledger; the others leave the quote to it
+        if session is None or 'customer' in session.roles:
+            print(f"Skipped quote of session {session_id}: its ledger is not on this process")
+        return
+    ledger = session.ledger
+    bidder, room_id, bidding_amount = event['member'], event['room_id'], event['amount']
+    room = ledger.rooms.get(room_id)
+    if room is None:
+        await manager.send_personal_message("Property deal ID not found for the room ID.", bidder, None, session_id)
+        return
     try:
-        # Call the synchronous function using sync_to_async
-        quotes = await get_all_quotes_for_session_sync(session_id)
-        return quotes
+        await bid_writer.add(room.property_deal_id, bidding_amount)
     except Exception as e:
-        print(f"Error retrieving quotes for session {session_id}: {e}")
-        return []
+        # With database durability the bid is not saved, so it is neither recorded nor broadcast
+        print(f"Failed to save bid of session {session_id}: {e}")
+        await manager.send_personal_message("Your bid could not be saved, please try again.", bidder, None, session_id)
+        return
+    ledger.record(room_id, bidding_amount)
+
+    # Send the quotes, cheapest first, to each customer associated with the session
+    await manager.send_to_role(session_id, 'customer', json.dumps({"quotes_received": ledger.quotes_received()}))
+
+    # Every connection of the bidding owner hears its status, the owner's other devices included
+    bidder_owner = event.get('owner')
+    bidders = {'owners': [bidder_owner]} if bidder_owner is not None else {'members': [bidder]}
+    if bidding_amount <= ledger.lowest_amount():
+        await manager.send_to(session_id, "Your are winning the bid.", **bidders)
+        # Inform other owners about their status
+        await manager.send_to_role(session_id, 'owner', "You are Losing the bid.", exclude=[bidder],
+                                   exclude_owners=[bidder_owner] if bidder_owner is not None else [])
+    else:
+        await manager.send_to(session_id, "You are Losing the bid.", **bidders)
+
+    # Send confirmation message to the owner
+    await manager.send_personal_message(
+        f"Your bid of {bidding_amount} for room {room_id} has been successfully sent.", bidder, None, session_id)
 
 
 async def handle_finish_message(session_id: str, user_info: Customer, room_id: int, websocket: WebSocket):
@@ -445,18 +438,22 @@ async def handle_finish_message(session_id: str, user_info: Customer, room_id: i
         if property_deal_id is not None:
             await update_property_deal_winning_bid_status(property_deal_id)
             await update_is_open(session_id)
+            await bid_writer.flush()
             last_bid = await get_last_bidding_amount(property_deal_id)
             last_amount = last_bid['amount__min'] if last_bid['amount__min'] is not None else 0
             # owner_id = await get_property_deal_owner_id(property_deal_id)
             hotel_name = await get_hotel_name_by_room_id(room_id)
+            member_id = manager.member_id(websocket)
+            if member_id is None:
+                return
             await manager.send_personal_message(
                 f"You selected {hotel_name} and the price for that is {last_amount}.",
-                id(websocket),
+                member_id,
                 user_info,
                 session_id
             )
         else:
-            await manager.send_personal_message("Property deal ID not found for the room ID.")
+            await manager.send_message("Property deal ID not found for the room ID.", websocket)
 
 
 @sync_to_async
@@ -465,11 +462,6 @@ def get_rooms_with_tokens(room_ids):
     return [(room.property.owner.fcm_token) for room in rooms if room.property.owner.fcm_token]
 
 
-active_rooms = {}
-room_deal_prices = {}
-session_connections = {}
-
-
 @app.websocket("/ws/room_connection")
 async def room_connection(
     websocket: WebSocket,
@@ -490,8 +482,6 @@ async def room_connection(
 
     try:
         if isinstance(user_info, Customer):
-            customer_socket_id = id(websocket)
-            active_rooms.setdefault(session_id, {'customer_socket_ids': []})['customer_socket_ids'].append(customer_socket_id)
             await manager.connect(websocket)
             room_ids_list = room_ids.split(',')
             # receivers = await (get_rooms_with_tokens)(room_ids_list)
@@ -499,22 +489,18 @@ async def room_connection(
             #     await send_push_notification(receivers, "message", "New Deal")
 
         if session_id:
-            if session_id in active_rooms and active_rooms[session_id]['customer_socket_ids']:
+            members = await manager.backplane.members(session_id)
+            if any(member['role'] == 'customer' for member in members.values()):
                 if isinstance(user_info, Owner):
                     print(id(websocket))
                     await manager.connect(websocket)
-                    await manager.update_active_room(websocket, session_id)
-                    await websocket.send_text(f"You are now connected to session {session_id}.")
+                    await manager.join(websocket, session_id, 'owner', owner_id=user_info.id)
+                    await manager.send_message(f"You are now connected to session {session_id}.", websocket)
                     message = f"Owner {user_info.hotel_name} entered the session."
                     try:
-                        for customer_socket_id in active_rooms[session_id]['customer_socket_ids']:
-                            await manager.send_personal_message(message, customer_socket_id, user_info, session_id)
+                        await manager.send_to_role(session_id, 'customer', message)
                     except Exception as e:
                         print("Error sending message:", e)
-
-                    if 'session_connections' not in active_rooms[session_id]:
-                        active_rooms[session_id]['session_connections'] = []
-                    active_rooms[session_id]['session_connections'].append(websocket)
                 else:
                     await websocket.close(code=1008, reason="Owner ID not found.")
             else:
@@ -523,69 +509,46 @@ async def room_connection(
             if room_ids:
                 room_ids_list = [int(prop_id) for prop_id in room_ids.split(",")]
                 if len(room_ids_list) > 5:
-                    await websocket.send_text("It is not allowed to add more than 5 properties in the bidding.")
+                    await manager.send_message("It is not allowed to add more than 5 properties in the bidding.", websocket)
                     await websocket.close(code=1008, reason="Too many properties added")
                     return
                 else:
                     customer_id = user_info.id
-                    session_id = str(await create_bidding_session(
+                    print("Creating bidding session...")
+                    bootstrap = await sync_to_async(bootstrap_bidding_session)(
                         customer_id,
+                        room_ids_list,
                         no_of_adults=no_of_adults,
                         no_of_children=no_of_children,
                         num_of_rooms=num_of_rooms,
                         check_in_date=check_in_date,
                         check_out_date=check_out_date
-                    ))
-                    if session_id == "You have already created one session.":
-                        await websocket.send_text(session_id)
+                    )
+                    if bootstrap is None:
+                        await manager.send_message("You have already created one session.", websocket)
                         return
 
-                    category = await sync_to_async(Category.objects.first)()
-                    bid_time_duration = category.bid_time_duration
-                    deal_prices = []
-                    for room_id in room_ids_list:
-                        try:
-                            room_inventory = await sync_to_async(RoomInventory.objects.get)(id=room_id)
-                            owner_name = await get_owner_name_by_room_id(room_id)
-                            hotel_name = await get_hotel_name_by_room_id(room_id)
-
-                            room_info = {
-                                'owner': owner_name,
-                                'hotel_name': hotel_name,
-                                'amount': room_inventory.deal_price,
-                                'room_id': room_id
-                            }
-
-                            deal_prices.append(room_info)
-                            deal_id = await create_property_deal(session_id, customer_id, room_id)
-
-                            await sync_to_async(BiddingAmount.objects.create)(
-                                property_deal_id=deal_id,
-                                amount=room_inventory.deal_price
-                            )
-                        except RoomInventory.DoesNotExist:
-                            await websocket.send_text(f"Room with ID {room_id} not found.")
-                            continue
-
-                    # Move database interactions outside the loop
-                    await manager.save_active_room(websocket, session_id)
-                    active_rooms[session_id] = {
-                        'customer_socket_ids': [id(websocket)],
-                        'room_deal_prices': deal_prices
-                    }
+                    session_id = str(bootstrap.session_id)
+                    for room_id in bootstrap.missing_room_ids:
+                        await manager.send_message(f"Room with ID {room_id} not found.", websocket)
+                    manager.registry.session(session_id).ledger = bootstrap.ledger
+                    await manager.join(websocket, session_id, 'customer', customer_id=customer_id)
 
                     response = {
-                        'properties': deal_prices,
-                        'bid_time_duration': bid_time_duration
+                        'properties': bootstrap.properties,
+                        'bid_time_duration': bootstrap.bid_time_duration
                     }
-                    await websocket.send_text(f"Session ID: {session_id}")
-                    await websocket.send_text("You are now connected to the session.")
-                    await websocket.send_text(json.dumps(response))
+                    await manager.send_message(f"Session ID: {session_id}", websocket)
+                    await manager.send_message("You are now connected to the session.", websocket)
+                    await manager.send_message(json.dumps(response), websocket)
                     asyncio.create_task(server_timeout(websocket, session_id))
 
         try:
             while True:
                 message = await websocket.receive_text()
+                # The socket may have been disconnected meanwhile, by its outbox or the session closing
+                if not manager.is_connected(websocket, session_id):
+                    break
 
                 if message.strip().lower() == "stop" and isinstance(user_info, Customer):
                     await handle_customer_stop(websocket, session_id)
@@ -593,18 +556,16 @@ async def room_connection(
 
                 if message == "leave":
                     if isinstance(user_info, Owner):
-                        await websocket.send_text("you leave the bidding session successfully.")
-                        await manager.disconnect_and_remove_room(websocket, session_id)
-                        for customer_socket_id in active_rooms[session_id]['customer_socket_ids']:
-                            await manager.send_personal_message(
-                                f"{user_info.hotel_name} left the bidding session.",
-                                customer_socket_id,  # Send the message only to the customer
-                                user_info,
-                                session_id
-                            )
+                        await manager.send_message("you leave the bidding session successfully.", websocket)
+                        await manager.disconnect(websocket, session_id)
+                        await manager.send_to_role(
+                            session_id,
+                            'customer',  # Send the message only to the customer
+                            f"{user_info.hotel_name} left the bidding session."
+                        )
                         return
                     else:
-                        await websocket.send_text("You are not authorized to leave the session.")
+                        await manager.send_message("You are not authorized to leave the session.", websocket)
 
                 if message.strip().lower().startswith("finish") and isinstance(user_info, Customer):
                     parts = message.split()
@@ -613,7 +574,7 @@ async def room_connection(
                         await handle_finish_message(session_id, user_info, room_id, websocket)
                         await handle_customer_stop(websocket, session_id)
                     else:
-                        await websocket.send_text("Invalid message format. Please enter a valid room ID after 'finish'.")
+                        await manager.send_message("Invalid message format. Please enter a valid room ID after 'finish'.", websocket)
 
                 else:
                     if message.startswith("quote"):
@@ -624,99 +585,26 @@ async def room_connection(
                             room_id = int(parts[2])
 
                             if bidding_amount >= 0:
-                                # Get the property deal ID for the given room ID
-                                property_deal_id = await get_property_deal_id(session_id, room_id)
-                                if property_deal_id is not None:
-                                    # Use sync_to_async to execute the database operation asynchronously
-                                    await sync_to_async(BiddingAmount.objects.create)(
-                                        property_deal_id=property_deal_id,
-                                        amount=bidding_amount
-                                    )
-                                    # Retrieve all quotes for the session from the database
-                                    all_quotes = await get_all_quotes_for_session(session_id)
-
-                                    if all_quotes:
-                                        # Sort the quotes in descending order of amount
-                                        sorted_quotes = sorted(all_quotes, key=lambda x: x['amount'])
-
-                                        # Prepare the message to be sent to the customer
-                                        message_to_send = {"quotes_received": []}
-
-                                        for quote in sorted_quotes:
-                                            room_id = quote['room_id']
-                                            hotel_nick_name = quote['hotel_nick_name']
-                                            amount = quote['amount']
-                                            message_to_send["quotes_received"].append({
-                                                "room_id": room_id,
-                                                "hotel_name": hotel_nick_name,
-                                                "amount": amount
-                                            })
-
-                                        # Send the message to each customer associated with the session
-                                        for customer_socket_id in active_rooms[session_id]['customer_socket_ids']:
-                                            await manager.send_personal_message(
-                                                json.dumps(message_to_send),
-                                                customer_socket_id,
-                                                user_info,
-                                                session_id
-                                            )
-
-                                        is_lowest_quote = True
-                                        for quote in all_quotes:
-                                            if quote['amount'] < bidding_amount:
-                                                is_lowest_quote = False
-                                                break
-
-                                        if is_lowest_quote:
-                                            await manager.send_personal_message(
-                                                "Your are winning the bid.",
-                                                id(websocket),  # Send the message to the owner
-                                                user_info,
-                                                session_id
-                                            )
-
-                                            # Inform other owners about their status
-                                            for owner_socket in active_rooms[session_id]['session_connections']:
-                                                owner_socket_id = id(owner_socket)
-                                                if owner_socket_id != id(websocket):
-                                                    await manager.send_personal_message(
-                                                        "You are Losing the bid.",
-                                                        owner_socket_id,
-                                                        user_info,
-                                                        session_id
-                                                    )
-
-                                        else:
-                                            await manager.send_personal_message(
-                                                "You are Losing the bid.",
-                                                id(websocket),  # Send the message to the owner
-                                                user_info,
-                                                session_id
-                                            )
-
-                                        # Send confirmation message to the owner
-                                        await manager.send_personal_message(
-                                            f"Your bid of {bidding_amount} for room {room_id} has been successfully sent.",
-                                            id(websocket),  # Send the message to the owner
-                                            user_info,
-                                            session_id
-                                        )
-                                else:
-                                    await websocket.send_text("Property deal ID not found for the room ID.")
+                                await publish_quote(websocket, session_id, room_id, bidding_amount)
                             else:
-                                await websocket.send_text("Invalid bidding amount. Please enter a non-negative number.")
+                                await manager.send_message("Invalid bidding amount. Please enter a non-negative number.", websocket)
                         else:
-                            await websocket.send_text("Invalid message format. Please enter a message in the format 'quote <amount> <room_id>'.")
+                            await manager.send_message("Invalid message format. Please enter a message in the format 'quote <amount> <room_id>'.", websocket)
                     else:
-                        await websocket.send_text("Invalid message format. Please enter a valid bidding amount.")
+                        await manager.send_message("Invalid message format. Please enter a valid bidding amount.", websocket)
 
         except WebSocketDisconnect:
             await manager.disconnect(websocket, session_id)
+            if isinstance(user_info, Customer):
+                manager.registry.drop_ledger(session_id)
 
     except Exception as e:
         print("An error occurred during websocket connection handling:")
         print(repr(e))
 
 
+manager.handlers['quote'] = handle_quote
+
+
 if __name__ == '__main__':
     uvicorn.run("websocket:app", host="0.0.0.0", port=7000, log_level="info", reload=True)